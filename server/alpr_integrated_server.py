@@ -4,21 +4,40 @@ A Flask-based server for processing Automatic License Plate Recognition (ALPR) d
 providing real-time dashboard visualization and VIN lookup functionality.
 """
 
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory
+import atexit
 import json
 import os
 import base64
 import yaml
 import pytz
-import requests
-import time
 import logging
+import threading
+import time
 from datetime import datetime
 from collections import defaultdict
 
 from dotenv import dotenv_values
 import labmqtt
-from plate_dedup import AlprEventDeduper
+from alpr_payload import AlprGroup, Heartbeat, get_codec, raw_line
+from event_buffer import EventLogTail, EventRingBuffer
+from event_log import EventLog
+from event_stream import EventBroadcaster
+from file_lock import FileLock
+from ingest_stats import IngestCounters
+from jsonl_writer import FileSink, GroupCommitWriter, RotatingFileSink
+from metrics import MetricsRegistry
+from mqtt_handoff import SharedMqttPublisher
+from plate_db import IndexedFileSink, SqlitePlateStore
+from plate_dedup import AlprEventDeduper, NearDuplicateFilter
+from plate_aggregate import PlateAggregate
+from plate_index import PlateIndex, parse_timestamp
+from plate_store import PlateImageStore
+from raw_archive import RawArchiveSink
+from raw_images import RawImageRefs
+from vin_client import DEFAULT_URL as DEFAULT_VIN_URL, VinClient
+from vin_jobs import VinJobQueue
+from vin_store import VinResultStore
 
 # Suppress Flask's HTTP request logging
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
@@ -38,16 +57,157 @@ PARSED_OUTPUT_FILE = config.get('parsed_output_file', 'alpr_parsed_data.jsonl')
 EVENT_LOG_FILE = config.get('event_log_file', 'event.log')
 PLATES_DIR = config.get('plates_dir', 'plates')
 VIN_RESULTS_FILE = config.get('vin_results_file', 'alpr_vin_lookup.json')
+VIN_STORE_FILE = config.get('vin_store_file', 'alpr_vin_results.jsonl')
+STATS_CHECKPOINT_FILE = config.get('stats_checkpoint_file', 'alpr_stats_checkpoint.json')
+
+# serve.py runs several worker processes (ALPR_WORKERS); they then share the files above,
+# so appends take a file lock, and dedup and MQTT publishing are coordinated between them
+WORKERS = int(os.environ.get('ALPR_WORKERS') or config.get('workers', 1))
+WORKER_ID = int(os.environ.get('ALPR_WORKER_ID', 0))
+MULTI_WORKER = WORKERS > 1
+if MULTI_WORKER:
+    # Counters cover what each worker ingested, so every worker keeps its own checkpoint
+    root, extension = os.path.splitext(STATS_CHECKPOINT_FILE)
+    STATS_CHECKPOINT_FILE = f"{root}.worker{WORKER_ID}{extension}"
 
-plate_deduper = AlprEventDeduper(parsed_output_file=PARSED_OUTPUT_FILE)
+def shared_file_lock(path):
+    """Lock for appending to ``path`` when other worker processes append to it too"""
+    return FileLock(f"{path}.lock") if MULTI_WORKER else None
+
+# Payloads are decoded and records encoded with orjson when it is installed (json_codec: auto)
+json_codec = get_codec(config.get('json_codec', 'auto'))
+
+# Instrumentation exposed at /metrics; cheap enough to stay on in production. With several
+# workers each one's series only cover that worker, so they are told apart by a worker label
+metrics = MetricsRegistry(const_labels={'worker': str(WORKER_ID)} if MULTI_WORKER else None)
+ingest_stage_seconds = metrics.histogram(
+    'alpr_ingest_stage_duration_seconds', 'Time spent in each stage of ingesting a payload', ['stage'],
+)
+payloads_total = metrics.counter(
+    'alpr_payloads_total', 'Payloads received, by data type and outcome', ['data_type', 'outcome'],
+)
+http_request_seconds = metrics.histogram(
+    'alpr_http_request_duration_seconds', 'Time to handle an HTTP request, by route', ['route'],
+)
+http_requests_total = metrics.counter(
+    'alpr_http_requests_total', 'HTTP requests handled, by route and status code', ['route', 'status'],
+)
+writer_batch_seconds = metrics.histogram(
+    'alpr_writer_batch_duration_seconds', 'Time the JSONL writer took to write (and fsync) one batch',
+)
+
+event_broadcaster = EventBroadcaster(
+    queue_size=config.get('stream_queue_size', 256),
+    replay_size=config.get('stream_replay_size', 1024),
+    # Each stream holds a request thread; the rest are left for ingest (see serve.py --threads)
+    max_subscribers=config.get('stream_max_subscribers', 4),
+)
+event_buffer = EventRingBuffer(config.get('event_buffer_size', 200))
+event_buffer.seed_from_file(EVENT_LOG_FILE, convert=EventLog.to_text)
+# A worker's buffer only holds what it logged itself and numbers lines on its own, so with
+# several workers /api/events reads the shared log, numbering lines by their file offset
+recent_events = (
+    EventLogTail(EVENT_LOG_FILE, config.get('event_buffer_size', 200), convert=EventLog.to_text)
+    if MULTI_WORKER else event_buffer
+)
 
 # API Configuration (only if VIN is enabled)
 if VIN_ENABLED:
     VIN_API_KEY = 'ehifeCWYw8awg2G'  # TODO: Move to config.yaml for production
 
-# Initialize directories
-if not os.path.exists(PLATES_DIR):
-    os.makedirs(PLATES_DIR)
+# Plate crops are sharded under PLATES_DIR (creating it if needed) and tracked in an index
+plate_store = PlateImageStore(
+    PLATES_DIR,
+    layout=config.get('plates_layout', 'hour'),
+    lock=shared_file_lock(os.path.join(PLATES_DIR, PlateImageStore.INDEX_NAME)),
+)
+
+# Optionally keep images out of the raw JSONL, storing references to the files instead
+raw_image_refs = None
+if config.get('raw_slim_images', False):
+    raw_image_refs = RawImageRefs(config.get('raw_image_dir', 'raw_images'), PLATES_DIR, plate_store.resolve)
+
+# Appends to the JSONL files and the event log go through a single group-commit writer thread
+jsonl_writer = GroupCommitWriter(
+    durability=config.get('write_durability', 'interval'),
+    fsync_interval=config.get('fsync_interval_seconds', 1.0),
+    batch_observer=lambda records, seconds: writer_batch_seconds.observe(seconds),
+)
+# The raw file rolls over into compressed segments listed in RAW_ARCHIVE_DIR/manifest.json
+raw_sink = RawArchiveSink(
+    RAW_OUTPUT_FILE,
+    config.get('raw_archive_dir', 'raw_archive'),
+    when=config.get('raw_rotate', 'daily'),
+    max_bytes=config.get('raw_max_bytes', 0),
+    codec=config.get('raw_compression', 'gzip'),
+    lock=shared_file_lock(RAW_OUTPUT_FILE),
+)
+jsonl_writer.register('raw', raw_sink)
+
+# Best read, first/last seen and sighting count per plate, for the VIN page. The writer folds
+# in each parsed batch as it lands; other workers' records are only seen by following the file.
+plate_aggregate = PlateAggregate(
+    PARSED_OUTPUT_FILE,
+    checkpoint_file=config.get('plate_summary_file', 'alpr_plate_summary.json'),
+    follow=MULTI_WORKER,
+)
+
+# Plate queries run against an in-memory index of the parsed JSONL, or against an indexed
+# SQLite copy of it that the writer thread keeps up to date after every batch
+PLATE_STORAGE = config.get('plate_storage', 'jsonl')
+if PLATE_STORAGE == 'sqlite':
+    plate_index = SqlitePlateStore(config.get('plate_db_file', 'alpr_plates.db'), PARSED_OUTPUT_FILE)
+    parsed_sink = IndexedFileSink(PARSED_OUTPUT_FILE, plate_index, lock=shared_file_lock(PARSED_OUTPUT_FILE))
+    # Imports any JSONL history not yet in the database (all of it on first start)
+    plate_index.refresh()
+    # The writer thread imports every flushed batch, so queries read without refreshing and
+    # never take the database's write lock
+    refresh_plates_on_read = False
+else:
+    plate_index = PlateIndex(PARSED_OUTPUT_FILE)
+    parsed_sink = FileSink(PARSED_OUTPUT_FILE, lock=shared_file_lock(PARSED_OUTPUT_FILE))
+    refresh_plates_on_read = True
+jsonl_writer.register('parsed', parsed_sink, on_write=None if MULTI_WORKER else plate_aggregate.apply)
+event_log = EventLog(
+    jsonl_writer,
+    RotatingFileSink(
+        EVENT_LOG_FILE,
+        when=config.get('event_log_rotate', 'daily'),
+        max_bytes=config.get('event_log_max_bytes', 10 * 1024 * 1024),
+        backup_count=config.get('event_log_backup_count', 0),
+        compress=config.get('event_log_compress', True),
+        lock=shared_file_lock(EVENT_LOG_FILE),
+    ),
+    fmt=config.get('event_log_format', 'text'),
+)
+
+plate_deduper = AlprEventDeduper(
+    parsed_output_file=PARSED_OUTPUT_FILE,
+    retention_seconds=config.get('dedup_retention_seconds', 3600),
+    max_entries=config.get('dedup_max_entries', 100000),
+    snapshot_file=config.get('dedup_snapshot_file', 'alpr_dedup_snapshot.json'),
+    before_snapshot=jsonl_writer.flush,
+    # Workers must agree on which deliveries are duplicates, so they share a SQLite table
+    shared_db_file=config.get('dedup_db_file', 'alpr_dedup.db') if MULTI_WORKER else None,
+)
+
+# Optional suppression of repeat reads whose plate differs by an OCR error or two
+near_duplicate_filter = None
+if config.get('fuzzy_dedup_enabled', False):
+    near_duplicate_filter = NearDuplicateFilter(
+        window_seconds=config.get('fuzzy_dedup_window_seconds', 30),
+        max_distance=config.get('fuzzy_dedup_max_distance', 1),
+    )
+
+ingest_counters = IngestCounters(
+    RAW_OUTPUT_FILE,
+    PARSED_OUTPUT_FILE,
+    plate_store.totals,
+    checkpoint_file=STATS_CHECKPOINT_FILE,
+    raw_archived_records=raw_sink.archive.total_records,
+    # Workers share the data files, so each counts only its own writes
+    per_process=MULTI_WORKER,
+)
 
 # Read in our env file
 env_config = dotenv_values(".env")
@@ -62,19 +222,60 @@ mqtt_topic = "{}/{}/{}".format(
     env_config.get("deployment_id"),
     env_config.get("alpr_sensor_id"),
 )
-mqtt_conn = labmqtt.labMqttPublisher(
-    env_config.get("mqtt_hostname"),
-    env_config.get("mqtt_port"),
-    mqtt_topic,
-    env_config.get("mqtt_username"),
-    env_config.get("mqtt_password"),
-)
+
+def make_mqtt_publisher():
+    return labmqtt.labMqttPublisher(
+        env_config.get("mqtt_hostname"),
+        env_config.get("mqtt_port"),
+        mqtt_topic,
+        env_config.get("mqtt_username"),
+        env_config.get("mqtt_password"),
+        spoolFile=config.get('mqtt_spool_file', 'mqtt_outbox.jsonl'),
+        queueSize=config.get('mqtt_queue_size', 1000),
+    )
+
+if MULTI_WORKER:
+    # One elected worker holds the broker connection; the others hand messages to it
+    mqtt_conn = SharedMqttPublisher(make_mqtt_publisher, config.get('mqtt_handoff_file', 'mqtt_handoff.jsonl'))
+else:
+    mqtt_conn = make_mqtt_publisher()
+
+# Connects in the background and keeps retrying; messages are queued in the meantime
 try:
     mqtt_conn.connect()
-    mqtt_online = True
 except Exception as e:
     print(f"Error connecting to MQTT broker: {e}")
 
+# Counters, dedup keys and plate summaries are checkpointed by a background thread, so no
+# request waits for the writer flush and file writes they involve
+CHECKPOINT_INTERVAL = config.get('stats_checkpoint_interval', 60)
+checkpoint_stop = threading.Event()
+
+def run_checkpoints():
+    while not checkpoint_stop.wait(CHECKPOINT_INTERVAL):
+        try:
+            ingest_counters.checkpoint()
+            plate_deduper.snapshot()
+            plate_aggregate.checkpoint()
+        except Exception as e:
+            print(f"Error writing checkpoints: {e}")
+
+checkpoint_thread = threading.Thread(target=run_checkpoints, name='checkpoints', daemon=True)
+checkpoint_thread.start()
+
+def shutdown():
+    """Flush queued writes, spool unsent MQTT messages and persist counters on exit"""
+    checkpoint_stop.set()
+    checkpoint_thread.join(timeout=30)
+    mqtt_conn.disconnect()
+    jsonl_writer.close()
+    plate_store.close()
+    ingest_counters.checkpoint()
+    plate_deduper.snapshot()
+    plate_aggregate.checkpoint()
+
+atexit.register(shutdown)
+
 # =====================================================================================
 # UTILITY FUNCTIONS
 # =====================================================================================
@@ -84,16 +285,20 @@ CONSOLE_LOGGING = False  # Set to True to enable console output
 
 def log_event(message, show_in_console=False):
     """Log events to the event log file with timestamp"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    with open(EVENT_LOG_FILE, 'a') as f:
-        f.write(f"[{timestamp}] {message}\n")
+    line = event_log.write(message)
+    event_buffer.append(line)
+    event_broadcaster.publish('log', line)
     
     # Only print to console if explicitly requested or if console logging is enabled
     if show_in_console or CONSOLE_LOGGING:
-        print(f"[{timestamp}] {message}")
+        print(line)
+
+def save_plate_image(data, key=None):
+    """Extract and save plate crop JPEG from ALPR data.
 
-def save_plate_image(data):
-    """Extract and save plate crop JPEG from ALPR data"""
+    Returns the image path relative to PLATES_DIR; ``key`` (the record's event key) is
+    recorded in the plate store's index.
+    """
     try:
         best_plate = data.get('best_plate', {})
         plate_crop_jpeg = best_plate.get('plate_crop_jpeg')
@@ -102,9 +307,9 @@ def save_plate_image(data):
             return None
         
         # Extract plate info for filename
-        plate_number = best_plate.get('plate', 'UNKNOWN')
-        confidence = best_plate.get('confidence', 0)
-        region = best_plate.get('region', 'unknown')
+        plate_number = best_plate.get('plate') or 'UNKNOWN'
+        confidence = best_plate.get('confidence') or 0
+        region = best_plate.get('region') or 'unknown'
         timestamp = data.get('timestamp', datetime.now().isoformat())
         
         # Create safe filename components
@@ -114,19 +319,19 @@ def save_plate_image(data):
         # Parse timestamp for filename
         try:
             dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            time_str = dt.strftime('%Y%m%d_%H%M%S')
         except:
-            time_str = datetime.now().strftime('%Y%m%d_%H%M%S')
+            dt = datetime.now()
+        time_str = dt.strftime('%Y%m%d_%H%M%S')
         
         filename = f"{safe_plate}_{safe_region}_{time_str}_{confidence:.1f}.jpg"
-        filepath = os.path.join(PLATES_DIR, filename)
         
         # Decode base64 and save JPEG
         jpeg_data = base64.b64decode(plate_crop_jpeg)
-        with open(filepath, 'wb') as img_file:
-            img_file.write(jpeg_data)
+        relpath = plate_store.save(filename, jpeg_data, when=dt, key=key)
+        ingest_counters.increment('plate_images')
+        ingest_counters.increment('image_bytes_written', len(jpeg_data))
         
-        return filename
+        return relpath
         
     except Exception as e:
         log_event(f"Error saving plate image: {e}")
@@ -135,28 +340,7 @@ def save_plate_image(data):
 def parse_license_plate_data(data):
     """Parse ALPR group data and extract useful license plate information"""
     try:
-        vehicle = data.get('vehicle', {})
-        return {
-            'timestamp': data.get('timestamp'),
-            'license_plate': data.get('best_plate', {}).get('plate'),
-            'confidence': data.get('best_plate', {}).get('confidence'),
-            'state_region': data.get('best_plate', {}).get('region'),
-            'region_confidence': data.get('best_plate', {}).get('region_confidence'),
-            'camera_id': data.get('camera_id'),
-            'processing_time_ms': data.get('best_plate', {}).get('processing_time_ms'),
-            'coordinates': data.get('best_plate', {}).get('coordinates'),
-            'travel_direction': data.get('travel_direction'),
-            'is_parked': data.get('is_parked'),
-            'vehicle_info': {
-                'color': vehicle.get('color', [{}])[0].get('name') if vehicle.get('color') else None,
-                'color_confidence': vehicle.get('color', [{}])[0].get('confidence') if vehicle.get('color') else None,
-                'make': vehicle.get('make', [{}])[0].get('name') if vehicle.get('make') else None,
-                'make_confidence': vehicle.get('make', [{}])[0].get('confidence') if vehicle.get('make') else None,
-                'body_type': vehicle.get('body_type', [{}])[0].get('name') if vehicle.get('body_type') else None,
-                'year_range': vehicle.get('year', [{}])[0].get('name') if vehicle.get('year') else None
-            },
-            'uuid': data.get('best_uuid')
-        }
+        return AlprGroup(data).to_record()
     except Exception as e:
         log_event(f"Error parsing license plate data: {e}")
         return None
@@ -165,107 +349,314 @@ def parse_license_plate_data(data):
 # API ROUTES - ALPR Data Processing
 # =====================================================================================
 
-@app.route('/alpr', methods=['POST'])
-def receive_alpr_data():
-    """Receive and process ALPR data from openALPR"""
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_seconds.observe(time.perf_counter() - started, route)
+        http_requests_total.inc(route, str(response.status_code))
+    if request.path.startswith('/api/'):
+        response.headers['X-API-Version'] = str(API_VERSION)
+    return response
+
+def build_mqtt_message(plate, state):
+    """Build the MQTT message announcing a plate read"""
+    # Get the time
+    mst = pytz.timezone("America/Denver")
+    dt = datetime.now()
+    offset = mst.utcoffset(dt).total_seconds() / 60 / 60
+    offset_sign = "-" if offset < 0 else "+"
+    offset_val = int(abs(offset))
+    if (offset_val < 10):
+        offset_string = f"{offset_sign}0{offset_val}"
+    else:
+        offset_string = f"{offset_sign}{offset_val}"
+
+    sampleTime = datetime.today()
+    sampleTime = sampleTime.strftime("%Y-%m-%d %H:%M:%S.%f{}".format(offset_string))
+
+    # Build the message
+    mqttmsg = {
+        "timestamp": sampleTime,
+        "sensor_id": env_config.get("alpr_sensor_id"),
+        "metric_id": env_config.get("alpr_metric_id"),
+        "plate": plate,
+        "state": state
+    }
+    return json.dumps(mqttmsg)
+
+class IngestBatch:
+    """Output of one or more processed payloads, handed to the writer and MQTT outbox together"""
+
+    def __init__(self):
+        self.raw_lines = []
+        self.parsed_lines = []
+        self.parsed_records = []
+        self.mqtt_messages = []
+
+    def mark(self):
+        """Return the current position, to drop a failed payload's output with :meth:`rollback`"""
+        return len(self.parsed_lines), len(self.parsed_records), len(self.mqtt_messages)
+
+    def rollback(self, mark):
+        parsed_lines, parsed_records, mqtt_messages = mark
+        del self.parsed_lines[parsed_lines:]
+        del self.parsed_records[parsed_records:]
+        del self.mqtt_messages[mqtt_messages:]
+
+    def commit(self):
+        with ingest_stage_seconds.time('jsonl_enqueue'):
+            jsonl_writer.write_many('raw', self.raw_lines)
+            jsonl_writer.write_many('parsed', self.parsed_lines)
+        with ingest_stage_seconds.time('mqtt_enqueue'):
+            mqtt_conn.transmit_messages(self.mqtt_messages)
+        with ingest_stage_seconds.time('broadcast'):
+            for record in self.parsed_records:
+                event_broadcaster.publish('plate', record)
+
+# Other data types are counted as 'other' so unexpected payloads can't multiply the series
+METRIC_DATA_TYPES = ('alpr_group', 'heartbeat')
+
+def ingest_payload(json_data, batch, body=None):
+    """Process a single ALPR payload, queueing its output on ``batch``.
+
+    ``body`` is the payload as received, if available; the raw line is then written from
+    it rather than re-serialized. Returns a ``(status, message)`` pair where status is
+    'success' or 'suppressed'. If processing fails, only the raw line is queued and the
+    exception is re-raised.
+    """
+    # Add timestamp if not present
+    added = {}
+    if 'timestamp' not in json_data:
+        json_data['timestamp'] = added['timestamp'] = datetime.now().isoformat()
+
+    # The raw line is queued last so slimming can reference images saved while processing
+    stored_images = {}
+    data_type = json_data.get('data_type')
+    outcome = 'error'
+    mark = batch.mark()
     try:
-        json_data = request.get_json()
-        if json_data is None:
-            return jsonify({'error': 'No JSON data received'}), 400
-        
-        # Add timestamp if not present
-        if 'timestamp' not in json_data:
-            json_data['timestamp'] = datetime.now().isoformat()
+        status, message = process_payload(json_data, batch, stored_images)
+        outcome = 'suppressed' if status == 'suppressed' else 'recorded'
+        return status, message
+    except Exception:
+        batch.rollback(mark)
+        raise
+    finally:
+        with ingest_stage_seconds.time('raw_line'):
+            queue_raw_record(json_data, batch, stored_images, body, added)
+        payloads_total.inc(data_type if data_type in METRIC_DATA_TYPES else 'other', outcome)
+
+def queue_raw_record(json_data, batch, stored_images, body=None, added=None):
+    """Queue the raw line for a payload, with embedded images replaced by references if enabled"""
+    raw = None
+    if raw_image_refs:
+        json_data = raw_image_refs.slim(json_data, stored_images)
+    elif body is not None:
+        raw = raw_line(body, added)
+    if raw is None:
+        raw = json_codec.dumps(json_data) + '\n'
+    batch.raw_lines.append(raw)
+    ingest_counters.increment('raw_records')
+    ingest_counters.increment('data_bytes_written', len(raw))
+
+def process_payload(json_data, batch, stored_images):
+    """Handle a payload by data type. Images saved to the plate store are added to ``stored_images``."""
+    # Process based on data type
+    data_type = json_data.get('data_type', 'unknown')
+    
+    if data_type == 'heartbeat':
+        # Process heartbeat data
+        heartbeat = Heartbeat(json_data)
         
-        # Save raw data
-        with open(RAW_OUTPUT_FILE, 'a') as f:
-            f.write(json.dumps(json_data) + '\n')
+        # Find most recent plate read timestamp
+        last_plate_time = "Never"
+        if heartbeat.last_plate_read > 0:
+            try:
+                last_plate_time = datetime.fromtimestamp(heartbeat.last_plate_read / 1000).strftime('%H:%M:%S')
+            except:
+                last_plate_time = "Unknown"
         
-        # Process based on data type
-        data_type = json_data.get('data_type', 'unknown')
+        ingest_counters.increment('heartbeats')
+        log_event(f"heartbeat - Total plates: {heartbeat.total_plate_reads}, Last read: {last_plate_time}")
         
-        if data_type == 'heartbeat':
-            # Process heartbeat data
-            video_streams = json_data.get('video_streams', [])
-            total_plate_reads = sum(stream.get('total_plate_reads', 0) for stream in video_streams)
-            
-            # Find most recent plate read timestamp
-            last_plate_read = max((stream.get('last_plate_read', 0) for stream in video_streams), default=0)
-            last_plate_time = "Never"
-            if last_plate_read > 0:
-                try:
-                    last_plate_time = datetime.fromtimestamp(last_plate_read / 1000).strftime('%H:%M:%S')
-                except:
-                    last_plate_time = "Unknown"
-            
-            log_event(f"heartbeat - Total plates: {total_plate_reads}, Last read: {last_plate_time}")
-            
-        elif data_type == 'alpr_group':
-            # Process license plate data
+    elif data_type == 'alpr_group':
+        # Process license plate data
+        with ingest_stage_seconds.time('parse'):
             parsed_data = parse_license_plate_data(json_data)
-            
-            if parsed_data and parsed_data.get('license_plate'):
-                if not plate_deduper.should_record(json_data):
-                    log_event(f"Suppressing duplicate ALPR event: {parsed_data.get('license_plate')}")
-                    return jsonify({'status': 'suppressed', 'message': 'Duplicate ALPR event suppressed'}), 200
+        
+        if parsed_data and parsed_data.get('license_plate'):
+            with ingest_stage_seconds.time('dedup'):
+                duplicate = not plate_deduper.should_record(json_data)
+                match = None
+                if not duplicate and near_duplicate_filter is not None:
+                    match = near_duplicate_filter.check(parsed_data.get('camera_id'), parsed_data['license_plate'])
+
+            if duplicate:
+                ingest_counters.increment('suppressed_duplicates')
+                log_event(f"Suppressing duplicate ALPR event: {parsed_data.get('license_plate')}")
+                return 'suppressed', 'Duplicate ALPR event suppressed'
 
-                plate_deduper.mark_recorded(json_data, parsed_data)
+            if match is not None:
+                ingest_counters.increment('suppressed_near_duplicates')
+                log_event(f"Suppressing near-duplicate ALPR event: {parsed_data['license_plate']} (matches {match})")
+                return 'suppressed', f'Near-duplicate of {match} suppressed'
+
+            # Build everything before recording anything, so a payload that fails here can be
+            # delivered again rather than being suppressed as a duplicate
+            try:
+                event_key = plate_deduper.event_key(json_data)
+                if event_key:
+                    parsed_data['event_key'] = event_key
 
                 # Save plate image
-                image_filename = save_plate_image(json_data)
+                with ingest_stage_seconds.time('image'):
+                    image_filename = save_plate_image(json_data, key=event_key)
                 if image_filename:
                     parsed_data['image_filename'] = image_filename
-                
-                # Save parsed data
-                with open(PARSED_OUTPUT_FILE, 'a') as f:
-                    f.write(json.dumps(parsed_data) + '\n')
-                
-                # Log plate detection
+                    stored_images[json_data['best_plate']['plate_crop_jpeg']] = image_filename
+
+                parsed_line = json_codec.dumps(parsed_data) + '\n'
+
                 plate = parsed_data['license_plate']
                 state = parsed_data['state_region'] or 'Unknown'
-                confidence = parsed_data.get('confidence', 0)
-                image_msg = f" (Image: {image_filename})" if image_filename else ""
-
-                # Send plate data to MQTT
-                # Get the time
-                mst = pytz.timezone("America/Denver")
-                dt = datetime.now()
-                offset = mst.utcoffset(dt).total_seconds() / 60 / 60
-                offset_sign = "-" if offset < 0 else "+"
-                offset_val = int(abs(offset))
-                if (offset_val < 10):
-                    offset_string = f"{offset_sign}0{offset_val}"
-                else:
-                    offset_string = f"{offset_sign}{offset_val}"
-
-                sampleTime = datetime.today()
-                sampleTime = sampleTime.strftime("%Y-%m-%d %H:%M:%S.%f{}".format(offset_string))
-
-                # Build the message
-                mqttmsg = {
-                    "timestamp": sampleTime,
-                    "sensor_id": env_config.get("alpr_sensor_id"),
-                    "metric_id": env_config.get("alpr_metric_id"),
-                    "plate": plate,
-                    "state": state
-                }
-
-                # Send the message
-                if mqtt_online:
-                    mqtt_conn.transmit_message(json.dumps(mqttmsg))
-                
-                log_event(f"LICENSE PLATE - {plate} ({state}) - {confidence:.1f}% confidence{image_msg}")
-            else:
-                log_event("alpr_group received but no valid license plate data found")
+                confidence = parsed_data.get('confidence') or 0
+                mqtt_message = build_mqtt_message(plate, state)
+            except Exception:
+                plate_deduper.release(json_data)
+                if near_duplicate_filter is not None:
+                    near_duplicate_filter.release(parsed_data.get('camera_id'), parsed_data['license_plate'])
+                raise
+
+            plate_deduper.mark_recorded(json_data, parsed_data)
+
+            # Save parsed data
+            batch.parsed_lines.append(parsed_line)
+            batch.parsed_records.append(parsed_data)
+            ingest_counters.increment('parsed_plates')
+            ingest_counters.increment('data_bytes_written', len(parsed_line))
+
+            # Send plate data to MQTT
+            batch.mqtt_messages.append(mqtt_message)
+
+            # Log plate detection
+            image_msg = f" (Image: {image_filename})" if image_filename else ""
+            log_event(f"LICENSE PLATE - {plate} ({state}) - {confidence:.1f}% confidence{image_msg}")
         else:
-            log_event(f"Received data type: {data_type}")
-        
-        return jsonify({'status': 'success', 'message': 'Data received and processed'}), 200
+            log_event("alpr_group received but no valid license plate data found")
+    else:
+        log_event(f"Received data type: {data_type}")
+
+    return 'success', 'Data received and processed'
+
+@app.route('/alpr', methods=['POST'])
+def receive_alpr_data():
+    """Receive and process ALPR data from openALPR"""
+    try:
+        # Decode the body directly rather than through request.get_json(), keeping the bytes
+        # so the raw line can be written from them
+        body = request.get_data()
+        try:
+            with ingest_stage_seconds.time('decode'):
+                json_data = json_codec.loads(body) if body.strip() else None
+        except ValueError as e:
+            payloads_total.inc('other', 'error')
+            return jsonify({'error': f'Invalid JSON: {e}'}), 400
+        if json_data is None:
+            return jsonify({'error': 'No JSON data received'}), 400
+        if not isinstance(json_data, dict):
+            payloads_total.inc('other', 'error')
+            return jsonify({'error': 'Payload is not a JSON object'}), 400
+
+        # The raw line is committed even if processing fails, so the payload isn't lost
+        batch = IngestBatch()
+        try:
+            status, message = ingest_payload(json_data, batch, body)
+        finally:
+            batch.commit()
+        return jsonify({'status': status, 'message': message}), 200
         
     except Exception as e:
         log_event(f"Error processing request: {e}")
         return jsonify({'error': str(e)}), 500
 
+def parse_batch_body(body):
+    """Decode a batch request body: a JSON array, a single JSON object or NDJSON.
+
+    Returns ``(item, item_body)`` pairs, where ``item_body`` holds the item's own bytes when
+    the body format has them (a single object or NDJSON) and None otherwise.
+    """
+    text = body.decode('utf-8').strip()
+    if not text:
+        return []
+    try:
+        payload = json_codec.loads(text)
+        if isinstance(payload, list):
+            return [(item, None) for item in payload]
+        return [(payload, body)]
+    except json.JSONDecodeError:
+        pass
+
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append((json_codec.loads(line), line.encode('utf-8')))
+        except json.JSONDecodeError as e:
+            items.append((e, None))
+    return items
+
+@app.route('/alpr/batch', methods=['POST'])
+def receive_alpr_batch():
+    """Receive many ALPR payloads at once, as a JSON array or newline-delimited JSON.
+
+    Every item is processed exactly like a POST to /alpr, but the file appends and MQTT
+    messages for the whole batch are queued together. The response lists a status for each
+    item in request order.
+    """
+    try:
+        with ingest_stage_seconds.time('decode'):
+            items = parse_batch_body(request.get_data())
+    except UnicodeDecodeError as e:
+        return jsonify({'error': f'Invalid request body: {e}'}), 400
+    if not items:
+        return jsonify({'error': 'No JSON data received'}), 400
+
+    batch = IngestBatch()
+    results = []
+    counts = defaultdict(int)
+    for index, (item, item_body) in enumerate(items):
+        if isinstance(item, Exception):
+            status, message = 'error', f'Invalid JSON: {item}'
+            payloads_total.inc('other', 'error')
+        elif not isinstance(item, dict):
+            status, message = 'error', 'Item is not a JSON object'
+            payloads_total.inc('other', 'error')
+        else:
+            try:
+                status, message = ingest_payload(item, batch, item_body)
+            except Exception as e:
+                log_event(f"Error processing batch item {index}: {e}")
+                status, message = 'error', str(e)
+        counts[status] += 1
+        results.append({'index': index, 'status': status, 'message': message})
+
+    try:
+        batch.commit()
+    except Exception as e:
+        log_event(f"Error committing batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    log_event(f"Batch received: {len(items)} items ({counts['success']} processed, {counts['suppressed']} suppressed, {counts['error']} errors)")
+    return jsonify({'status': 'success', 'total': len(items), 'counts': dict(counts), 'results': results}), 200
+
 # =====================================================================================
 # WEB ROUTES - Dashboard and UI
 # =====================================================================================
@@ -273,75 +664,157 @@ def receive_alpr_data():
 @app.route('/dashboard')
 def dashboard():
     """Display ALPR dashboard"""
-    return render_template('dashboard.html', vin_enabled=VIN_ENABLED)
+    return render_template('dashboard.html', vin_enabled=VIN_ENABLED, workers=WORKERS)
+
+# Bumped when an /api/ response changes incompatibly; sent as X-API-Version and in /health.
+# 2: the bare /api/plates list holds only the newest plate_query_max_limit records, and the
+#    object response includes ``total`` only when asked for with total=1
+API_VERSION = 2
+
+PLATE_QUERY_PARAMS = ('cursor', 'since', 'until', 'limit', 'page', 'order', 'camera_id', 'region', 'fields', 'total')
+# Largest page /api/plates returns (and the size of its default list); bigger limits are clamped to it
+PLATE_QUERY_MAX_LIMIT = config.get('plate_query_max_limit', 1000)
 
 @app.route('/api/plates')
 def get_plates():
-    """API endpoint to get all plate data"""
-    plates = []
+    """API endpoint to get plate data.
+
+    Without parameters the newest ``plate_query_max_limit`` records are returned as a list,
+    oldest first. Any of the query parameters
+    below switch to an object response of the form
+    ``{'plates': [...], 'cursor': ..., 'reset': ...}``:
+
+    - ``cursor``: only return records appended since this cursor (empty starts fresh)
+    - ``since`` / ``until``: time window, as ISO-8601 or epoch seconds
+    - ``limit`` / ``page`` / ``order``: pagination of the window (``order=desc`` for newest first);
+      both must be at least 1 and ``limit`` is capped at ``plate_query_max_limit``
+    - ``camera_id`` / ``region``: exact-match filters
+    - ``fields``: comma-separated list of fields to return for each record
+    - ``total=1``: also return ``total``, the number of matching records (after the cursor,
+      if one is given). Counting means visiting every match, so it is left out otherwise
+    """
     try:
-        if os.path.exists(PARSED_OUTPUT_FILE):
-            with open(PARSED_OUTPUT_FILE, 'r') as f:
-                for line in f:
-                    try:
-                        plates.append(json.loads(line.strip()))
-                    except json.JSONDecodeError:
-                        continue
+        if refresh_plates_on_read:
+            plate_index.refresh()
+        if not any(param in request.args for param in PLATE_QUERY_PARAMS):
+            newest = plate_index.query(limit=PLATE_QUERY_MAX_LIMIT, descending=True)['plates']
+            return jsonify(newest[::-1])
+
+        args = request.args
+        since = parse_timestamp(args.get('since'))
+        until = parse_timestamp(args.get('until'))
+        if (args.get('since') and since is None) or (args.get('until') and until is None):
+            return jsonify({'error': 'since/until must be ISO-8601 timestamps or epoch seconds'}), 400
+
+        try:
+            limit = int(args['limit']) if args.get('limit') else None
+            page = int(args.get('page', 1))
+        except ValueError:
+            return jsonify({'error': 'limit and page must be integers'}), 400
+        if (limit is not None and limit < 1) or page < 1:
+            return jsonify({'error': 'limit and page must be at least 1'}), 400
+        if limit is not None:
+            limit = min(limit, PLATE_QUERY_MAX_LIMIT)
+
+        fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+
+        return jsonify(plate_index.query(
+            since=since,
+            until=until,
+            camera_id=args.get('camera_id') or None,
+            region=args.get('region') or None,
+            fields=fields or None,
+            limit=limit,
+            page=page,
+            descending=args.get('order') == 'desc',
+            cursor=args.get('cursor'),
+            with_total=args.get('total', '').lower() in ('1', 'true', 'yes'),
+        ))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
-    return jsonify(plates)
 
 @app.route('/api/events')
 def get_recent_events():
-    """API endpoint to get recent events from log"""
-    events = []
+    """API endpoint to get recent events from log.
+
+    Returns the last 10 lines by default. With ``?after=<seq>`` it returns
+    ``{'events': [{'seq': ..., 'line': ...}], 'last_seq': ..., 'reset': ...}`` holding only the
+    lines logged after that sequence number (with several workers, a byte offset in the
+    shared event log, so the sequence is the same whichever worker answers).
+    """
+    after = request.args.get('after')
+    if after is None:
+        return jsonify(recent_events.tail(10))
+
     try:
-        if os.path.exists(EVENT_LOG_FILE):
-            with open(EVENT_LOG_FILE, 'r') as f:
-                lines = f.readlines()
-                # Get last 10 events
-                recent_lines = lines[-10:] if len(lines) > 10 else lines
-                events = [line.strip() for line in recent_lines if line.strip()]
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    
-    return jsonify(events)
+        after = int(after)
+    except ValueError:
+        return jsonify({'error': 'after must be an integer'}), 400
+
+    entries, reset = recent_events.after(after)
+    return jsonify({
+        'events': [{'seq': seq, 'line': line} for seq, line in entries],
+        'last_seq': entries[-1][0] if entries else (0 if reset else after),
+        'reset': reset,
+    })
+
+@app.route('/api/stream')
+def stream_events():
+    """Server-Sent Events stream of new plates ('plate') and event-log lines ('log').
 
-@app.route('/plates/<filename>')
+    Returns 503 once ``stream_max_subscribers`` streams are open; the dashboard then polls.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscriber = event_broadcaster.subscribe(last_event_id)
+    if subscriber is None:
+        return jsonify({'error': 'Too many open streams; poll /api/plates and /api/events instead'}), 503, {'Retry-After': '30'}
+    return Response(
+        event_broadcaster.stream(subscriber),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/plates/<path:filename>')
 def serve_plate_image(filename):
-    """Serve plate images"""
-    return send_from_directory(PLATES_DIR, filename)
+    """Serve plate images, by sharded path or by the bare file name older records use"""
+    return send_from_directory(PLATES_DIR, plate_store.resolve(filename) or filename)
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'vin_enabled': VIN_ENABLED}), 200
+    """Health check endpoint; 503 while the JSONL writer can't write (lines are kept for retry)"""
+    if not jsonl_writer.healthy:
+        writer = jsonl_writer.stats()
+        return jsonify({
+            'status': 'degraded',
+            'api_version': API_VERSION,
+            'vin_enabled': VIN_ENABLED,
+            'writer': {key: writer[key] for key in ('retry_pending', 'dropped', 'last_error')},
+        }), 503
+    return jsonify({'status': 'healthy', 'api_version': API_VERSION, 'vin_enabled': VIN_ENABLED}), 200
 
 @app.route('/stats', methods=['GET'])
 def get_stats():
-    """Get basic statistics about processed data"""
+    """Get basic statistics about processed data.
+
+    Counters belong to the worker process that answers; ``worker`` says which one.
+    """
     try:
-        # Count records in files
-        raw_count = 0
-        parsed_count = 0
-        image_count = 0
-        
-        if os.path.exists(RAW_OUTPUT_FILE):
-            with open(RAW_OUTPUT_FILE, 'r') as f:
-                raw_count = sum(1 for line in f)
-        
-        if os.path.exists(PARSED_OUTPUT_FILE):
-            with open(PARSED_OUTPUT_FILE, 'r') as f:
-                parsed_count = sum(1 for line in f)
-        
-        if os.path.exists(PLATES_DIR):
-            image_count = len([f for f in os.listdir(PLATES_DIR) if f.endswith('.jpg')])
-        
-        return jsonify({
-            'raw_records': raw_count,
-            'parsed_plates': parsed_count,
-            'plate_images': image_count,
+        stats = ingest_counters.snapshot()
+        stats['worker'] = {'id': WORKER_ID, 'workers': WORKERS}
+        stats['writer'] = jsonl_writer.stats()
+        stats['mqtt'] = mqtt_conn.stats()
+        stats['dedup'] = plate_deduper.stats()
+        if near_duplicate_filter is not None:
+            stats['dedup']['near_duplicates'] = near_duplicate_filter.stats()
+        if VIN_ENABLED:
+            stats['vin_jobs'] = vin_jobs.stats()
+            stats['vin_client'] = vin_client.stats()
+        stats.update({
             'vin_enabled': VIN_ENABLED,
             'files': {
                 'raw_data': RAW_OUTPUT_FILE,
@@ -349,100 +822,133 @@ def get_stats():
                 'event_log': EVENT_LOG_FILE,
                 'plates_directory': PLATES_DIR
             }
-        }), 200
+        })
+        return jsonify(stats), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@metrics.collector
+def collect_component_metrics():
+    """Queue depths and component statistics, read when /metrics is scraped"""
+    writer = jsonl_writer.stats()
+    mqtt = mqtt_conn.stats()
+    dedup = plate_deduper.stats()
+    families = [
+        ('alpr_writer_queue_depth', 'gauge', 'Lines waiting for the JSONL writer', [({}, writer['queue_depth'])]),
+        ('alpr_writer_records_total', 'counter', 'Lines written by the JSONL writer', [({}, writer['records'])]),
+        ('alpr_writer_fsyncs_total', 'counter', 'fsync calls made by the JSONL writer', [({}, writer['fsyncs'])]),
+        ('alpr_writer_errors_total', 'counter', 'Failed JSONL writes and fsyncs', [({}, writer['errors'])]),
+        ('alpr_writer_retry_pending', 'gauge', 'Lines whose write failed, waiting for a retry', [({}, writer['retry_pending'])]),
+        ('alpr_writer_dropped_total', 'counter', 'Lines dropped after the retry buffer filled', [({}, writer['dropped'])]),
+        ('alpr_mqtt_online', 'gauge', 'Whether the MQTT broker is connected', [({}, mqtt['online'])]),
+        ('alpr_mqtt_queue_depth', 'gauge', 'MQTT messages queued in memory', [({}, mqtt['queue_depth'])]),
+        ('alpr_mqtt_in_flight', 'gauge', 'MQTT messages published but not yet acknowledged', [({}, mqtt['in_flight'])]),
+        ('alpr_mqtt_spooled', 'gauge', 'MQTT messages waiting in the spool file', [({}, mqtt['spooled'])]),
+        ('alpr_mqtt_published_total', 'counter', 'MQTT messages published', [({}, mqtt['published'])]),
+        ('alpr_mqtt_acked_total', 'counter', 'MQTT messages acknowledged by the broker', [({}, mqtt['acked'])]),
+        ('alpr_mqtt_dropped_total', 'counter', 'MQTT messages dropped', [({}, mqtt['dropped'])]),
+        ('alpr_dedup_keys', 'gauge', 'Event keys remembered for duplicate suppression', [({}, dedup['size'])]),
+        ('alpr_stream_subscribers', 'gauge', 'Clients connected to the live event stream',
+         [({}, event_broadcaster.subscriber_count)]),
+        ('alpr_stream_rejected_total', 'counter', 'Stream connections refused at stream_max_subscribers',
+         [({}, event_broadcaster.rejected_subscribers)]),
+    ]
+    for field, value in ingest_counters.snapshot().items():
+        families.append((f'alpr_ingest_{field}_total', 'counter', f'Ingest counter {field} (kept across restarts)', [({}, value)]))
+    if VIN_ENABLED:
+        vin = vin_jobs.stats()
+        families.append(('alpr_vin_queued_lookups', 'gauge', 'VIN lookups waiting for a worker', [({}, vin['queued_lookups'])]))
+        families.append(('alpr_vin_active_jobs', 'gauge', 'VIN lookup jobs still running', [({}, vin['active_jobs'])]))
+    return families
+
+@app.route('/metrics')
+def get_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
 # =====================================================================================
 # VIN LOOKUP FUNCTIONALITY (Only if enabled)
 # =====================================================================================
 
 if VIN_ENABLED:
-    def load_existing_vin_results():
-        """Load existing VIN lookup results"""
-        try:
-            if os.path.exists(VIN_RESULTS_FILE):
-                with open(VIN_RESULTS_FILE, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            log_event(f"Error loading VIN results: {e}")
-        return {}
+    # Results are cached in memory and logged incrementally; the old JSON file is imported once
+    vin_store = VinResultStore(VIN_STORE_FILE, legacy_file=VIN_RESULTS_FILE)
 
-    def save_vin_results(results):
-        """Save VIN lookup results to file"""
-        try:
-            with open(VIN_RESULTS_FILE, 'w') as f:
-                json.dump(results, f, indent=2)
-            return True
-        except Exception as e:
-            log_event(f"Error saving VIN results: {e}")
-            return False
+    # One pooled, retrying client for the lookup service, with a result cache in front of it
+    vin_client = VinClient(
+        VIN_API_KEY,
+        url=config.get('vin_api_url', DEFAULT_VIN_URL),
+        read_timeout=config.get('vin_timeout_seconds', 15),
+        max_retries=config.get('vin_max_retries', 3),
+        pool_size=config.get('vin_workers', 2),
+        hit_ttl=config.get('vin_cache_hit_ttl_seconds', 30 * 86400),
+        not_found_ttl=config.get('vin_cache_not_found_ttl_seconds', 7 * 86400),
+        error_ttl=config.get('vin_cache_error_ttl_seconds', 300),
+        # Retries count against the same rate limit as first attempts
+        before_retry=lambda: vin_jobs.limiter.acquire(),
+    )
 
     def lookup_vin_for_plate(license_plate, state):
         """Perform VIN lookup for a single plate"""
-        url = 'https://platetovin.com/api/convert'
-        payload = {"state": state, "plate": license_plate}
-        headers = {
-            'Authorization': VIN_API_KEY,
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
+        return vin_client.lookup(license_plate, state)
 
+    def vin_result_is_fresh(entry):
+        """Whether a stored result is recent enough to reuse instead of looking the plate up again"""
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
+            looked_up_at = datetime.fromisoformat(entry['lookup_timestamp'])
+        except (KeyError, TypeError, ValueError):
+            looked_up_at = None
+        return vin_client.is_fresh(entry.get('vin_lookup') or {}, looked_up_at)
+
+    def run_vin_lookup(plate_info):
+        """Look up one plate and build the result entry stored for it (runs on a VIN worker)"""
+        license_plate = plate_info['license_plate']
+        state = plate_info['state']
+        log_event(f"VIN Lookup: {license_plate} ({state})")
+        vin_data = lookup_vin_for_plate(license_plate, state)
+        return {
+            'license_plate': license_plate,
+            'state': state,
+            'original_region': plate_info.get('original_region'),
+            'confidence': plate_info.get('confidence'),
+            'camera_id': plate_info.get('camera_id'),
+            'timestamp': plate_info.get('timestamp'),
+            'vin_lookup': vin_data,
+            'lookup_timestamp': datetime.now().isoformat()
+        }
+
+    # Lookups run on background workers behind a shared rate limit; results are saved as they finish
+    vin_jobs = VinJobQueue(
+        run_vin_lookup,
+        vin_store,
+        workers=config.get('vin_workers', 2),
+        rate=config.get('vin_requests_per_second', 2.0),
+        burst=config.get('vin_burst', 1),
+        is_fresh=vin_result_is_fresh,
+    )
 
     def get_unique_plates_from_data():
         """Get unique license plates from parsed ALPR data"""
-        unique_plates = defaultdict(lambda: {
-            'state': None, 'confidence': 0, 'camera_id': None, 
-            'timestamp': None, 'image_filename': None
-        })
-        
-        try:
-            if os.path.exists(PARSED_OUTPUT_FILE):
-                with open(PARSED_OUTPUT_FILE, 'r') as f:
-                    for line in f:
-                        try:
-                            data = json.loads(line.strip())
-                            license_plate = data.get('license_plate')
-                            state_region = data.get('state_region')
-                            confidence = data.get('confidence', 0)
-                            
-                            if license_plate and state_region:
-                                # Extract state code from region
-                                state_code = state_region.split('-')[-1].upper() if '-' in state_region else state_region.upper()
-                                
-                                # Keep entry with highest confidence for each plate
-                                if confidence > unique_plates[license_plate]['confidence']:
-                                    unique_plates[license_plate] = {
-                                        'state': state_code,
-                                        'confidence': confidence,
-                                        'camera_id': data.get('camera_id'),
-                                        'timestamp': data.get('timestamp'),
-                                        'original_region': state_region,
-                                        'image_filename': data.get('image_filename')
-                                    }
-                                    
-                        except json.JSONDecodeError:
-                            continue
-        except Exception as e:
-            log_event(f"Error loading plates data: {e}")
-        
-        # Convert to list format
-        return [{
-            'license_plate': plate,
-            'state': info['state'],
-            'confidence': info['confidence'],
-            'camera_id': info['camera_id'],
-            'timestamp': info['timestamp'],
-            'original_region': info['original_region'],
-            'image_filename': info['image_filename']
-        } for plate, info in unique_plates.items()]
+        unique_plates = []
+        # Highest-confidence read of each plate, from the aggregate kept up to date by ingest
+        for summary in plate_aggregate.plates():
+            state_region = summary['state_region']
+            # Extract state code from region
+            state_code = state_region.split('-')[-1].upper() if '-' in state_region else state_region.upper()
+            unique_plates.append({
+                'license_plate': summary['license_plate'],
+                'state': state_code,
+                'confidence': summary['confidence'],
+                'camera_id': summary['camera_id'],
+                'timestamp': summary['timestamp'],
+                'original_region': state_region,
+                'image_filename': summary['image_filename'],
+                'first_seen': summary['first_seen'],
+                'last_seen': summary['last_seen'],
+                'sightings': summary['sightings']
+            })
+        return unique_plates
 
     # =====================================================================================
     # VIN LOOKUP API ROUTES (Only if enabled)
@@ -452,36 +958,45 @@ if VIN_ENABLED:
     def vin_page():
         """Display VIN lookup page"""
         plates = get_unique_plates_from_data()
-        existing_results = load_existing_vin_results()
         
-        # Mark plates that already have VIN data
+        # Mark plates that already have VIN data (one index lookup per plate)
         for plate in plates:
-            license_plate = plate['license_plate']
-            original_state = plate['state']
-            plate_key = f"{license_plate}_{original_state}"
+            results_by_state = vin_store.for_plate(plate['license_plate'])
             
             # Check if VIN data exists
-            if plate_key in existing_results:
+            if plate['state'] in results_by_state:
+                plate['has_vin_data'] = True
+                plate['vin_data'] = results_by_state[plate['state']]
+            elif results_by_state:
+                # Plate was looked up with a different state
+                state, vin_result = next(iter(results_by_state.items()))
                 plate['has_vin_data'] = True
-                plate['vin_data'] = existing_results[plate_key]
+                plate['vin_data'] = vin_result
+                plate['state'] = state
             else:
-                # Check if plate exists with different state
                 plate['has_vin_data'] = False
-                for vin_key, vin_result in existing_results.items():
-                    if vin_key.startswith(f"{license_plate}_"):
-                        plate['has_vin_data'] = True
-                        plate['vin_data'] = vin_result
-                        plate['state'] = vin_key.split('_', 1)[1]
-                        break
         
         return render_template('vin.html', 
                               plates=plates,
                               total_plates=len(plates),
                               plates_with_vin=len([p for p in plates if p['has_vin_data']]))
 
+    def refuse_with_several_workers():
+        """VIN jobs, results and the client cache live in each worker process, so a change made
+        by one worker would not reach the others: routes that change them refuse with 409."""
+        return jsonify({'error': 'VIN lookups and clearing VIN data need a single worker process; run serve.py --workers 1'}), 409
+
     @app.route('/api/vin/lookup', methods=['POST'])
     def api_vin_lookup():
-        """API endpoint to perform VIN lookups for selected plates"""
+        """API endpoint to queue VIN lookups for selected plates.
+
+        Returns 202 with a job id right away; progress and results are available from
+        /api/vin/jobs/<job_id> as the background workers finish each plate. Jobs live in the
+        worker process that queued them, so with several workers lookups are refused (409)
+        rather than leaving the job's progress to whichever worker the poll reaches.
+        """
+        if MULTI_WORKER:
+            return refuse_with_several_workers()
         try:
             data = request.get_json()
             selected_plates = data.get('plates', [])
@@ -489,73 +1004,28 @@ if VIN_ENABLED:
             if not selected_plates:
                 return jsonify({'error': 'No plates selected'}), 400
             
-            existing_results = load_existing_vin_results()
-            results = []
-            new_lookups = 0
-            
-            for plate_info in selected_plates:
-                license_plate = plate_info['license_plate']
-                state = plate_info['state']
-                plate_key = f"{license_plate}_{state}"
-                
-                # Check existing results
-                if plate_key in existing_results:
-                    results.append({
-                        'license_plate': license_plate,
-                        'state': state,
-                        'status': 'existing',
-                        'data': existing_results[plate_key]
-                    })
-                    continue
-                
-                # Perform new lookup
-                log_event(f"VIN Lookup: {license_plate} ({state})")
-                vin_data = lookup_vin_for_plate(license_plate, state)
-                
-                # Create result entry
-                result_entry = {
-                    'license_plate': license_plate,
-                    'state': state,
-                    'original_region': plate_info.get('original_region'),
-                    'confidence': plate_info.get('confidence'),
-                    'camera_id': plate_info.get('camera_id'),
-                    'timestamp': plate_info.get('timestamp'),
-                    'vin_lookup': vin_data,
-                    'lookup_timestamp': datetime.now().isoformat()
-                }
-                
-                existing_results[plate_key] = result_entry
-                results.append({
-                    'license_plate': license_plate,
-                    'state': state,
-                    'status': 'success' if 'error' not in vin_data else 'error',
-                    'data': result_entry
-                })
-                
-                new_lookups += 1
-                time.sleep(0.5)  # Rate limiting
-            
-            # Save results
-            if save_vin_results(existing_results):
-                log_event(f"VIN Lookup completed: {new_lookups} new, {len(results)} total")
-                return jsonify({
-                    'status': 'success',
-                    'results': results,
-                    'new_lookups': new_lookups,
-                    'total_results': len(results)
-                })
-            else:
-                return jsonify({'error': 'Failed to save results'}), 500
+            job = vin_jobs.submit(selected_plates)
+            status = vin_jobs.get(job.id)
+            log_event(f"VIN Lookup queued: job {job.id}, {status['total']} plates ({status['completed']} already known)")
+            return jsonify({'status': 'queued', **status}), 202
                 
         except Exception as e:
             log_event(f"Error in VIN lookup: {e}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/vin/jobs/<job_id>')
+    def api_vin_job_status(job_id):
+        """API endpoint to get the progress and results of a VIN lookup job"""
+        status = vin_jobs.get(job_id)
+        if status is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        return jsonify(status)
+
     @app.route('/api/vin/results')
     def api_vin_results():
         """API endpoint to get all VIN lookup results"""
         try:
-            return jsonify(load_existing_vin_results())
+            return jsonify(vin_store.all())
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -569,11 +1039,10 @@ if VIN_ENABLED:
             if not license_plate or not state:
                 return jsonify({'error': 'Both plate and state parameters required'}), 400
             
-            existing_results = load_existing_vin_results()
-            plate_key = f"{license_plate}_{state}"
+            vin_data = vin_store.get(f"{license_plate}_{state}")
             
-            if plate_key in existing_results:
-                return jsonify({'status': 'success', 'vin_data': existing_results[plate_key]})
+            if vin_data is not None:
+                return jsonify({'status': 'success', 'vin_data': vin_data})
             else:
                 return jsonify({'status': 'error', 'error': 'No VIN data found'}), 404
                 
@@ -584,6 +1053,8 @@ if VIN_ENABLED:
     @app.route('/api/vin/clear', methods=['POST'])
     def api_clear_vin_data():
         """API endpoint to clear VIN data for selected plates"""
+        if MULTI_WORKER:
+            return refuse_with_several_workers()
         try:
             data = request.get_json()
             plates_to_clear = data.get('plates', [])
@@ -591,32 +1062,23 @@ if VIN_ENABLED:
             if not plates_to_clear:
                 return jsonify({'error': 'No plates specified'}), 400
             
-            existing_results = load_existing_vin_results()
-            cleared_count = 0
-            not_found_count = 0
-            
+            plate_keys = [f"{plate_info['license_plate']}_{plate_info['state']}" for plate_info in plates_to_clear]
+            removed = vin_store.delete(plate_keys)
             for plate_info in plates_to_clear:
-                license_plate = plate_info['license_plate']
-                state = plate_info['state']
-                plate_key = f"{license_plate}_{state}"
-                
-                if plate_key in existing_results:
-                    del existing_results[plate_key]
-                    cleared_count += 1
-                    log_event(f"Cleared VIN data: {license_plate} ({state})")
-                else:
-                    not_found_count += 1
-            
-            if save_vin_results(existing_results):
-                log_event(f"VIN data cleared: {cleared_count} plates")
-                return jsonify({
-                    'status': 'success',
-                    'cleared_count': cleared_count,
-                    'not_found_count': not_found_count,
-                    'message': f'Cleared VIN data for {cleared_count} plates'
-                })
-            else:
-                return jsonify({'error': 'Failed to save updated results'}), 500
+                vin_client.forget(plate_info['license_plate'], plate_info['state'])
+            for plate_key in removed:
+                license_plate, state = vin_store.split_key(plate_key)
+                log_event(f"Cleared VIN data: {license_plate} ({state})")
+            cleared_count = len(removed)
+            not_found_count = len(plate_keys) - cleared_count
+
+            log_event(f"VIN data cleared: {cleared_count} plates")
+            return jsonify({
+                'status': 'success',
+                'cleared_count': cleared_count,
+                'not_found_count': not_found_count,
+                'message': f'Cleared VIN data for {cleared_count} plates'
+            })
                 
         except Exception as e:
             log_event(f"Error clearing VIN data: {e}")
@@ -625,12 +1087,13 @@ if VIN_ENABLED:
     @app.route('/api/vin/clear_all', methods=['POST'])
     def api_clear_all_vin_data():
         """API endpoint to clear all VIN data"""
+        if MULTI_WORKER:
+            return refuse_with_several_workers()
         try:
-            if save_vin_results({}):
-                log_event("All VIN data cleared")
-                return jsonify({'status': 'success', 'message': 'All VIN data cleared'})
-            else:
-                return jsonify({'error': 'Failed to clear VIN data'}), 500
+            vin_store.clear()
+            vin_client.clear_cache()
+            log_event("All VIN data cleared")
+            return jsonify({'status': 'success', 'message': 'All VIN data cleared'})
                 
         except Exception as e:
             log_event(f"Error clearing all VIN data: {e}")
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # faster JSON is optional
+    orjson = None
+
+CODECS = ('auto', 'orjson', 'json')
+
+
+class JsonCodec:
+    """The standard library ``json`` module behind a small interface.
+
+    ``loads`` accepts bytes or text; ``dumps`` returns text in the compact form that suits
+    one-record-per-line files.
+    """
+
+    name = 'json'
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, value: Any) -> str:
+        return json.dumps(value)
+
+
+class OrjsonCodec(JsonCodec):
+    """:class:`JsonCodec` backed by ``orjson``.
+
+    Input orjson rejects (e.g. ``NaN`` literals or integers wider than 64 bits) is handed to
+    the standard library, so both codecs accept the same payloads and raise the same errors.
+    """
+
+    name = 'orjson'
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+
+    def dumps(self, value: Any) -> str:
+        try:
+            return orjson.dumps(value).decode('utf-8')
+        except TypeError:
+            return json.dumps(value)
+
+
+def get_codec(name: str = 'auto') -> JsonCodec:
+    """Return the codec called ``name``; ``auto`` picks orjson when it is installed."""
+    if name not in CODECS:
+        raise ValueError(f"json codec must be one of {', '.join(CODECS)}")
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("The orjson codec needs the 'orjson' package")
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        return OrjsonCodec()
+    return JsonCodec()
+
+
+def raw_line(body: bytes, extra: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Return the JSON object in ``body`` as one line of text, without re-serializing it.
+
+    JSON strings can't contain literal line breaks, so dropping them from the body keeps it
+    valid and puts it on one line. ``extra`` keys (which must not already be in the object)
+    are appended. Returns None if the body isn't UTF-8 text holding an object.
+    """
+    try:
+        text = body.decode('utf-8').strip()
+    except UnicodeDecodeError:
+        return None
+    if not (text.startswith('{') and text.endswith('}')):
+        return None
+    if '\n' in text or '\r' in text:
+        text = text.replace('\r', '').replace('\n', '')
+    if extra:
+        inner = text[1:-1].strip()
+        fields = ', '.join(f'{json.dumps(key)}: {json.dumps(value)}' for key, value in extra.items())
+        text = '{' + (f'{inner}, ' if inner else '') + fields + '}'
+    return text + '\n'
+
+
+# =====================================================================================
+# Rekor Scout payloads
+# =====================================================================================
+
+def _dict(value: Any) -> dict:
+    return value if isinstance(value, dict) else {}
+
+
+def _top(candidates: Any) -> dict:
+    """Return the first (most likely) candidate of a vehicle attribute list."""
+    if isinstance(candidates, list) and candidates and isinstance(candidates[0], dict):
+        return candidates[0]
+    return {}
+
+
+class BestPlate:
+    """The ``best_plate`` of an ``alpr_group``: the highest confidence read of the group."""
+
+    __slots__ = (
+        'plate', 'confidence', 'region', 'region_confidence',
+        'processing_time_ms', 'coordinates', 'plate_crop_jpeg',
+    )
+
+    def __init__(self, data: dict):
+        self.plate = data.get('plate')
+        self.confidence = data.get('confidence')
+        self.region = data.get('region')
+        self.region_confidence = data.get('region_confidence')
+        self.processing_time_ms = data.get('processing_time_ms')
+        self.coordinates = data.get('coordinates')
+        self.plate_crop_jpeg = data.get('plate_crop_jpeg')
+
+
+class VehicleInfo:
+    """The top candidate for each vehicle attribute Rekor Scout reports."""
+
+    __slots__ = ('color', 'color_confidence', 'make', 'make_confidence', 'body_type', 'year_range')
+
+    def __init__(self, data: dict):
+        color = _top(data.get('color'))
+        make = _top(data.get('make'))
+        self.color = color.get('name')
+        self.color_confidence = color.get('confidence')
+        self.make = make.get('name')
+        self.make_confidence = make.get('confidence')
+        self.body_type = _top(data.get('body_type')).get('name')
+        self.year_range = _top(data.get('year')).get('name')
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class AlprGroup:
+    """An ``alpr_group`` payload: one vehicle seen by one camera."""
+
+    __slots__ = (
+        'timestamp', 'camera_id', 'travel_direction', 'is_parked',
+        'best_uuid', 'best_plate', 'vehicle',
+    )
+
+    def __init__(self, data: dict):
+        self.timestamp = data.get('timestamp')
+        self.camera_id = data.get('camera_id')
+        self.travel_direction = data.get('travel_direction')
+        self.is_parked = data.get('is_parked')
+        self.best_uuid = data.get('best_uuid')
+        self.best_plate = BestPlate(_dict(data.get('best_plate')))
+        self.vehicle = VehicleInfo(_dict(data.get('vehicle')))
+
+    def to_record(self) -> dict:
+        """Return the parsed record written to the parsed JSONL file."""
+        best_plate = self.best_plate
+        return {
+            'timestamp': self.timestamp,
+            'license_plate': best_plate.plate,
+            'confidence': best_plate.confidence,
+            'state_region': best_plate.region,
+            'region_confidence': best_plate.region_confidence,
+            'camera_id': self.camera_id,
+            'processing_time_ms': best_plate.processing_time_ms,
+            'coordinates': best_plate.coordinates,
+            'travel_direction': self.travel_direction,
+            'is_parked': self.is_parked,
+            'vehicle_info': self.vehicle.to_dict(),
+            'uuid': self.best_uuid,
+        }
+
+
+class Heartbeat:
+    """A ``heartbeat`` payload, reduced to the totals across its video streams."""
+
+    __slots__ = ('timestamp', 'total_plate_reads', 'last_plate_read')
+
+    def __init__(self, data: dict):
+        streams: List[dict] = [stream for stream in data.get('video_streams') or [] if isinstance(stream, dict)]
+        self.timestamp = data.get('timestamp')
+        self.total_plate_reads = sum(stream.get('total_plate_reads', 0) for stream in streams)
+        # Epoch milliseconds of the most recent plate read on any stream, 0 if none
+        self.last_plate_read = max((stream.get('last_plate_read', 0) for stream in streams), default=0)
@@ -0,0 +1,112 @@
+"""
+Microbenchmark of the per-request decode/encode work on the /alpr path.
+
+Compares, for a synthetic alpr_group payload with an embedded plate crop:
+
+- before:    json.loads of the body, the old dict-chain parse_license_plate_data, and
+             json.dumps for both the raw and the parsed line
+- json:      the typed AlprGroup model, raw line from the request bytes, stdlib codec
+- orjson:    the same with the orjson codec (if installed)
+
+Only CPU time of this work is measured (time.process_time), not Flask or file I/O.
+
+Usage (from the server directory):
+    python benchmarks/bench_ingest_decode.py [--requests 20000] [--image-kb 12]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from alpr_payload import AlprGroup, get_codec, orjson, raw_line  # noqa: E402
+from synthetic import alpr_group, make_crop  # noqa: E402
+
+
+def make_payload(image_kb):
+    """Return the body of a representative alpr_group POST (without a timestamp, as Rekor sends it)"""
+    rng = random.Random(1)
+    return json.dumps(alpr_group('ABC123', 1361, 1760000000000, make_crop(rng, image_kb))).encode('utf-8')
+
+
+def legacy_parse(data):
+    """parse_license_plate_data as it was before the typed model"""
+    vehicle = data.get('vehicle', {})
+    return {
+        'timestamp': data.get('timestamp'),
+        'license_plate': data.get('best_plate', {}).get('plate'),
+        'confidence': data.get('best_plate', {}).get('confidence'),
+        'state_region': data.get('best_plate', {}).get('region'),
+        'region_confidence': data.get('best_plate', {}).get('region_confidence'),
+        'camera_id': data.get('camera_id'),
+        'processing_time_ms': data.get('best_plate', {}).get('processing_time_ms'),
+        'coordinates': data.get('best_plate', {}).get('coordinates'),
+        'travel_direction': data.get('travel_direction'),
+        'is_parked': data.get('is_parked'),
+        'vehicle_info': {
+            'color': vehicle.get('color', [{}])[0].get('name') if vehicle.get('color') else None,
+            'color_confidence': vehicle.get('color', [{}])[0].get('confidence') if vehicle.get('color') else None,
+            'make': vehicle.get('make', [{}])[0].get('name') if vehicle.get('make') else None,
+            'make_confidence': vehicle.get('make', [{}])[0].get('confidence') if vehicle.get('make') else None,
+            'body_type': vehicle.get('body_type', [{}])[0].get('name') if vehicle.get('body_type') else None,
+            'year_range': vehicle.get('year', [{}])[0].get('name') if vehicle.get('year') else None
+        },
+        'uuid': data.get('best_uuid')
+    }
+
+
+def before(body, timestamp):
+    data = json.loads(body)
+    data['timestamp'] = timestamp
+    parsed = legacy_parse(data)
+    return json.dumps(data) + '\n', json.dumps(parsed) + '\n'
+
+
+def make_after(codec):
+    def after(body, timestamp):
+        data = codec.loads(body)
+        data['timestamp'] = timestamp
+        parsed = AlprGroup(data).to_record()
+        return raw_line(body, {'timestamp': timestamp}), codec.dumps(parsed) + '\n'
+    return after
+
+
+def measure(function, body, requests):
+    timestamp = '2026-10-18T10:00:00.123456'
+    function(body, timestamp)  # warm up
+    start = time.process_time()
+    for _ in range(requests):
+        function(body, timestamp)
+    return (time.process_time() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000, help='requests per variant')
+    parser.add_argument('--image-kb', type=int, default=12, help='size of each embedded base64 image')
+    args = parser.parse_args()
+
+    body = make_payload(args.image_kb)
+    variants = [('before', before), ('json', make_after(get_codec('json')))]
+    if orjson is not None:
+        variants.append(('orjson', make_after(get_codec('orjson'))))
+
+    # Both paths must produce equivalent lines
+    reference = [json.loads(line) for line in before(body, 't')]
+    for name, function in variants[1:]:
+        assert [json.loads(line) for line in function(body, 't')] == reference, name
+
+    print(f"payload: {len(body)} bytes, {args.requests} requests per variant")
+    baseline = None
+    for name, function in variants:
+        cpu_us = measure(function, body, args.requests)
+        baseline = baseline or cpu_us
+        print(f"{name:>8}: {cpu_us:8.1f} us CPU/request  ({baseline / cpu_us:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
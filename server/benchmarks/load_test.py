@@ -0,0 +1,342 @@
+"""
+Ingest load test for /alpr.
+
+Starts the server in this process, in a scratch directory with its own config.yaml and a
+.env pointing at a stub MQTT broker, then posts synthetic Rekor payloads to /alpr and
+prints a JSON report (or writes it with --output) so runs can be compared across commits.
+
+Requests go through the Flask test client (--mode client) or over HTTP to a local server
+thread (--mode http); --url posts to an already running server instead (no stage breakdown).
+With --rate the requests are sent on a fixed schedule and latency is measured from each
+request's scheduled time, so falling behind shows up as latency; without it they are sent
+flat out by --concurrency threads.
+
+The report holds throughput, request latency percentiles and, for the in-process modes,
+the time spent in each ingest stage (decode, parse, dedup, image, raw_line, commit).
+
+Usage (from the server directory):
+    python benchmarks/load_test.py --requests 5000 --concurrency 4
+    python benchmarks/load_test.py --mode http --rate 200 --duration 30 --set plate_storage=sqlite
+"""
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import yaml
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, SERVER_DIR)
+
+from stub_broker import StubMqttBroker  # noqa: E402
+from synthetic import SyntheticPayloads  # noqa: E402
+
+# Stage name -> (attribute of the server module, method name or None for a function)
+STAGES = {
+    'decode': ('json_codec', 'loads'),
+    'parse': ('parse_license_plate_data', None),
+    'dedup': ('plate_deduper', 'should_record'),
+    'image': ('save_plate_image', None),
+    'raw_line': ('queue_raw_record', None),
+    'commit': ('IngestBatch', 'commit'),
+}
+
+
+def percentiles(samples):
+    """Summary of a list of durations in seconds, in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50': at(0.50),
+        'p95': at(0.95),
+        'p99': at(0.99),
+        'max': round(ordered[-1] * 1000, 3),
+    }
+
+
+class StageTimer:
+    """Wraps the server's ingest functions to record how long each call takes"""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+    def _timed(self, stage, function):
+        samples = self.samples[stage]
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+    def install(self, server):
+        for stage, (attribute, method) in STAGES.items():
+            target = getattr(server, attribute)
+            if method is None:
+                setattr(server, attribute, self._timed(stage, target))
+            else:
+                setattr(target, method, self._timed(stage, getattr(target, method)))
+
+    def reset(self):
+        for samples in self.samples.values():
+            samples.clear()
+
+    def report(self):
+        return {stage: percentiles(samples) for stage, samples in self.samples.items()}
+
+
+def prepare_workdir(workdir, broker, overrides):
+    """Write config.yaml (config.template plus overrides) and a .env using the stub broker"""
+    with open(os.path.join(SERVER_DIR, 'config.template'), 'r') as handle:
+        config = yaml.safe_load(handle)
+    config['integrated_server'].update(overrides)
+    with open(os.path.join(workdir, 'config.yaml'), 'w') as handle:
+        yaml.safe_dump(config, handle)
+    with open(os.path.join(workdir, '.env'), 'w') as handle:
+        handle.write(
+            f"mqtt_hostname='{broker.host}'\nmqtt_port='{broker.port}'\n"
+            "mqtt_username='load'\nmqtt_password='test'\nmqtt_sensor_topic='loadtest/sensor'\n"
+            "deployment_id='0'\nalpr_sensor_id='0'\nalpr_metric_id='0'\n"
+        )
+
+
+def parse_override(text):
+    key, _, value = text.partition('=')
+    return key, yaml.safe_load(value)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_http_server(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+    httpd = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=httpd.serve_forever, name='load-test-http', daemon=True).start()
+    return httpd, f'http://127.0.0.1:{httpd.server_port}/alpr'
+
+
+def make_sender(mode, app, url):
+    """Return a factory of per-thread ``send(body) -> status code`` functions"""
+    if mode == 'client':
+        def factory():
+            client = app.test_client()
+            return lambda body: client.post('/alpr', data=body, content_type='application/json').status_code
+        return factory
+
+    def factory():
+        session = requests.Session()
+        return lambda body: session.post(url, data=body, headers={'Content-Type': 'application/json'}).status_code
+    return factory
+
+
+def run_load(sender_factory, payloads, requests_total, duration, rate, concurrency):
+    """Send payloads from ``concurrency`` threads; returns latencies, status counts and elapsed time"""
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    kinds = {}
+    state = {'next': 0}
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def take():
+        with lock:
+            index = state['next']
+            if (requests_total and index >= requests_total) or (deadline and time.perf_counter() >= deadline):
+                return None
+            state['next'] += 1
+            return index, payloads.next()
+
+    def worker():
+        send = sender_factory()
+        while True:
+            item = take()
+            if item is None:
+                return
+            index, (kind, body) = item
+            if rate:
+                scheduled = start + index / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+            try:
+                status = send(body)
+            except requests.RequestException:
+                status = 'connection_error'
+            latency = time.perf_counter() - scheduled
+            with lock:
+                latencies.append(latency)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                kinds[kind] = kinds.get(kind, 0) + 1
+
+    threads = [threading.Thread(target=worker, name=f'load-{number}') for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, kinds, time.perf_counter() - start
+
+
+def wait_for_mqtt(server, timeout=10.0):
+    """Give the MQTT outbox a chance to drain so the broker count covers the run"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = server.mqtt_conn.stats()
+        if stats['online'] and not stats['queue_depth'] and not stats['in_flight'] and not stats['spooled']:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test for the /alpr ingest endpoint')
+    parser.add_argument('--mode', choices=('client', 'http'), default='client',
+                        help='Flask test client or HTTP to a local server thread')
+    parser.add_argument('--url', help='post to this running server instead (e.g. http://host:5000/alpr)')
+    parser.add_argument('--requests', type=int, default=2000, help='number of requests (0 with --duration)')
+    parser.add_argument('--duration', type=float, default=0, help='run for this many seconds instead')
+    parser.add_argument('--rate', type=float, default=0, help='requests per second (0 = flat out)')
+    parser.add_argument('--concurrency', type=int, default=4, help='sending threads')
+    parser.add_argument('--warmup', type=int, default=50, help='requests sent before measuring')
+    parser.add_argument('--plates', type=int, default=500, help='distinct plates')
+    parser.add_argument('--duplicate-rate', type=float, default=0.05, help='share of re-sent events')
+    parser.add_argument('--crop-kb', type=int, default=12, help='size of each embedded image (0 for none)')
+    parser.add_argument('--cameras', type=int, default=4, help='number of cameras')
+    parser.add_argument('--heartbeat-rate', type=float, default=0.02, help='share of heartbeat posts')
+    parser.add_argument('--seed', type=int, default=1, help='payload generator seed')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='override an integrated_server config key (repeatable)')
+    parser.add_argument('--workdir', help='scratch directory for the server files (default: a temp dir)')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch directory')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+    if args.duration:
+        args.requests = 0
+
+    payloads = SyntheticPayloads(
+        plates=args.plates,
+        duplicate_rate=args.duplicate_rate,
+        crop_kb=args.crop_kb,
+        cameras=args.cameras,
+        heartbeat_rate=args.heartbeat_rate,
+        seed=args.seed,
+    )
+    overrides = dict(parse_override(item) for item in args.set)
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'keep')},
+    }
+
+    server = broker = httpd = None
+    timer = StageTimer()
+    workdir = args.workdir or tempfile.mkdtemp(prefix='alpr-load-')
+    cwd = os.getcwd()
+    try:
+        if args.url:
+            url, app = args.url, None
+            sender_factory = make_sender('http', None, url)
+        else:
+            broker = StubMqttBroker().start()
+            os.makedirs(workdir, exist_ok=True)
+            prepare_workdir(workdir, broker, overrides)
+            os.chdir(workdir)
+            import alpr_integrated_server as server
+            wait_for_mqtt(server)
+            timer.install(server)
+            app = server.app
+            url = None
+            if args.mode == 'http':
+                httpd, url = start_http_server(app)
+            sender_factory = make_sender(args.mode, app, url)
+            report['json_codec'] = server.json_codec.name
+
+        if args.warmup:
+            run_load(sender_factory, payloads, args.warmup, 0, 0, args.concurrency)
+        timer.reset()
+        mqtt_before = broker.messages if broker else 0
+
+        latencies, statuses, kinds, elapsed = run_load(
+            sender_factory, payloads, args.requests, args.duration, args.rate, args.concurrency,
+        )
+        report.update({
+            'requests': len(latencies),
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+            'statuses': statuses,
+            'payloads': kinds,
+            'latency_ms': percentiles(latencies),
+        })
+
+        if server is not None:
+            report['stages_ms'] = timer.report()
+            server.jsonl_writer.flush()
+            report['mqtt'] = {
+                'drained': wait_for_mqtt(server),
+                'broker_messages': broker.messages - mqtt_before,
+            }
+            report['files'] = {
+                'raw_bytes': file_size(server.RAW_OUTPUT_FILE),
+                'parsed_bytes': file_size(server.PARSED_OUTPUT_FILE),
+            }
+            report['ingest'] = server.ingest_counters.snapshot()
+    finally:
+        if httpd is not None:
+            httpd.shutdown()
+        if server is not None:
+            server.shutdown()
+            # Already done; at exit it would write checkpoints relative to the original cwd
+            atexit.unregister(server.shutdown)
+        if broker is not None:
+            broker.stop()
+        os.chdir(cwd)
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
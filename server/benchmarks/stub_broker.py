@@ -0,0 +1,90 @@
+"""
+A minimal in-process MQTT 3.1.1 broker for load tests.
+
+It accepts any credentials, acknowledges CONNECT, SUBSCRIBE, PING and QoS 1/2 PUBLISH
+packets, and counts the messages published to it without delivering them anywhere.
+"""
+
+import socket
+import struct
+import threading
+
+
+class StubMqttBroker:
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self.host, self.port = self._server.getsockname()
+        self.messages = 0
+        self.payload_bytes = 0
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        self._server.listen()
+        self._running = True
+        threading.Thread(target=self._accept_loop, name='stub-mqtt-broker', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._server.close()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    @staticmethod
+    def _read_exactly(connection, size):
+        data = b''
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('client disconnected')
+            data += chunk
+        return data
+
+    def _read_length(self, connection):
+        multiplier, length = 1, 0
+        while True:
+            byte = self._read_exactly(connection, 1)[0]
+            length += (byte & 127) * multiplier
+            multiplier *= 128
+            if not byte & 128:
+                return length
+
+    def _serve(self, connection):
+        try:
+            while True:
+                header = self._read_exactly(connection, 1)[0]
+                packet_type, qos = header >> 4, (header >> 1) & 3
+                body = self._read_exactly(connection, self._read_length(connection))
+                if packet_type == 1:  # CONNECT
+                    connection.sendall(b'\x20\x02\x00\x00')
+                elif packet_type == 3:  # PUBLISH
+                    position = 2 + struct.unpack('>H', body[:2])[0]
+                    if qos:
+                        packet_id = body[position:position + 2]
+                        position += 2
+                        connection.sendall((b'\x40\x02' if qos == 1 else b'\x50\x02') + packet_id)
+                    with self._lock:
+                        self.messages += 1
+                        self.payload_bytes += len(body) - position
+                elif packet_type == 6:  # PUBREL
+                    connection.sendall(b'\x70\x02' + body[:2])
+                elif packet_type == 8:  # SUBSCRIBE
+                    connection.sendall(b'\x90\x03' + body[:2] + b'\x00')
+                elif packet_type == 12:  # PINGREQ
+                    connection.sendall(b'\xd0\x00')
+                elif packet_type == 14:  # DISCONNECT
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            connection.close()
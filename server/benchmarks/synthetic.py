@@ -0,0 +1,154 @@
+"""
+Synthetic Rekor Scout payloads for benchmarks and load tests.
+
+SyntheticPayloads produces a reproducible (seeded) stream of alpr_group and heartbeat POST
+bodies shaped like the ones the Rekor agent sends, with a configurable number of distinct
+plates, share of exact duplicates (re-sent events), crop size and camera count.
+"""
+
+import base64
+import json
+import random
+import string
+import time
+from collections import deque
+
+JPEG_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00'
+
+
+def random_plate(rng):
+    return ''.join(rng.choice(string.ascii_uppercase) for _ in range(3)) + \
+        ''.join(rng.choice(string.digits) for _ in range(rng.choice((3, 4))))
+
+
+def make_crop(rng, crop_kb):
+    """A base64 'JPEG' of roughly ``crop_kb`` KiB of encoded text"""
+    size = max(crop_kb * 768 - len(JPEG_HEADER), 0)
+    return base64.b64encode(JPEG_HEADER + rng.randbytes(size)).decode('ascii')
+
+
+def alpr_group(plate, camera_id, epoch_ms, crop, region='us-ut', confidence=94.3, agent_uid='agent-0001'):
+    """Return an alpr_group payload (without a timestamp, as the agent sends it)"""
+    candidates = [{'plate': plate, 'confidence': confidence, 'matches_template': 1}] + [
+        {'plate': plate[:-1] + str(i), 'confidence': round(confidence - 5 - i, 1), 'matches_template': 0}
+        for i in range(9)
+    ]
+    uuid = f'{agent_uid}-{camera_id}-{epoch_ms}'
+    return {
+        'version': 2,
+        'data_type': 'alpr_group',
+        'epoch_start': epoch_ms,
+        'epoch_end': epoch_ms + 1500,
+        'frame_start': 100,
+        'frame_end': 130,
+        'company_id': 'c0ffee00-1234-5678-9abc-def012345678',
+        'agent_uid': agent_uid,
+        'agent_version': '4.1.1',
+        'agent_type': 'alprd',
+        'camera_id': camera_id,
+        'gps_latitude': 40.25,
+        'gps_longitude': -111.65,
+        'country': 'us',
+        'uuids': [f'{agent_uid}-{camera_id}-{epoch_ms + i}' for i in range(8)],
+        'plate_indexes': list(range(8)),
+        'candidates': candidates,
+        'vehicle_crop_jpeg': crop,
+        'best_plate': {
+            'plate': plate,
+            'confidence': confidence,
+            'matches_template': 1,
+            'plate_index': 0,
+            'region': region,
+            'region_confidence': 88,
+            'processing_time_ms': 41.2,
+            'requested_topn': 10,
+            'coordinates': [{'x': 100, 'y': 200}, {'x': 180, 'y': 200}, {'x': 180, 'y': 230}, {'x': 100, 'y': 230}],
+            'plate_crop_jpeg': crop,
+            'candidates': candidates,
+        },
+        'best_confidence': confidence,
+        'best_uuid': uuid,
+        'best_plate_number': plate,
+        'best_region': region,
+        'best_region_confidence': 88,
+        'matches_template': True,
+        'travel_direction': 182.5,
+        'is_parked': False,
+        'is_preview': False,
+        'vehicle_path': [{'x': 100 + i, 'y': 200, 'w': 80, 'h': 30, 'f': 100 + i} for i in range(30)],
+        'vehicle': {
+            'color': [{'name': 'silver-gray', 'confidence': 71.2}, {'name': 'white', 'confidence': 12.0}],
+            'make': [{'name': 'toyota', 'confidence': 64.0}, {'name': 'honda', 'confidence': 10.1}],
+            'make_model': [{'name': 'toyota_camry', 'confidence': 40.0}],
+            'body_type': [{'name': 'sedan-standard', 'confidence': 80.5}],
+            'year': [{'name': '2015-2019', 'confidence': 55.0}],
+            'orientation': [{'name': '180', 'confidence': 90.0}],
+        },
+    }
+
+
+def heartbeat(camera_ids, epoch_ms, total_plate_reads, agent_uid='agent-0001'):
+    return {
+        'version': 2,
+        'data_type': 'heartbeat',
+        'company_id': 'c0ffee00-1234-5678-9abc-def012345678',
+        'agent_uid': agent_uid,
+        'agent_version': '4.1.1',
+        'agent_type': 'alprd',
+        'openalpr_version': '4.1.1',
+        'epoch_time': epoch_ms,
+        'video_streams': [
+            {
+                'camera_id': camera_id,
+                'fps': 15.0,
+                'is_streaming': True,
+                'total_plate_reads': total_plate_reads,
+                'last_plate_read': epoch_ms - 1000,
+            }
+            for camera_id in camera_ids
+        ],
+    }
+
+
+class SyntheticPayloads:
+    """Reproducible stream of (kind, body) pairs, where kind is 'alpr_group', 'duplicate' or 'heartbeat'.
+
+    - ``plates``: number of distinct plates, drawn uniformly
+    - ``duplicate_rate``: share of alpr_group posts that re-send one of the last 100 events
+    - ``crop_kb``: size of each embedded crop; 0 leaves the crops out
+    - ``cameras``: number of camera ids events are spread over
+    - ``heartbeat_rate``: share of posts that are heartbeats
+    """
+
+    def __init__(self, plates=500, duplicate_rate=0.05, crop_kb=12, cameras=4, heartbeat_rate=0.02, seed=1):
+        self.rng = random.Random(seed)
+        self.plates = [random_plate(self.rng) for _ in range(plates)]
+        self.duplicate_rate = duplicate_rate
+        self.cameras = list(range(1, cameras + 1))
+        self.heartbeat_rate = heartbeat_rate
+        # A few distinct crops are enough; generating one per event would dominate the run
+        self.crops = [make_crop(self.rng, crop_kb) for _ in range(8)] if crop_kb else [None]
+        self.recent = deque(maxlen=100)
+        self.epoch_ms = int(time.time() * 1000)
+        self.sent = 0
+
+    def next(self):
+        self.sent += 1
+        self.epoch_ms += self.rng.randint(50, 500)
+        if self.rng.random() < self.heartbeat_rate:
+            return 'heartbeat', json.dumps(heartbeat(self.cameras, self.epoch_ms, self.sent)).encode('utf-8')
+        if self.recent and self.rng.random() < self.duplicate_rate:
+            return 'duplicate', self.rng.choice(self.recent)
+
+        payload = alpr_group(
+            self.rng.choice(self.plates),
+            self.rng.choice(self.cameras),
+            self.epoch_ms,
+            self.rng.choice(self.crops),
+            confidence=round(self.rng.uniform(80, 99), 1),
+        )
+        if payload['best_plate']['plate_crop_jpeg'] is None:
+            del payload['best_plate']['plate_crop_jpeg'], payload['vehicle_crop_jpeg']
+        body = json.dumps(payload).encode('utf-8')
+        self.recent.append(body)
+        return 'alpr_group', body
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+from jsonl_io import read_complete_lines, read_last_lines
+
+
+class EventRingBuffer:
+    """Fixed-size, thread-safe buffer of the most recent event-log lines.
+
+    Each line is tagged with a sequence number so clients can ask for only the lines they
+    have not seen yet.
+    """
+
+    def __init__(self, capacity: int = 200):
+        self._lock = threading.Lock()
+        self._entries: Deque[Tuple[int, str]] = deque(maxlen=capacity)
+        self._last_seq = 0
+
+    def seed_from_file(self, path: str, convert: Optional[Callable[[str], str]] = None) -> None:
+        """Load the tail of an existing log file without reading all of it."""
+        if not os.path.exists(path):
+            return
+        for line in read_last_lines(path, self._entries.maxlen or 0):
+            self.append(convert(line) if convert else line)
+
+    def append(self, line: str) -> int:
+        with self._lock:
+            self._last_seq += 1
+            self._entries.append((self._last_seq, line))
+            return self._last_seq
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def tail(self, count: int) -> List[str]:
+        with self._lock:
+            entries = list(self._entries)[-count:] if count > 0 else []
+        return [line for _, line in entries]
+
+    def after(self, seq: int) -> Tuple[List[Tuple[int, str]], bool]:
+        """Return ``(entries, reset)`` for every buffered line with a sequence number above ``seq``.
+
+        ``reset`` is True when ``seq`` is ahead of this buffer (the server restarted), in which
+        case the whole buffer is returned.
+        """
+        with self._lock:
+            if seq > self._last_seq:
+                return list(self._entries), True
+            return [entry for entry in self._entries if entry[0] > seq], False
+
+
+
+class EventLogTail:
+    """The most recent lines of an event log that several processes append to.
+
+    Serves the same queries as :class:`EventRingBuffer`, but reads the shared file on each
+    one, so every process answers with the lines all of them logged. A line's sequence
+    number is the byte offset just past it, which is the same whichever process reads it.
+    """
+
+    def __init__(self, path: str, capacity: int = 200, convert: Optional[Callable[[str], str]] = None):
+        self.path = path
+        self.capacity = capacity
+        self.convert = convert
+        # Bytes read back from the end at most, when a client starts over
+        self.max_tail_bytes = capacity * 4096
+
+    def _text(self, line: str) -> str:
+        line = line.rstrip('\r\n')
+        return self.convert(line) if self.convert else line
+
+    def tail(self, count: int) -> List[str]:
+        if count <= 0 or not os.path.exists(self.path):
+            return []
+        return [self._text(line) for line in read_last_lines(self.path, count)]
+
+    def after(self, seq: int) -> Tuple[List[Tuple[int, str]], bool]:
+        """Return ``(entries, reset)`` for the lines past byte offset ``seq``, at most
+        ``capacity`` of them (the newest).
+
+        ``reset`` is True when ``seq`` is beyond the end of the file (it was rotated), in which
+        case the newest lines of the new file are returned.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return [], seq > 0
+        reset = seq > size
+        start = 0 if reset else seq
+        if size - start > self.max_tail_bytes:
+            # Far behind: skip to the last complete lines instead of reading the whole file
+            start = size - self.max_tail_bytes
+            lines, end = read_complete_lines(self.path, start, 2)
+            start = lines[1][0] if len(lines) > 1 else end
+
+        lines, end = read_complete_lines(self.path, start)
+        ends = [offset for offset, _ in lines[1:]] + [end]
+        entries = [(next_offset, self._text(text)) for next_offset, (_, text) in zip(ends, lines) if text.strip()]
+        return entries[-self.capacity:], reset
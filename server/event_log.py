@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Optional
+
+from jsonl_writer import GroupCommitWriter, RotatingFileSink
+
+
+class EventLog:
+    """Human-readable event log written through the group-commit writer.
+
+    Lines are written either as plain text (``[timestamp] message``) or, with
+    ``fmt='json'``, as one JSON object per line with ``time`` and ``message`` keys so tools
+    can parse the log without regexes. The file rotates according to its
+    :class:`RotatingFileSink`.
+    """
+
+    FORMATS = ('text', 'json')
+    TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, writer: GroupCommitWriter, sink: RotatingFileSink, fmt: str = 'text', name: str = 'events'):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"event log format must be one of {', '.join(self.FORMATS)}")
+        self.writer = writer
+        self.fmt = fmt
+        self.name = name
+        writer.register(name, sink)
+
+    def write(self, message: str, when: Optional[datetime] = None) -> str:
+        """Append ``message`` and return its text form, as served by ``/api/events``."""
+        timestamp = (when or datetime.now()).strftime(self.TIME_FORMAT)
+        if self.fmt == 'json':
+            self.writer.write(self.name, json.dumps({'time': timestamp, 'message': message}) + '\n')
+        else:
+            self.writer.write(self.name, f"[{timestamp}] {message}\n")
+        return f"[{timestamp}] {message}"
+
+    @staticmethod
+    def to_text(line: str) -> str:
+        """Render a line from the log file (in either format) as ``[timestamp] message``."""
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+                return f"[{record['time']}] {record['message']}"
+            except (ValueError, KeyError, TypeError):
+                pass
+        return line
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+from typing import Any, Deque, Iterator, Optional, Set, Tuple
+
+
+class StreamSubscriber:
+    """A single connected stream client with its own bounded queue."""
+
+    def __init__(self, queue_size: int):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class EventBroadcaster:
+    """Fan out server events to Server-Sent Events subscribers.
+
+    Every published event gets a monotonically increasing id. The most recent events are kept
+    in a replay buffer so a reconnecting client can resume from its ``Last-Event-ID``.
+    Subscribers that fall ``queue_size`` events behind are dropped rather than allowed to
+    block the publisher; their browser reconnects and resumes from the replay buffer.
+
+    Every open stream holds a server thread, so at most ``max_subscribers`` are accepted at
+    once (``None`` for no limit); :meth:`subscribe` returns None for the rest.
+    """
+
+    def __init__(self, queue_size: int = 256, replay_size: int = 1024, max_subscribers: Optional[int] = None):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._replay: Deque[Tuple[int, str, str]] = deque(maxlen=replay_size)
+        self._subscribers: Set[StreamSubscriber] = set()
+        self.dropped_subscribers = 0
+        self.rejected_subscribers = 0
+
+    def publish(self, event: str, data: Any) -> int:
+        payload = json.dumps(data)
+        with self._lock:
+            event_id = next(self._ids)
+            message = (event_id, event, payload)
+            self._replay.append(message)
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.queue.put_nowait(message)
+                except queue.Full:
+                    subscriber.dropped = True
+                    self._subscribers.discard(subscriber)
+                    self.dropped_subscribers += 1
+        return event_id
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Optional[StreamSubscriber]:
+        subscriber = StreamSubscriber(self.queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                self.rejected_subscribers += 1
+                return None
+            if last_event_id is not None:
+                oldest = self._replay[0][0] if self._replay else 1
+                newest = self._replay[-1][0] if self._replay else 0
+                if last_event_id < oldest - 1 or last_event_id > newest:
+                    # Events were evicted or the server restarted; the client has to refetch
+                    subscriber.queue.put_nowait((newest, 'reset', '{}'))
+                else:
+                    backlog = [message for message in self._replay if message[0] > last_event_id]
+                    for message in backlog[-self.queue_size:]:
+                        subscriber.queue.put_nowait(message)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def stream(self, subscriber: StreamSubscriber, keepalive_seconds: float = 15.0) -> Iterator[str]:
+        """Yield SSE-formatted messages for ``subscriber`` until it is dropped or disconnects."""
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscriber.dropped:
+                try:
+                    event_id, event, payload = subscriber.queue.get(timeout=keepalive_seconds)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """An exclusive lock shared by every process (and thread) that opens the same lock file.
+
+    Uses ``flock`` on POSIX and ``msvcrt.locking`` on Windows. The OS releases the lock if the
+    holding process dies, so a crashed worker can't leave it stuck. A thread lock is taken
+    first, since OS file locks don't exclude threads of the same process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._thread_lock = threading.Lock()
+
+    def _try_os_lock(self) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, blocking: bool = True, poll_interval: float = 0.005) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if fcntl is not None and blocking:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return True
+        while not self._try_os_lock():
+            if not blocking:
+                self._thread_lock.release()
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def release(self) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def close(self) -> None:
+        os.close(self._fd)
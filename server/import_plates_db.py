@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Plate Database Import
+Loads the parsed plate history (alpr_parsed_data.jsonl) into the SQLite database used when
+plate_storage is 'sqlite'. The server does the same on startup; running this beforehand
+avoids a long first start with a large history. Safe to run again: only lines added since
+the last import are loaded.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import yaml
+
+from plate_db import SqlitePlateStore
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Import parsed plate records into the SQLite plate database',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s                                  # Use parsed_output_file and plate_db_file from config.yaml
+  %(prog)s --parsed old_parsed.jsonl --db test.db
+        """
+    )
+
+    parser.add_argument('--config', default='config.yaml', help='Server config file (default: config.yaml)')
+    parser.add_argument('--parsed', help='Parsed JSONL file (default: parsed_output_file from config)')
+    parser.add_argument('--db', help='SQLite database (default: plate_db_file from config)')
+
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r') as config_file:
+            config = yaml.safe_load(config_file).get('integrated_server', {})
+
+    parsed_output_file = args.parsed or config.get('parsed_output_file', 'alpr_parsed_data.jsonl')
+    db_file = args.db or config.get('plate_db_file', 'alpr_plates.db')
+    if not os.path.exists(parsed_output_file):
+        print(f"Error: '{parsed_output_file}' does not exist")
+        sys.exit(1)
+
+    store = SqlitePlateStore(db_file, parsed_output_file)
+    print(f"Importing '{parsed_output_file}' into '{db_file}'...")
+    start = time.time()
+    added = store.refresh()
+    print("Import complete!")
+    print(f"  Added: {added} records in {time.time() - start:.1f}s")
+    print(f"  Total: {len(store)} records")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from jsonl_io import atomic_write_json, count_lines, file_identity
+
+
+class IngestCounters:
+    """Live counters for the ingest path, so ``/stats`` never has to rescan the data files.
+
+    Counts are seeded once at startup, either from a checkpoint (topped up by counting only
+    the lines appended after it) or by a one-off scan of the files. Image totals come from
+    the plate image store's index, and records in rotated-out raw segments from the archive
+    manifest (``raw_archived_records``).
+    The suppression counters and ``heartbeats`` cannot be recovered from the files, so they
+    are cumulative since checkpointing started.
+
+    Live counters go up when a line is queued, before it is written, so the checkpoint doesn't
+    save them for the files: it saves each file's line count up to the position it records,
+    counted from the file itself (only the part appended since the previous checkpoint).
+
+    With ``per_process`` (one of several server processes sharing the files), nothing is
+    seeded from the files: every counter covers only this process's own writes, restored
+    from and saved to its own checkpoint, so the counters of all processes add up.
+    """
+
+    FIELDS = (
+        'raw_records',
+        'parsed_plates',
+        'plate_images',
+        'suppressed_duplicates',
+        'suppressed_near_duplicates',
+        'heartbeats',
+        'image_bytes_written',
+        'data_bytes_written',
+    )
+
+    def __init__(
+        self,
+        raw_output_file: str,
+        parsed_output_file: str,
+        image_totals: Callable[[], Tuple[int, int]],
+        checkpoint_file: Optional[str] = None,
+        raw_archived_records: Optional[Callable[[], int]] = None,
+        per_process: bool = False,
+    ):
+        self.raw_output_file = raw_output_file
+        self.parsed_output_file = parsed_output_file
+        self.image_totals = image_totals
+        self.checkpoint_file = checkpoint_file
+        self.raw_archived_records = raw_archived_records
+        self.per_process = per_process
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {field: 0 for field in self.FIELDS}
+        # Field -> {'identity', 'offset', 'count'}: lines in the file before ``offset``
+        self._positions: Dict[str, dict] = {}
+        self._seed()
+
+    def _seed(self) -> None:
+        checkpoint = self._load_checkpoint()
+        files = checkpoint.get('files', {})
+        if self.per_process:
+            for field in self.FIELDS:
+                self._counts[field] = checkpoint.get('counts', {}).get(field, 0)
+            return
+
+        for field in ('suppressed_duplicates', 'suppressed_near_duplicates', 'heartbeats'):
+            self._counts[field] = checkpoint.get('counts', {}).get(field, 0)
+        self._counts['raw_records'] = self._archived_records()
+
+        for field, path in (('raw_records', self.raw_output_file), ('parsed_plates', self.parsed_output_file)):
+            if not os.path.exists(path):
+                continue
+            saved = files.get(field)
+            identity = file_identity(path)
+            size = os.path.getsize(path)
+            if saved and tuple(saved['identity']) == identity and saved['offset'] <= size:
+                count = saved['count'] + count_lines(path, saved['offset'], size)
+            else:
+                count = count_lines(path, 0, size)
+            self._positions[field] = {'identity': identity, 'offset': size, 'count': count}
+            self._counts[field] += count
+            self._counts['data_bytes_written'] += size
+
+        self._counts['plate_images'], self._counts['image_bytes_written'] = self.image_totals()
+
+    def _archived_records(self) -> int:
+        return self.raw_archived_records() if self.raw_archived_records is not None else 0
+
+    def _load_checkpoint(self) -> dict:
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return {}
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def increment(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[field] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _count_file(self, field: str, path: str) -> Optional[dict]:
+        """Lines in ``path`` up to its current size, counting on from the last position."""
+        identity = file_identity(path)
+        if identity is None:
+            return None
+        size = os.path.getsize(path)
+        previous = self._positions.get(field)
+        if previous and tuple(previous['identity']) == identity and previous['offset'] <= size:
+            count = previous['count'] + count_lines(path, previous['offset'], size)
+        else:
+            # New (e.g. rotated) file: archived segments are counted separately
+            count = count_lines(path, 0, size)
+        return {'identity': identity, 'offset': size, 'count': count}
+
+    def checkpoint(self) -> None:
+        """Persist the counters together with the file positions they cover."""
+        if not self.checkpoint_file:
+            return
+        files = {}
+        if not self.per_process:
+            for field, path in (('raw_records', self.raw_output_file), ('parsed_plates', self.parsed_output_file)):
+                position = self._count_file(field, path)
+                if position is not None:
+                    files[field] = self._positions[field] = position
+        with self._lock:
+            counts = dict(self._counts)
+        atomic_write_json(self.checkpoint_file, {'counts': counts, 'files': files})
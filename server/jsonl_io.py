@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Iterator, List, Optional, Tuple
+
+
+def file_identity(path: str) -> Optional[Tuple[int, int]]:
+    """Return a (device, inode) pair identifying the file currently at ``path``."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def encode_cursor(identity: Optional[Tuple[int, int]], offset: int) -> str:
+    """Build the opaque cursor string handed out to API clients."""
+    if identity is None:
+        return f"0.0.{offset:x}"
+    return f"{identity[0]:x}.{identity[1]:x}.{offset:x}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[Optional[Tuple[int, int]], int]:
+    """Parse a cursor produced by :func:`encode_cursor`. Invalid cursors restart from zero."""
+    if not cursor:
+        return None, 0
+    try:
+        device, inode, offset = (int(part, 16) for part in cursor.split('.'))
+    except ValueError:
+        return None, 0
+    return (device, inode), max(offset, 0)
+
+
+def read_complete_lines(path: str, offset: int, limit: Optional[int] = None) -> Tuple[List[Tuple[int, str]], int]:
+    """Read every complete line appended at or after ``offset`` (at most ``limit`` of them).
+
+    Returns ``(lines, next_offset)`` where each entry is ``(line_offset, text)``. A trailing
+    partial line (one still being written) is left for the next call.
+    """
+    lines: List[Tuple[int, str]] = []
+    with open(path, 'rb') as handle:
+        handle.seek(offset)
+        position = offset
+        for raw in handle:
+            if not raw.endswith(b'\n') or (limit is not None and len(lines) >= limit):
+                break
+            lines.append((position, raw.decode('utf-8', errors='replace')))
+            position += len(raw)
+    return lines, position
+
+
+def iter_json_lines(lines: List[Tuple[int, str]]) -> Iterator[Tuple[int, dict]]:
+    """Decode ``(offset, text)`` pairs, skipping blank and malformed lines."""
+    for offset, text in lines:
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            yield offset, json.loads(text)
+        except json.JSONDecodeError:
+            continue
+
+
+
+def read_last_lines(path: str, count: int, block_size: int = 8192) -> List[str]:
+    """Return up to the last ``count`` non-empty lines of a text file.
+
+    The file is read backwards in blocks from the end, so the cost depends on ``count``
+    rather than on the size of the file.
+    """
+    if count <= 0:
+        return []
+    with open(path, 'rb') as handle:
+        handle.seek(0, os.SEEK_END)
+        position = handle.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(block_size, position)
+            position -= step
+            handle.seek(position)
+            data = handle.read(step) + data
+
+    lines = [line.decode('utf-8', errors='replace').strip() for line in data.splitlines()]
+    if position > 0:
+        # The first chunk may start in the middle of a line
+        lines = lines[1:]
+    return [line for line in lines if line][-count:]
+
+
+def count_lines(path: str, offset: int = 0, end: Optional[int] = None, block_size: int = 1 << 20) -> int:
+    """Count newline-terminated lines between ``offset`` and ``end`` (default: the end of the
+    file) without decoding them."""
+    total = 0
+    with open(path, 'rb') as handle:
+        handle.seek(offset)
+        remaining = None if end is None else max(end - offset, 0)
+        while remaining is None or remaining > 0:
+            block = handle.read(block_size if remaining is None else min(block_size, remaining))
+            if not block:
+                break
+            total += block.count(b'\n')
+            if remaining is not None:
+                remaining -= len(block)
+    return total
+
+
+def atomic_write_json(path: str, data) -> None:
+    """Write ``data`` as JSON to ``path`` so readers never see a partially written file."""
+    # Unique per process, since server workers may checkpoint the same file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+import glob
+import gzip
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from file_lock import FileLock
+from jsonl_io import file_identity
+
+
+class FileSink:
+    """An append-only file kept open by the writer thread.
+
+    With a ``lock`` (a :class:`FileLock` shared with other processes appending to the same
+    file), each write opens the file, appends and closes it while holding the lock. Lines
+    from different processes therefore never interleave, and no process keeps the file open
+    in between, so whichever process rotates it can rename it (which Windows would refuse).
+    """
+
+    def __init__(self, path: str, lock: Optional[FileLock] = None):
+        self.path = path
+        self.lock = lock
+        self._handle = None
+        self._identity: Optional[Tuple[int, int]] = None
+
+    def write(self, data: bytes) -> None:
+        if self.lock is None:
+            self._append(data)
+            return
+        with self.lock:
+            self._sync()
+            try:
+                self._append(data)
+            finally:
+                FileSink.close(self)
+                self._identity = file_identity(self.path)
+
+    def _append(self, data: bytes) -> None:
+        if self._handle is None:
+            self._handle = open(self.path, 'ab')
+        self._handle.write(data)
+
+    def _sync(self) -> bool:
+        """Called under the lock before a write. Returns True if another process replaced the
+        file since this one last wrote to it (e.g. by rotating it)."""
+        return self._identity is not None and file_identity(self.path) != self._identity
+
+    def flush(self) -> None:
+        if self._handle is not None:
+            self._handle.flush()
+
+    def fsync(self) -> None:
+        if self._handle is not None:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+        elif self.lock is not None and self._identity is not None:
+            # Locked writes close the file again; fsync through a fresh handle
+            with open(self.path, 'ab') as handle:
+                os.fsync(handle.fileno())
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def gzip_file(path: str) -> str:
+    """Compress ``path`` to ``path.gz`` by streaming, then remove the original."""
+    target = f"{path}.gz"
+    tmp_path = f"{target}.tmp"
+    with open(path, 'rb') as source, gzip.open(tmp_path, 'wb') as dest:
+        shutil.copyfileobj(source, dest, 1 << 20)
+    os.replace(tmp_path, target)
+    os.remove(path)
+    return target
+
+
+class RotatingFileSink(FileSink):
+    """A :class:`FileSink` that rolls over by size, by hour or by day.
+
+    With ``hourly``/``daily`` rotation, ``max_bytes`` (if non-zero) also caps each segment.
+    Finished segments are renamed to ``<path>.<suffix>`` and, if ``compress`` is set, gzipped
+    on a background thread. ``backup_count`` limits how many finished segments are kept
+    (0 keeps them all).
+    """
+
+    ROTATE_MODES = ('none', 'size', 'hourly', 'daily')
+    PERIOD_FORMATS = {'hourly': '%Y-%m-%d-%H', 'daily': '%Y-%m-%d'}
+
+    def __init__(
+        self,
+        path: str,
+        when: str = 'size',
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 0,
+        compress: bool = True,
+        lock: Optional[FileLock] = None,
+    ):
+        if when not in self.ROTATE_MODES:
+            raise ValueError(f"rotation must be one of {', '.join(self.ROTATE_MODES)}")
+        super().__init__(path, lock)
+        self.when = when
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self._size = os.path.getsize(path) if os.path.exists(path) else 0
+        opened = datetime.fromtimestamp(os.path.getmtime(path)) if os.path.exists(path) else datetime.now()
+        self._period = self.period_of(opened)
+        self._compressors: List[threading.Thread] = []
+
+    def period_of(self, when: datetime) -> str:
+        time_format = self.PERIOD_FORMATS.get(self.when)
+        return when.strftime(time_format) if time_format else ''
+
+    def _append(self, data: bytes) -> None:
+        if self.should_rollover(len(data)):
+            self.rollover()
+        super()._append(data)
+        self._size += len(data)
+
+    def _sync(self) -> bool:
+        # Other processes append too, so take the size from the file itself
+        replaced = super()._sync()
+        if replaced:
+            self._period = self.period_of(datetime.now())
+        self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return replaced
+
+    def should_rollover(self, incoming: int) -> bool:
+        if self._size == 0:
+            return False
+        if self.when == 'none':
+            return False
+        if self.max_bytes and self._size + incoming > self.max_bytes:
+            return True
+        return self.when != 'size' and self.period_of(datetime.now()) != self._period
+
+    def segment_name(self) -> str:
+        if self.when == 'size':
+            suffix = datetime.now().strftime('%Y%m%d-%H%M%S')
+        else:
+            suffix = self._period
+        candidate = f"{self.path}.{suffix}"
+        counter = 1
+        while os.path.exists(candidate) or os.path.exists(f"{candidate}.gz"):
+            candidate = f"{self.path}.{suffix}-{counter}"
+            counter += 1
+        return candidate
+
+    def rollover(self) -> None:
+        # Only close the handle; earlier segments may still be compressing in the background
+        FileSink.close(self)
+        if not os.path.exists(self.path):
+            return
+        segment = self.segment_name()
+        os.replace(self.path, segment)
+        self._size = 0
+        self._period = self.period_of(datetime.now())
+        self.on_segment_finished(segment)
+
+    def on_segment_finished(self, segment: str) -> None:
+        """Hook run (on the writer thread) after a segment is closed and renamed."""
+        if self.compress:
+            worker = threading.Thread(target=self._compress_and_prune, args=(segment,), daemon=True)
+            self._compressors = [thread for thread in self._compressors if thread.is_alive()]
+            self._compressors.append(worker)
+            worker.start()
+        else:
+            self._prune()
+
+    def _compress_and_prune(self, segment: str) -> None:
+        try:
+            gzip_file(segment)
+        except OSError:
+            pass
+        self._prune()
+
+    # Suffixes segment_name() produces (timestamps and counters, optionally gzipped); other
+    # files next to the log, such as its .lock file or a .gz.tmp being written, never match
+    SEGMENT_SUFFIX = re.compile(r'\.\d[\d-]*(\.gz)?$')
+
+    def segments(self) -> List[str]:
+        """Finished segments of this file, oldest first."""
+        names = [
+            name for name in glob.glob(f"{glob.escape(self.path)}.*")
+            if self.SEGMENT_SUFFIX.fullmatch(name[len(self.path):])
+        ]
+        dated = []
+        for name in names:
+            try:
+                dated.append((os.path.getmtime(name), name))
+            except OSError:
+                continue
+        return [name for _, name in sorted(dated)]
+
+    def _prune(self) -> None:
+        if self.backup_count <= 0:
+            return
+        segments = self.segments()
+        for name in segments[:-self.backup_count]:
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        super().close()
+        for worker in self._compressors:
+            worker.join()
+        self._compressors = []
+
+
+def _line_count(chunks: List[bytes]) -> int:
+    return sum(chunk.count(b'\n') for chunk in chunks)
+
+
+class GroupCommitWriter:
+    """Background thread that batches line appends to a set of named sinks.
+
+    Callers enqueue lines with :meth:`write` and return immediately. The writer thread drains
+    everything queued so far (up to ``max_batch`` lines), writes each sink's share with a single
+    ``write`` call, and then applies the durability mode:
+
+    - ``none``: flush to the OS after every batch, never fsync
+    - ``interval``: flush every batch, fsync dirty sinks at most every ``fsync_interval`` seconds
+    - ``per-batch``: fsync every sink touched by a batch before taking the next one
+
+    ``batch_observer``, if given, is called on the writer thread after each batch with the
+    number of records written and the seconds the batch took (including any fsync). A sink
+    registered with ``on_write`` has it called on the writer thread with the bytes of each
+    write, once they are written and flushed to the file.
+
+    A failed sink write doesn't lose the lines or stop the thread: they are kept, ahead of
+    newer lines for the same sink, and retried every ``retry_interval`` seconds (or with the
+    next batch). Only when more than ``max_retry_bytes`` pile up are the oldest dropped.
+    :meth:`stats` reports the lines waiting for a retry and the last error, and
+    :attr:`healthy` is False while any are waiting or if the thread has died.
+    """
+
+    DURABILITY_MODES = ('none', 'interval', 'per-batch')
+
+    def __init__(
+        self,
+        durability: str = 'interval',
+        fsync_interval: float = 1.0,
+        max_batch: int = 512,
+        queue_size: int = 10000,
+        batch_observer: Optional[Callable[[int, float], object]] = None,
+        retry_interval: float = 1.0,
+        max_retry_bytes: int = 64 * 1024 * 1024,
+    ):
+        if durability not in self.DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {', '.join(self.DURABILITY_MODES)}")
+
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.batch_observer = batch_observer
+        self.retry_interval = retry_interval
+        self.max_retry_bytes = max_retry_bytes
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._sinks: Dict[str, FileSink] = {}
+        self._on_write: Dict[str, Callable[[bytes], object]] = {}
+        self._dirty: set = set()
+        # Sink name -> chunks whose write failed, oldest first
+        self._failed: Dict[str, List[bytes]] = {}
+        self._last_fsync = time.monotonic()
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._records = 0
+        self._max_batch_seen = 0
+        self._fsyncs = 0
+        self._errors = 0
+        self._dropped = 0
+        self._last_error: Optional[str] = None
+
+        self._thread = threading.Thread(target=self._run, name='jsonl-writer', daemon=True)
+        self._thread.start()
+
+    def register(self, name: str, sink: FileSink, on_write: Optional[Callable[[bytes], object]] = None) -> None:
+        self._sinks[name] = sink
+        if on_write is not None:
+            self._on_write[name] = on_write
+
+    def write(self, name: str, line: str) -> None:
+        """Queue ``line`` (including its trailing newline) for the sink registered as ``name``."""
+        if self._closed:
+            raise RuntimeError('writer is closed')
+        if not self._thread.is_alive():
+            # Fail instead of blocking forever once the queue fills up
+            raise RuntimeError('writer thread has stopped')
+        self._queue.put((name, line.encode('utf-8')))
+
+    def write_many(self, name: str, lines: List[str]) -> None:
+        """Queue several lines for one sink as a single item, so they land in the same batch."""
+        if lines:
+            self.write(name, ''.join(lines))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued before this call has been written and flushed."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Write out everything still queued, fsync and close all sinks."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put((None, None))
+        self._thread.join()
+
+    @property
+    def healthy(self) -> bool:
+        """False while lines are waiting for a retry, or if the writer thread has died."""
+        return (self._closed or self._thread.is_alive()) and not self._failed
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'healthy': self.healthy,
+                'durability': self.durability,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'records': self._records,
+                'avg_batch_size': round(self._records / self._batches, 2) if self._batches else 0,
+                'max_batch_size': self._max_batch_seen,
+                'fsyncs': self._fsyncs,
+                'errors': self._errors,
+                'retry_pending': sum(_line_count(chunks) for chunks in list(self._failed.values())),
+                'dropped': self._dropped,
+                'last_error': self._last_error,
+            }
+
+    def _run(self) -> None:
+        while True:
+            timeout = self.fsync_interval if self.durability == 'interval' and self._dirty else None
+            if self._failed:
+                timeout = min(timeout or self.retry_interval, self.retry_interval)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if self._failed:
+                    self._commit([])
+                self._fsync_dirty()
+                continue
+
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if not self._commit(batch):
+                return
+
+    def _record_error(self, message: str) -> None:
+        print(f"JSONL writer: {message}")
+        with self._stats_lock:
+            self._errors += 1
+            self._last_error = message
+
+    def _commit(self, batch: List[Tuple[Optional[str], object]]) -> bool:
+        """Write one batch. Returns False once the shutdown marker has been processed."""
+        started = time.perf_counter()
+        pending: Dict[str, List[bytes]] = {}
+        waiters: List[threading.Event] = []
+        stop = False
+        for name, payload in batch:
+            if name is None:
+                if payload is None:
+                    stop = True
+                else:
+                    waiters.append(payload)
+                continue
+            pending.setdefault(name, []).append(payload)
+
+        # Lines that failed earlier go first, to keep each file in order
+        for name in list(self._failed):
+            pending[name] = self._failed.pop(name) + pending.get(name, [])
+
+        records = 0
+        for name, chunks in pending.items():
+            sink = self._sinks.get(name)
+            if sink is None:
+                self._record_error(f"no sink registered as {name!r}, dropped {_line_count(chunks)} lines")
+                continue
+            data = b''.join(chunks)
+            try:
+                sink.write(data)
+            except Exception as e:
+                self._record_error(f"writing {name} failed, will retry: {e!r}")
+                self._keep_for_retry(name, chunks)
+                continue
+            self._dirty.add(name)
+            records += _line_count(chunks)
+            try:
+                sink.flush()
+            except Exception as e:
+                # The lines were handed to the sink; only its flush (or its SQLite import) failed
+                self._record_error(f"flushing {name} failed: {e!r}")
+            if name in self._on_write:
+                try:
+                    self._on_write[name](data)
+                except Exception as e:
+                    self._record_error(f"on_write for {name} failed: {e!r}")
+
+        if self.durability == 'per-batch' or (
+            self.durability == 'interval' and time.monotonic() - self._last_fsync >= self.fsync_interval
+        ):
+            self._fsync_dirty()
+
+        if records:
+            with self._stats_lock:
+                self._batches += 1
+                self._records += records
+                self._max_batch_seen = max(self._max_batch_seen, records)
+            if self.batch_observer is not None:
+                try:
+                    self.batch_observer(records, time.perf_counter() - started)
+                except Exception as e:
+                    self._record_error(f"batch observer failed: {e!r}")
+
+        if stop:
+            self._fsync_dirty()
+            for name, sink in self._sinks.items():
+                try:
+                    sink.close()
+                except Exception as e:
+                    self._record_error(f"closing {name} failed: {e!r}")
+            for name, chunks in self._failed.items():
+                self._record_error(f"{_line_count(chunks)} lines for {name} not written at shutdown")
+
+        for waiter in waiters:
+            waiter.set()
+        return not stop
+
+    def _keep_for_retry(self, name: str, chunks: List[bytes]) -> None:
+        self._failed[name] = chunks
+        total = sum(len(chunk) for pending in self._failed.values() for chunk in pending)
+        while total > self.max_retry_bytes and chunks:
+            chunk = chunks.pop(0)
+            total -= len(chunk)
+            lines = _line_count([chunk])
+            with self._stats_lock:
+                self._dropped += lines
+            print(f"JSONL writer: dropped {lines} lines for {name}, retry buffer full")
+        if not chunks:
+            del self._failed[name]
+
+    def _fsync_dirty(self) -> None:
+        if self.durability != 'none':
+            for name in self._dirty:
+                try:
+                    self._sinks[name].fsync()
+                    with self._stats_lock:
+                        self._fsyncs += 1
+                except Exception as e:
+                    self._record_error(f"fsync of {name} failed: {e!r}")
+        self._dirty.clear()
+        self._last_fsync = time.monotonic()
@@ -1,8 +1,19 @@
 """
 This file defines a generic MQTT class for our lab-grade sensor scripts to use to transmit data.
 It is based on example code from the Eclipse Paho MQTT library
+
+Messages are not published from the caller's thread. transmit_message() only enqueues them in an
+outbox that a background sender drains while the broker is connected. While the broker is down
+(or the in-memory queue is full), new messages go to a spool file on disk instead, so they survive
+a crash, and the spool is replayed in order once the connection comes back.
 """
 
+import json
+import os
+import queue
+import threading
+import time
+
 import paho.mqtt.client as mqtt
 
 
@@ -15,6 +26,9 @@ class labMqttPublisher:
         brokerTopic: str,
         brokerUser: str,
         brokerPass: str,
+        spoolFile: str = None,
+        queueSize: int = 1000,
+        maxInflight: int = 20,
     ):
         # Store params
         self.brokerAddr = brokerAddr
@@ -22,52 +36,258 @@ class labMqttPublisher:
         self.brokerTopic = brokerTopic
         self.brokerUser = brokerUser
         self.brokerPass = brokerPass
+        self.spoolFile = spoolFile
+        self.maxInflight = maxInflight
+
+        # Outbox state
+        self.online = False
+        self._queue = queue.Queue(maxsize=queueSize)
+        self._spool_lock = threading.Lock()
+        self._repair_spool()
+        self._spool_pending = self._count_spooled()
+        self._spool_offset = 0
+        self._wakeup = threading.Event()
+        self._running = False
+        self._sender = None
+
+        # Ack tracking: mid -> time handed to paho
+        self._stats_lock = threading.Lock()
+        self._inflight = {}
+        self._early_acks = set()
+        self._published = 0
+        self._acked = 0
+        self._spilled = 0
+        self._dropped = 0
+        self._ack_latency_total = 0.0
+        self._ack_latency_max = 0.0
 
         # MQTT setup
-        self.unacked_publish = set()
         self.mqttc = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
         self.mqttc.on_publish = self.on_publish
-        self.mqttc.user_data_set(self.unacked_publish)
+        self.mqttc.on_connect = self.on_connect
+        self.mqttc.on_disconnect = self.on_disconnect
         self.mqttc.username_pw_set(brokerUser, brokerPass)
+        self.mqttc.reconnect_delay_set(min_delay=1, max_delay=60)
+        self.mqttc.max_inflight_messages_set(maxInflight)
 
     def connect(self):
-        self.mqttc.connect(self.brokerAddr, self.brokerPort)
+        """Start connecting in the background. Retries with backoff until the broker answers."""
+        self.mqttc.connect_async(self.brokerAddr, self.brokerPort)
         self.mqttc.loop_start()
+        self._running = True
+        self._sender = threading.Thread(target=self._send_loop, name="mqtt-outbox", daemon=True)
+        self._sender.start()
 
     def disconnect(self):
+        """Stop sending and move anything still queued in memory to the spool."""
+        self._running = False
+        self._wakeup.set()
+        if self._sender is not None:
+            self._sender.join(timeout=5)
+        self._spill_queue()
         self.mqttc.disconnect()
         self.mqttc.loop_stop()
 
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        if not reason_code.is_failure:
+            self.online = True
+            self._wakeup.set()
+
+    def on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self.online = False
+
     def on_publish(self, client, userdata, mid, reason_code, properties):
-        """
-        (copied from Eclipse Paho example code)
-        """
         # reason_code and properties will only be present in MQTTv5. It's always unset in MQTTv3
-        try:
-            userdata.remove(mid)
-        except KeyError:
-            print("on_publish() is called with a mid not present in unacked_publish")
-            print("This is due to an unavoidable race-condition:")
-            print("* publish() return the mid of the message sent.")
-            print("* mid from publish() is added to unacked_publish by the main thread")
-            print("* on_publish() is called by the loop_start thread")
-            print(
-                "While unlikely (because on_publish() will be called after a network round-trip),"
-            )
-            print(" this is a race-condition that COULD happen")
-            print("")
-            print(
-                "The best solution to avoid race-condition is using the msg_info from publish()"
-            )
-            print(
-                "We could also try using a list of acknowledged mid rather than removing from pending list,"
-            )
-            print("but remember that mid could be re-used !")
+        with self._stats_lock:
+            sent_at = self._inflight.pop(mid, None)
+            if sent_at is None:
+                # Acked before the sender thread recorded the mid (see _publish)
+                self._early_acks.add(mid)
+                return
+            latency = time.monotonic() - sent_at
+            self._acked += 1
+            self._ack_latency_total += latency
+            self._ack_latency_max = max(self._ack_latency_max, latency)
+        self._wakeup.set()
 
     def transmit_message(self, message: str):
+        """Queue a message for publishing. Never waits on the broker."""
+        self.transmit_messages([message])
+
+    def transmit_messages(self, messages: list):
+        """Queue several messages at once, keeping their order."""
+        if not messages:
+            return
+        with self._spool_lock:
+            # Once anything is spooled, newer messages go behind it to keep the order. While
+            # offline they go straight to disk, where a crash can't lose them
+            index = 0
+            if self._spool_pending == 0 and (self.online or not self.spoolFile):
+                for index, message in enumerate(messages):
+                    try:
+                        self._queue.put_nowait(message)
+                    except queue.Full:
+                        break
+                else:
+                    index = len(messages)
+            overflow = messages[index:]
+            if overflow and self.spoolFile:
+                self._append_to_spool(overflow)
+                self._spilled += len(overflow)
+            elif overflow:
+                self._dropped += len(overflow)
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'online': self.online,
+                'queue_depth': self._queue.qsize(),
+                'spooled': self._spool_pending,
+                'in_flight': len(self._inflight),
+                'published': self._published,
+                'acked': self._acked,
+                'spilled': self._spilled,
+                'dropped': self._dropped,
+                'avg_ack_latency_ms': round(self._ack_latency_total / self._acked * 1000, 2) if self._acked else 0,
+                'max_ack_latency_ms': round(self._ack_latency_max * 1000, 2),
+            }
+
+    # ---------------------------------------------------------------------------------
+    # Sender thread
+    # ---------------------------------------------------------------------------------
+
+    def _send_loop(self):
+        while self._running:
+            if not self.online or len(self._inflight) >= self.maxInflight:
+                self._wakeup.wait(timeout=1)
+                self._wakeup.clear()
+                continue
+
+            # Older messages live in memory, newer ones (if any) in the spool
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                if not self._replay_spool():
+                    self._wakeup.wait(timeout=1)
+                    self._wakeup.clear()
+                continue
+
+            self._publish(message)
+
+    def _publish(self, message: str):
         msg_info = self.mqttc.publish(self.brokerTopic, message, qos=1)
-        self.unacked_publish.add(msg_info.mid)
+        # The mid is recorded after publish() returns, since on_publish runs under paho's
+        # internal lock and taking ours around publish() could deadlock
+        with self._stats_lock:
+            self._published += 1
+            if msg_info.mid in self._early_acks:
+                self._early_acks.discard(msg_info.mid)
+                self._acked += 1
+            else:
+                self._inflight[msg_info.mid] = time.monotonic()
+
+    def _replay_spool(self) -> bool:
+        """Publish the next chunk of spooled messages in order. Returns False if the spool is empty."""
+        if not self.spoolFile or self._spool_pending == 0:
+            return False
+
+        with self._spool_lock:
+            chunk = self._read_spool(self._spool_offset, limit=200)
+
+        for line_end, message in chunk:
+            if message is not None:
+                while self.online and len(self._inflight) >= self.maxInflight:
+                    self._wakeup.wait(timeout=0.1)
+                    self._wakeup.clear()
+                if not self._running or not self.online:
+                    # Resume from this message once we are reconnected
+                    return True
+                self._publish(message)
+            with self._spool_lock:
+                self._spool_offset = line_end
+                self._spool_pending -= 1
+
+        with self._spool_lock:
+            if self._spool_offset >= os.path.getsize(self.spoolFile):
+                # Fully replayed; start a fresh spool
+                open(self.spoolFile, 'w').close()
+                self._spool_offset = 0
+                self._spool_pending = 0
+            elif not chunk:
+                # Only an incomplete line is left; never discard unread bytes
+                return False
+        return True
+
+    # ---------------------------------------------------------------------------------
+    # Spool file (one JSON-encoded message per line, replayed from _spool_offset)
+    # Delivery is at-least-once: messages replayed just before a crash may be sent again.
+    # ---------------------------------------------------------------------------------
+
+    def _repair_spool(self):
+        """End a line torn by a crash mid-append, so the next append doesn't run into it."""
+        if not self.spoolFile or not os.path.exists(self.spoolFile) or not os.path.getsize(self.spoolFile):
+            return
+        with open(self.spoolFile, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def _count_spooled(self) -> int:
+        if not self.spoolFile or not os.path.exists(self.spoolFile):
+            return 0
+        with open(self.spoolFile, 'rb') as f:
+            return sum(1 for line in f if line.endswith(b'\n'))
+
+    def _read_spool(self, offset: int, limit: int = None) -> list:
+        """Return up to ``limit`` (line_end_offset, message) pairs starting at ``offset``.
+
+        Reading stops at the last complete line. Lines that aren't valid JSON are returned
+        with a message of None, so the replay position can move past them.
+        """
+        messages = []
+        if not os.path.exists(self.spoolFile):
+            return messages
+        with open(self.spoolFile, 'rb') as f:
+            f.seek(offset)
+            position = offset
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                position += len(line)
+                try:
+                    messages.append((position, json.loads(line)))
+                except json.JSONDecodeError:
+                    messages.append((position, None))
+                if limit is not None and len(messages) >= limit:
+                    break
+        return messages
+
+    def _append_to_spool(self, messages: list):
+        with open(self.spoolFile, 'a', encoding='utf-8', newline='\n') as f:
+            for message in messages:
+                f.write(json.dumps(message) + '\n')
+        self._spool_pending += len(messages)
 
-        # Wait for our message to be published
-        # Due to the race condition described in on_publish, the is way is considered safer... apparently.
-        msg_info.wait_for_publish()
+    def _spill_queue(self):
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not pending:
+            return
+        if not self.spoolFile:
+            self._dropped += len(pending)
+            return
+        with self._spool_lock:
+            # In-memory messages are older than anything still waiting in the spool
+            remaining = [message for _, message in self._read_spool(self._spool_offset) if message is not None]
+            tmp_path = f"{self.spoolFile}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+                for message in pending + remaining:
+                    f.write(json.dumps(message) + '\n')
+            os.replace(tmp_path, self.spoolFile)
+            self._spool_offset = 0
+            self._spool_pending = len(pending) + len(remaining)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Plate Image Migration
+Moves plate crops from the old single-directory layout into the sharded layout used by
+PlateImageStore and rebuilds the image index. Run it from the server directory while the
+server is stopped. Slimmed raw records keep their old flat paths; RawImageRefs finds the moved
+files through the rebuilt index.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+import yaml
+
+from plate_store import PlateImageStore
+
+# <plate>_<region>_<YYYYmmdd>_<HHMMSS>_<confidence>.jpg, as written by save_plate_image()
+FILENAME_TIME = re.compile(r'_(\d{8}_\d{6})_[\d.]+\.jpg$')
+
+
+def image_time(path, filename):
+    """Read time encoded in the file name, falling back to the file's mtime"""
+    match = FILENAME_TIME.search(filename)
+    if match:
+        try:
+            return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def event_keys_by_image(parsed_output_file):
+    """Map image file names to the event_key of the record that references them"""
+    keys = {}
+    if not parsed_output_file or not os.path.exists(parsed_output_file):
+        return keys
+    with open(parsed_output_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            image_filename = record.get('image_filename')
+            if image_filename and record.get('event_key'):
+                keys[image_filename.rsplit('/', 1)[-1]] = record['event_key']
+    return keys
+
+
+def migrate(plates_dir, layout, parsed_output_file=None, dry_run=False):
+    """Move every top-level JPEG in plates_dir into its shard. Returns the number moved."""
+    if layout == 'flat':
+        print("Layout is 'flat'; nothing to migrate.")
+        return 0
+
+    store = PlateImageStore(plates_dir, layout=layout)
+    keys = event_keys_by_image(parsed_output_file)
+    flat_files = sorted(
+        entry.name for entry in os.scandir(plates_dir)
+        if entry.is_file() and entry.name.endswith('.jpg')
+    )
+
+    print(f"Found {len(flat_files)} images in the flat layout of '{plates_dir}'")
+    moved = 0
+    for index, filename in enumerate(flat_files, 1):
+        source = os.path.join(plates_dir, filename)
+        shard = store.shard_for(filename, image_time(source, filename))
+        relpath = f"{shard}/{filename}"
+
+        if dry_run:
+            print(f"  {filename} -> {relpath}")
+            moved += 1
+            continue
+
+        target = os.path.join(plates_dir, *relpath.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+        if store.resolve(filename) == filename:
+            store.relocate(filename, relpath, key=keys.get(filename))
+        else:
+            # Not in the index yet (e.g. copied in after the index was created)
+            store.add_existing(keys.get(filename, f"file:{filename}"), relpath, os.path.getsize(target))
+        moved += 1
+        if index % 1000 == 0:
+            print(f"Moved {index}/{len(flat_files)}...", end='\r')
+
+    if not dry_run:
+        store.rewrite_index()
+    store.close()
+
+    count, total_bytes = store.totals()
+    print(f"\nMigration {'preview' if dry_run else 'complete'}!")
+    print(f"  Moved: {moved}")
+    print(f"  Indexed images: {count} ({total_bytes / (1024 * 1024):.1f} MB)")
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Move plate images from the flat layout into the sharded layout',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s                        # Use plates_dir and plates_layout from config.yaml
+  %(prog)s --dry-run              # Show where each image would go
+  %(prog)s --plates-dir D:\\plates --layout hash
+        """
+    )
+
+    parser.add_argument('--config', default='config.yaml', help='Server config file (default: config.yaml)')
+    parser.add_argument('--plates-dir', help='Plate image directory (default: plates_dir from config)')
+    parser.add_argument('--layout', choices=['hour', 'hash'], help='Target layout (default: plates_layout from config)')
+    parser.add_argument('--dry-run', action='store_true', help='Only print what would be moved')
+
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r') as config_file:
+            config = yaml.safe_load(config_file).get('integrated_server', {})
+
+    plates_dir = args.plates_dir or config.get('plates_dir', 'plates')
+    layout = args.layout or config.get('plates_layout', 'hour')
+    if not os.path.isdir(plates_dir):
+        print(f"Error: '{plates_dir}' is not a directory")
+        sys.exit(1)
+
+    migrate(plates_dir, layout, config.get('parsed_output_file', 'alpr_parsed_data.jsonl'), args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+One MQTT connection for all the worker processes of a multi-worker server.
+
+Each worker creates a SharedMqttPublisher. The worker holding the election lock is the
+publisher: it owns the only labMqttPublisher (and its spool) and forwards its own messages
+to it directly. The others are followers: they append their messages to a hand-off file,
+which the publisher drains into its outbox. If the publisher exits or dies, the OS releases
+the lock and a follower takes over within ``election_interval`` seconds, starting with
+whatever is still in the hand-off file.
+
+Delivery is at-least-once, like the spool: messages drained just before a crash may be
+forwarded again.
+"""
+
+import json
+import os
+import threading
+from typing import Callable
+
+from file_lock import FileLock
+from jsonl_io import read_complete_lines
+
+
+class SharedMqttPublisher:
+
+    def __init__(
+        self,
+        make_publisher: Callable[[], object],
+        handoff_file: str,
+        election_interval: float = 5.0,
+        drain_interval: float = 0.2,
+        drain_batch: int = 1000,
+    ):
+        self.make_publisher = make_publisher
+        self.handoff_file = handoff_file
+        self.offset_file = f"{handoff_file}.offset"
+        self.election_interval = election_interval
+        self.drain_interval = drain_interval
+        self.drain_batch = drain_batch
+        self._election_lock = FileLock(f"{handoff_file}.publisher.lock")
+        self._file_lock = FileLock(f"{handoff_file}.lock")
+        self._publisher = None
+        self._running = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._handed_off = 0
+        self._drained = 0
+
+    @property
+    def is_publisher(self) -> bool:
+        return self._publisher is not None
+
+    def connect(self):
+        """Run the election (and, once elected, the hand-off drain) in the background."""
+        self._running = True
+        self._try_elect()
+        self._thread = threading.Thread(target=self._run, name="mqtt-handoff", daemon=True)
+        self._thread.start()
+
+    def disconnect(self):
+        """Stop; the publisher forwards what is left in the hand-off file and steps down."""
+        self._running = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._publisher is not None:
+            self._drain()
+            self._publisher.disconnect()
+            self._publisher = None
+            self._election_lock.release()
+
+    def transmit_message(self, message: str):
+        """Queue a message for publishing. Never waits on the broker."""
+        self.transmit_messages([message])
+
+    def transmit_messages(self, messages: list):
+        """Queue several messages at once, keeping their order."""
+        if not messages:
+            return
+        publisher = self._publisher
+        if publisher is not None:
+            publisher.transmit_messages(messages)
+            return
+        data = ''.join(json.dumps(message) + '\n' for message in messages).encode('utf-8')
+        with self._file_lock:
+            with open(self.handoff_file, 'ab') as f:
+                f.write(data)
+            self._handed_off += len(messages)
+
+    def stats(self) -> dict:
+        if self._publisher is not None:
+            stats = self._publisher.stats()
+            stats.update({'role': 'publisher', 'drained_from_followers': self._drained})
+            return stats
+        return {
+            'online': self._running,
+            'queue_depth': 0,
+            'spooled': 0,
+            'in_flight': 0,
+            'published': 0,
+            'acked': 0,
+            'spilled': 0,
+            'dropped': 0,
+            'avg_ack_latency_ms': 0,
+            'max_ack_latency_ms': 0,
+            'role': 'follower',
+            'handed_off': self._handed_off,
+        }
+
+    # ---------------------------------------------------------------------------------
+    # Election and hand-off drain
+    # ---------------------------------------------------------------------------------
+
+    def _try_elect(self) -> bool:
+        if not self._election_lock.acquire(blocking=False):
+            return False
+        publisher = self.make_publisher()
+        publisher.connect()
+        self._publisher = publisher
+        return True
+
+    def _run(self):
+        while self._running:
+            if self._publisher is None:
+                try:
+                    self._try_elect()
+                except Exception as e:
+                    print(f"Error taking over MQTT publishing: {e}")
+                self._stop.wait(self.drain_interval if self._publisher else self.election_interval)
+                continue
+            try:
+                self._drain()
+            except OSError as e:
+                print(f"Error reading MQTT hand-off file: {e}")
+            self._stop.wait(self.drain_interval)
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.offset_file, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_offset(self, offset: int):
+        with open(self.offset_file, 'w') as f:
+            f.write(str(offset))
+
+    def _drain(self):
+        """Move messages from the hand-off file to the outbox, then empty the file."""
+        if not os.path.exists(self.handoff_file):
+            return
+        with self._file_lock:
+            offset = start = self._load_offset()
+            if offset > os.path.getsize(self.handoff_file):
+                offset = start = 0
+            while True:
+                lines, offset = read_complete_lines(self.handoff_file, offset, self.drain_batch)
+                messages = []
+                for _, text in lines:
+                    try:
+                        messages.append(json.loads(text))
+                    except json.JSONDecodeError:
+                        continue
+                if messages:
+                    self._publisher.transmit_messages(messages)
+                    self._drained += len(messages)
+                if len(lines) < self.drain_batch:
+                    break
+                self._save_offset(offset)
+            if offset == start:
+                return
+            if offset >= os.path.getsize(self.handoff_file):
+                # Fully forwarded; followers append under this lock, so nothing is lost
+                open(self.handoff_file, 'w').close()
+                offset = 0
+            self._save_offset(offset)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from jsonl_io import atomic_write_json, file_identity, iter_json_lines, read_complete_lines
+
+
+class PlateAggregate:
+    """One summary per license plate, built from the parsed records file.
+
+    Each summary holds the plate's best read (highest confidence among reads with a region:
+    its confidence, region, camera, timestamp and image), when the plate was first and last
+    seen, and how many times. Folding in a record is O(1).
+
+    The summaries only ever include records up to the file position they were read to, and
+    are checkpointed together with that position, so startup only folds in records written
+    after the checkpoint and a record is never counted twice.
+
+    After startup the writer thread hands each batch of parsed lines to :meth:`apply` once it
+    is in the file, which folds them in and moves the position to the end of the file. With
+    ``follow`` (several server processes appending to the same file), reads and checkpoints
+    instead fold in whatever was appended since the last one, so every process also sees
+    the records ingested by the others.
+    """
+
+    def __init__(
+        self,
+        parsed_output_file: str,
+        checkpoint_file: Optional[str] = None,
+        chunk_lines: int = 10000,
+        follow: bool = False,
+    ):
+        self.parsed_output_file = parsed_output_file
+        self.checkpoint_file = checkpoint_file
+        self.chunk_lines = chunk_lines
+        self.follow = follow
+        self._lock = threading.Lock()
+        self._plates: Dict[str, dict] = {}
+        self._identity = None
+        self._offset = 0
+        self._dirty = False
+        self._seed()
+
+    def _seed(self) -> None:
+        identity = file_identity(self.parsed_output_file)
+        if identity is None:
+            return
+
+        offset = 0
+        checkpoint = self._load_checkpoint()
+        if (
+            checkpoint
+            and tuple(checkpoint['identity']) == identity
+            and checkpoint['offset'] <= os.path.getsize(self.parsed_output_file)
+        ):
+            self._plates = checkpoint['plates']
+            offset = checkpoint['offset']
+        self._identity = identity
+        self._offset = offset
+        self._read_new_lines()
+
+    def _read_new_lines(self) -> None:
+        while True:
+            lines, self._offset = read_complete_lines(self.parsed_output_file, self._offset, self.chunk_lines)
+            for _, record in iter_json_lines(lines):
+                self._add(record)
+            if len(lines) < self.chunk_lines:
+                break
+
+    def refresh(self) -> None:
+        """Fold in the records appended to the parsed file since the last read."""
+        identity = file_identity(self.parsed_output_file)
+        if identity is None:
+            return
+        with self._lock:
+            if identity != self._identity or os.path.getsize(self.parsed_output_file) < self._offset:
+                # Replaced or truncated: start over from its first line
+                self._plates = {}
+                self._identity = identity
+                self._offset = 0
+            self._read_new_lines()
+
+    def apply(self, data: bytes) -> None:
+        """Fold in lines the writer has just appended to the parsed file (the writer's
+        ``on_write`` hook for it)."""
+        lines = [(0, text) for text in data.decode('utf-8', errors='replace').splitlines()]
+        with self._lock:
+            for _, record in iter_json_lines(lines):
+                self._add(record)
+            if self._identity is None:
+                self._identity = file_identity(self.parsed_output_file)
+            self._offset = os.path.getsize(self.parsed_output_file)
+
+    def _load_checkpoint(self) -> dict:
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return {}
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _add(self, record: dict) -> None:
+        plate = record.get('license_plate')
+        if not plate:
+            return
+        timestamp = record.get('timestamp')
+        summary = self._plates.get(plate)
+        if summary is None:
+            summary = self._plates[plate] = {
+                'license_plate': plate,
+                'confidence': None,
+                'state_region': None,
+                'camera_id': None,
+                'timestamp': None,
+                'image_filename': None,
+                'first_seen': timestamp,
+                'last_seen': timestamp,
+                'sightings': 0,
+            }
+        summary['sightings'] += 1
+        summary['last_seen'] = timestamp
+
+        confidence = record.get('confidence') or 0
+        if record.get('state_region') and (summary['state_region'] is None or confidence > summary['confidence']):
+            summary.update({
+                'confidence': confidence,
+                'state_region': record['state_region'],
+                'camera_id': record.get('camera_id'),
+                'timestamp': timestamp,
+                'image_filename': record.get('image_filename'),
+            })
+        self._dirty = True
+
+    def get(self, license_plate: str) -> Optional[dict]:
+        if self.follow:
+            self.refresh()
+        with self._lock:
+            summary = self._plates.get(license_plate)
+            return dict(summary) if summary else None
+
+    def plates(self) -> List[dict]:
+        """Return every plate with a region-bearing read, in the order plates were first seen."""
+        if self.follow:
+            self.refresh()
+        with self._lock:
+            return [dict(summary) for summary in self._plates.values() if summary['state_region']]
+
+    def __len__(self) -> int:
+        return len(self._plates)
+
+    def checkpoint(self) -> None:
+        """Persist the summaries together with the parsed file position they cover."""
+        if not self.checkpoint_file:
+            return
+        if self.follow:
+            self.refresh()
+        with self._lock:
+            if not self._dirty or self._identity is None:
+                return
+            identity, offset = self._identity, self._offset
+            plates = {plate: dict(summary) for plate, summary in self._plates.items()}
+            self._dirty = False
+        atomic_write_json(self.checkpoint_file, {'identity': identity, 'offset': offset, 'plates': plates})
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from jsonl_io import file_identity, iter_json_lines, read_complete_lines
+from file_lock import FileLock
+from jsonl_writer import FileSink
+from plate_index import parse_timestamp, project
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plates (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    license_plate TEXT,
+    region TEXT,
+    camera_id TEXT,
+    confidence REAL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plates_ts ON plates (ts);
+CREATE INDEX IF NOT EXISTS plates_license_plate ON plates (license_plate);
+CREATE INDEX IF NOT EXISTS plates_region ON plates (region);
+CREATE INDEX IF NOT EXISTS plates_camera_id ON plates (camera_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqlitePlateStore:
+    """Parsed plate records in an indexed SQLite database (WAL mode).
+
+    The database mirrors the parsed JSONL file: :meth:`refresh` imports every complete line
+    appended since the last import in a single transaction, storing the file position it
+    reached alongside the rows. The first refresh therefore imports the existing history,
+    and an interrupted import or a crash between the JSONL append and the insert is caught
+    up on the next call. If the JSONL file is replaced or truncated the table is rebuilt.
+
+    Queries take the same arguments and return the same shapes as :class:`PlateIndex`, so
+    the API can use either. Cursors here are ``<generation>.<row id>`` in hex, where the
+    generation changes whenever the table is rebuilt.
+    """
+
+    def __init__(self, db_file: str, parsed_output_file: str, import_batch: int = 5000):
+        self.db_file = db_file
+        self.parsed_output_file = parsed_output_file
+        self.import_batch = import_batch
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    # ---------------------------------------------------------------------------------
+    # Import
+    # ---------------------------------------------------------------------------------
+
+    @staticmethod
+    def _get_meta(connection: sqlite3.Connection, key: str, default: Any = None) -> Any:
+        row = connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    @staticmethod
+    def _set_meta(connection: sqlite3.Connection, key: str, value: Any) -> None:
+        connection.execute(
+            'INSERT INTO meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+            (key, json.dumps(value)),
+        )
+
+    @staticmethod
+    def _row(record: dict) -> Tuple:
+        timestamp = parse_timestamp(record.get('timestamp'))
+        camera_id = record.get('camera_id')
+        return (
+            0.0 if timestamp is None else timestamp,
+            record.get('license_plate') or None,
+            (record.get('state_region') or '').lower() or None,
+            None if camera_id is None else str(camera_id),
+            record.get('confidence'),
+            json.dumps(record),
+        )
+
+    def refresh(self) -> int:
+        """Import complete lines appended to the JSONL file since the last import.
+
+        Returns the number of records added.
+        """
+        identity = file_identity(self.parsed_output_file)
+        if identity is None:
+            return 0
+
+        added = 0
+        with self._refresh_lock:
+            connection = self._connect()
+            while True:
+                # IMMEDIATE takes the write lock up front, so concurrent importers (other
+                # threads or processes) read the stored position one at a time
+                connection.execute('BEGIN IMMEDIATE')
+                try:
+                    source = self._get_meta(connection, 'source', {})
+                    offset = source.get('offset', 0)
+                    if source.get('identity') != list(identity) or os.path.getsize(self.parsed_output_file) < offset:
+                        if source:
+                            connection.execute('DELETE FROM plates')
+                            self._set_meta(connection, 'generation', self._get_meta(connection, 'generation', 0) + 1)
+                        offset = 0
+
+                    lines, next_offset = read_complete_lines(self.parsed_output_file, offset, self.import_batch)
+                    rows = [self._row(record) for _, record in iter_json_lines(lines)]
+                    connection.executemany(
+                        'INSERT INTO plates (ts, license_plate, region, camera_id, confidence, record) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        rows,
+                    )
+                    self._set_meta(connection, 'source', {'identity': list(identity), 'offset': next_offset})
+                    connection.execute('COMMIT')
+                except BaseException:
+                    connection.execute('ROLLBACK')
+                    raise
+                added += len(rows)
+                if len(lines) < self.import_batch:
+                    return added
+
+    # ---------------------------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------------------------
+
+    @property
+    def cursor(self) -> str:
+        connection = self._connect()
+        return self._encode_cursor(connection, self._max_id(connection))
+
+    def _max_id(self, connection: sqlite3.Connection) -> int:
+        return connection.execute('SELECT COALESCE(MAX(id), 0) FROM plates').fetchone()[0]
+
+    def _encode_cursor(self, connection: sqlite3.Connection, row_id: int) -> str:
+        return f"{self._get_meta(connection, 'generation', 0):x}.{row_id:x}"
+
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str]) -> Tuple[Optional[int], int]:
+        try:
+            generation, row_id = cursor.split('.')
+            return int(generation, 16), int(row_id, 16)
+        except (AttributeError, ValueError):
+            return None, 0
+
+    def all(self) -> List[dict]:
+        rows = self._connect().execute('SELECT record FROM plates ORDER BY id')
+        return [json.loads(record) for record, in rows]
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM plates').fetchone()[0]
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        camera_id: Optional[str] = None,
+        region: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        page: int = 1,
+        descending: bool = False,
+        cursor: Optional[str] = None,
+        with_total: bool = False,
+    ) -> Dict[str, Any]:
+        """Return the records matching the given filters (see :meth:`PlateIndex.query`)."""
+        if (limit is not None and limit < 1) or page < 1:
+            raise ValueError('limit and page must be at least 1')
+        conditions: List[str] = []
+        params: List[Any] = []
+        if since is not None:
+            conditions.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('ts < ?')
+            params.append(until)
+        if camera_id is not None:
+            conditions.append('camera_id = ?')
+            params.append(camera_id)
+        if region is not None:
+            conditions.append('region = ?')
+            params.append(region.lower())
+
+        connection = self._connect()
+        # Read the cursor bounds and the rows from one snapshot
+        connection.execute('BEGIN')
+        try:
+            max_id = self._max_id(connection)
+            generation, after_id = self._decode_cursor(cursor)
+            if cursor and generation == self._get_meta(connection, 'generation', 0) and after_id <= max_id:
+                where = f" WHERE {' AND '.join(['id > ?', 'id <= ?'] + conditions)}"
+                params = [after_id, max_id] + params
+                sql = f'SELECT id, record FROM plates{where} ORDER BY id'
+                if limit is not None:
+                    sql += f' LIMIT {int(limit)}'
+                rows = connection.execute(sql, params).fetchall()
+                next_id = rows[-1][0] if limit is not None and len(rows) >= limit else max_id
+                result = {
+                    'plates': [project(json.loads(record), fields) for _, record in rows],
+                    'cursor': self._encode_cursor(connection, next_id),
+                    'reset': False,
+                }
+            else:
+                where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+                order = 'DESC' if descending else 'ASC'
+                sql = f'SELECT record FROM plates{where} ORDER BY ts {order}, id {order}'
+                if limit is not None:
+                    sql += f' LIMIT {int(limit)} OFFSET {max(page - 1, 0) * int(limit)}'
+                rows = connection.execute(sql, params).fetchall()
+                result = {
+                    'plates': [project(json.loads(record), fields) for record, in rows],
+                    'cursor': self._encode_cursor(connection, max_id),
+                    'reset': cursor is not None,
+                }
+            if with_total:
+                # A full count of the matches, so only done when asked for
+                result['total'] = connection.execute(f'SELECT COUNT(*) FROM plates{where}', params).fetchone()[0]
+            return result
+        finally:
+            connection.execute('COMMIT')
+
+
+class IndexedFileSink(FileSink):
+    """The parsed JSONL sink, importing each flushed batch into a :class:`SqlitePlateStore`.
+
+    Runs on the writer thread, so every group-committed batch becomes one SQLite transaction.
+    Queries rely on this to keep the table current, so they never refresh it themselves. A
+    failed import is retried from the stored file position on the next flush.
+    """
+
+    def __init__(self, path: str, store: SqlitePlateStore, lock: Optional[FileLock] = None):
+        super().__init__(path, lock)
+        self.store = store
+
+    def flush(self) -> None:
+        super().flush()
+        try:
+            self.store.refresh()
+        except sqlite3.Error as e:
+            print(f"Error importing plates into {self.store.db_file}: {e}")
@@ -2,38 +2,323 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Optional, Set
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from jsonl_io import atomic_write_json, file_identity, iter_json_lines, read_complete_lines
+from plate_index import parse_timestamp
+
+
+class ExpiringKeyStore:
+    """Set of keys that forgets them after ``retention_seconds`` and never holds more than ``max_entries``.
+
+    Keys live in an insertion-ordered dict with the time they were added. Times only move
+    forward, so the oldest key is always first: expiry and eviction pop from the front and cost
+    O(1) per key removed.
+    """
+
+    def __init__(self, retention_seconds: float = 3600.0, max_entries: int = 100000):
+        self.retention_seconds = retention_seconds
+        self.max_entries = max_entries
+        self._keys: OrderedDict[str, float] = OrderedDict()
+        self._last_time = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.retention_seconds
+        while self._keys:
+            key, added = next(iter(self._keys.items()))
+            if added >= cutoff:
+                break
+            self._keys.popitem(last=False)
+            self._expired += 1
+
+    def __contains__(self, key: str) -> bool:
+        return self.contains(key)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def contains(self, key: str, now: Optional[float] = None) -> bool:
+        self._expire(time.time() if now is None else now)
+        if key in self._keys:
+            self._hits += 1
+            return True
+        self._misses += 1
+        return False
+
+    def add(self, key: str, now: Optional[float] = None) -> None:
+        now = max(time.time() if now is None else now, self._last_time)
+        self._last_time = now
+        self._expire(now)
+        if key in self._keys:
+            return
+        self._keys[key] = now
+        while len(self._keys) > self.max_entries:
+            self._keys.popitem(last=False)
+            self._evicted += 1
+
+    def add_if_absent(self, key: str, now: Optional[float] = None) -> bool:
+        """Add ``key`` unless it is already remembered. Returns whether it was added."""
+        if self.contains(key, now):
+            return False
+        self.add(key, now)
+        return True
+
+    def add_many(self, items: Iterable[Tuple[str, float]]) -> None:
+        for key, added in items:
+            self.add(key, added)
+
+    def discard(self, key: str) -> None:
+        self._keys.pop(key, None)
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+    def items(self) -> List[Tuple[str, float]]:
+        """Return ``(key, time_added)`` pairs, oldest first."""
+        return list(self._keys.items())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size': len(self._keys),
+            'max_entries': self.max_entries,
+            'retention_seconds': self.retention_seconds,
+            'hits': self._hits,
+            'misses': self._misses,
+            'expired': self._expired,
+            'evicted': self._evicted,
+        }
+
+
+class SqliteKeyStore:
+    """:class:`ExpiringKeyStore` kept in a SQLite table (WAL mode), shared by every process using ``db_file``.
+
+    :meth:`add_if_absent` is a single upsert, so when several server workers receive
+    re-deliveries of the same event at once exactly one of them gets True. Expired keys are
+    ignored on lookup and deleted (along with the oldest keys beyond ``max_entries``) at most
+    every ``expire_interval`` seconds. The hit and miss counters are per process.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        retention_seconds: float = 3600.0,
+        max_entries: int = 100000,
+        expire_interval: float = 30.0,
+    ):
+        self.db_file = db_file
+        self.retention_seconds = retention_seconds
+        self.max_entries = max_entries
+        self.expire_interval = expire_interval
+        self._local = threading.local()
+        self._last_expire = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS event_keys (key TEXT PRIMARY KEY, added REAL NOT NULL)'
+        )
+        self._connect().execute('CREATE INDEX IF NOT EXISTS event_keys_added ON event_keys (added)')
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _maybe_expire(self, connection: sqlite3.Connection, now: float) -> None:
+        if now - self._last_expire < self.expire_interval:
+            return
+        self._last_expire = now
+        self._expired += connection.execute(
+            'DELETE FROM event_keys WHERE added < ?', (now - self.retention_seconds,)
+        ).rowcount
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self._evicted += connection.execute(
+                'DELETE FROM event_keys WHERE key IN (SELECT key FROM event_keys ORDER BY added LIMIT ?)', (excess,)
+            ).rowcount
+
+    def __contains__(self, key: str) -> bool:
+        return self.contains(key)
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM event_keys').fetchone()[0]
+
+    def contains(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        row = self._connect().execute(
+            'SELECT 1 FROM event_keys WHERE key = ? AND added >= ?', (key, now - self.retention_seconds)
+        ).fetchone()
+        if row:
+            self._hits += 1
+            return True
+        self._misses += 1
+        return False
+
+    def add(self, key: str, now: Optional[float] = None) -> None:
+        self._insert(key, time.time() if now is None else now)
+
+    def _insert(self, key: str, now: float) -> bool:
+        connection = self._connect()
+        self._maybe_expire(connection, now)
+        # An expired row that hasn't been deleted yet is taken over as if it were absent
+        return connection.execute(
+            'INSERT INTO event_keys (key, added) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET added = excluded.added WHERE event_keys.added < ?',
+            (key, now, now - self.retention_seconds),
+        ).rowcount == 1
+
+    def add_if_absent(self, key: str, now: Optional[float] = None) -> bool:
+        """Add ``key`` unless it is already remembered. Returns whether it was added."""
+        added = self._insert(key, time.time() if now is None else now)
+        if added:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return added
+
+    def add_many(self, items: Iterable[Tuple[str, float]]) -> None:
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany('INSERT OR IGNORE INTO event_keys (key, added) VALUES (?, ?)', items)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def discard(self, key: str) -> None:
+        self._connect().execute('DELETE FROM event_keys WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        self._connect().execute('DELETE FROM event_keys')
+
+    def items(self) -> List[Tuple[str, float]]:
+        """Return ``(key, time_added)`` pairs, oldest first."""
+        return self._connect().execute('SELECT key, added FROM event_keys ORDER BY added').fetchall()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size': len(self),
+            'max_entries': self.max_entries,
+            'retention_seconds': self.retention_seconds,
+            'hits': self._hits,
+            'misses': self._misses,
+            'expired': self._expired,
+            'evicted': self._evicted,
+            'shared': True,
+        }
 
 
 class AlprEventDeduper:
-    """Prevent repeated ALPR payloads for the same detection event from being recorded twice."""
+    """Prevent repeated ALPR payloads for the same detection event from being recorded twice.
+
+    Rekor re-deliveries arrive within minutes, so event keys are only remembered for
+    ``retention_seconds`` (and at most ``max_entries`` of them).
+
+    With a ``snapshot_file`` the remembered keys are saved periodically together with the
+    parsed file position they cover. Startup then loads the snapshot and only scans the part
+    of the parsed file written after it, instead of decoding the whole history.
 
-    def __init__(self, parsed_output_file: Optional[str] = None):
-        self._processed_event_keys: Set[str] = set()
+    With a ``shared_db_file`` the keys live in a :class:`SqliteKeyStore` instead, so that
+    several server processes agree on which deliveries are duplicates. The table persists on
+    its own, so no snapshot is kept; the parsed file is only scanned when the table is empty.
+    """
+
+    def __init__(
+        self,
+        parsed_output_file: Optional[str] = None,
+        retention_seconds: float = 3600.0,
+        max_entries: int = 100000,
+        snapshot_file: Optional[str] = None,
+        before_snapshot: Optional[Callable[[], object]] = None,
+        shared_db_file: Optional[str] = None,
+    ):
+        self._lock = threading.Lock()
+        if shared_db_file:
+            self._processed_event_keys = SqliteKeyStore(shared_db_file, retention_seconds, max_entries)
+            snapshot_file = None
+        else:
+            self._processed_event_keys = ExpiringKeyStore(retention_seconds, max_entries)
         self.parsed_output_file = parsed_output_file
+        self.snapshot_file = snapshot_file
+        # Called before the file position is recorded, e.g. to drain a write-behind queue
+        self.before_snapshot = before_snapshot
 
-        if self.parsed_output_file and os.path.exists(self.parsed_output_file):
+        if self.parsed_output_file and os.path.exists(self.parsed_output_file) and not len(self._processed_event_keys):
             self._load_existing_keys()
 
     def _load_existing_keys(self) -> None:
+        cutoff = time.time() - self._processed_event_keys.retention_seconds
+        offset = self._load_snapshot(cutoff)
         try:
-            with open(self.parsed_output_file, 'r', encoding='utf-8') as handle:
-                for line in handle:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        payload = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-
-                    event_key = payload.get('event_key')
-                    if event_key:
-                        self._processed_event_keys.add(event_key)
+            lines, _ = read_complete_lines(self.parsed_output_file, offset)
+            keys = []
+            for _, payload in iter_json_lines(lines):
+                event_key = payload.get('event_key')
+                if not event_key:
+                    continue
+                recorded_at = parse_timestamp(payload.get('timestamp'))
+                if recorded_at is not None and recorded_at < cutoff:
+                    continue
+                keys.append((event_key, time.time() if recorded_at is None else recorded_at))
+            self._processed_event_keys.add_many(keys)
         except Exception:
-            self._processed_event_keys = set()
+            self._processed_event_keys.clear()
+
+    def _load_snapshot(self, cutoff: float) -> int:
+        """Load keys from the snapshot if it matches the parsed file. Returns the offset it covers."""
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return 0
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as handle:
+                snapshot = json.load(handle)
+            identity = file_identity(self.parsed_output_file)
+            if tuple(snapshot['identity']) != identity or snapshot['offset'] > os.path.getsize(self.parsed_output_file):
+                return 0
+            for event_key, added in snapshot['keys']:
+                if added >= cutoff:
+                    self._processed_event_keys.add(event_key, added)
+            return snapshot['offset']
+        except (OSError, ValueError, KeyError, TypeError):
+            self._processed_event_keys.clear()
+            return 0
+
+    def snapshot(self) -> None:
+        """Save the remembered keys with the parsed file position they cover."""
+        if not self.snapshot_file or not self.parsed_output_file:
+            return
+        if self.before_snapshot is not None:
+            self.before_snapshot()
+        # Keys are remembered before their records are written, so everything up to the
+        # current end of the (flushed) file is covered by the saved keys
+        identity = file_identity(self.parsed_output_file)
+        if identity is None:
+            return
+        offset = os.path.getsize(self.parsed_output_file)
+        with self._lock:
+            keys = [[key, round(added, 3)] for key, added in self._processed_event_keys.items()]
+        atomic_write_json(self.snapshot_file, {'identity': identity, 'offset': offset, 'keys': keys})
 
-    def _event_key(self, data: dict) -> Optional[str]:
+    def event_key(self, data: dict) -> Optional[str]:
         best_uuid = data.get('best_uuid')
         if best_uuid:
             return f"uuid:{best_uuid}"
@@ -51,18 +336,152 @@ class AlprEventDeduper:
         return f"fallback:{epoch_start}:{epoch_end}:{camera_id}:{plate}:{region}"
 
     def should_record(self, data: dict) -> bool:
-        event_key = self._event_key(data)
+        event_key = self.event_key(data)
         if not event_key:
             return True
 
-        if event_key in self._processed_event_keys:
-            return False
+        with self._lock:
+            return self._processed_event_keys.add_if_absent(event_key)
 
-        self._processed_event_keys.add(event_key)
-        return True
+    def release(self, data: dict) -> None:
+        """Forget the key reserved by :meth:`should_record`, for a payload that failed to be recorded."""
+        event_key = self.event_key(data)
+        if event_key:
+            with self._lock:
+                self._processed_event_keys.discard(event_key)
 
     def mark_recorded(self, data: dict, parsed_record: dict) -> None:
-        event_key = self._event_key(data)
+        event_key = self.event_key(data)
         if event_key:
             parsed_record['event_key'] = event_key
-            self._processed_event_keys.add(event_key)
+            with self._lock:
+                self._processed_event_keys.add(event_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._processed_event_keys.stats()
+
+
+def deletion_variants(text: str, max_deletions: int) -> Set[str]:
+    """Return ``text`` and every string made by deleting up to ``max_deletions`` characters."""
+    variants = {text}
+    frontier = {text}
+    for _ in range(max_deletions):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class NearDuplicateFilter:
+    """Suppress reads of the same car whose plate text differs by a few OCR errors.
+
+    Plates recorded in the last ``window_seconds`` are indexed per camera by their deletion
+    neighbourhood: every variant with up to ``max_distance`` characters removed. Two plates
+    within that edit distance always share a variant, so a new read only needs the variants
+    of its own text to find candidates, which are then confirmed with an exact edit distance.
+    Plates leave the window (and the index) oldest first.
+    """
+
+    def __init__(self, window_seconds: float = 30.0, max_distance: int = 1):
+        self.window_seconds = window_seconds
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._entries: Deque[Tuple[float, int, object, str]] = deque()
+        self._index: Dict[Tuple[object, str], Dict[int, str]] = {}
+        self._next_id = 0
+        self._checks = 0
+        self._matches = 0
+
+    @staticmethod
+    def normalize(plate: str) -> str:
+        return ''.join(char for char in plate.upper() if char.isalnum())
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._entries and self._entries[0][0] < cutoff:
+            _, entry_id, camera_id, plate = self._entries.popleft()
+            for variant in deletion_variants(plate, self.max_distance):
+                bucket = self._index.get((camera_id, variant))
+                if bucket is not None:
+                    bucket.pop(entry_id, None)
+                    if not bucket:
+                        del self._index[(camera_id, variant)]
+
+    def check(self, camera_id, plate: str, now: Optional[float] = None) -> Optional[str]:
+        """Return a recent plate from ``camera_id`` within ``max_distance`` of ``plate``.
+
+        If there is none, ``plate`` is added to the window and None is returned.
+        """
+        plate = self.normalize(plate)
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._entries:
+                now = max(now, self._entries[-1][0])
+            self._expire(now)
+            self._checks += 1
+            match = self._match(camera_id, plate)
+            if match is not None:
+                self._matches += 1
+            else:
+                self._add(camera_id, plate, now)
+            return match
+
+    def release(self, camera_id, plate: str) -> None:
+        """Take back the entry :meth:`check` added for ``plate``, for a read that failed to be recorded."""
+        plate = self.normalize(plate)
+        with self._lock:
+            bucket = self._index.get((camera_id, plate), {})
+            entry_ids = [entry_id for entry_id, candidate in bucket.items() if candidate == plate]
+            if not entry_ids:
+                return
+            # The newest is the one just added; its place in the window is skipped when it expires
+            entry_id = max(entry_ids)
+            for variant in deletion_variants(plate, self.max_distance):
+                variant_bucket = self._index.get((camera_id, variant))
+                if variant_bucket is not None:
+                    variant_bucket.pop(entry_id, None)
+                    if not variant_bucket:
+                        del self._index[(camera_id, variant)]
+
+    def _match(self, camera_id, plate: str) -> Optional[str]:
+        best = None
+        best_distance = self.max_distance + 1
+        for variant in deletion_variants(plate, self.max_distance):
+            for candidate in self._index.get((camera_id, variant), {}).values():
+                distance = edit_distance(plate, candidate, self.max_distance)
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return best
+
+    def _add(self, camera_id, plate: str, now: float) -> None:
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries.append((now, entry_id, camera_id, plate))
+        for variant in deletion_variants(plate, self.max_distance):
+            self._index.setdefault((camera_id, variant), {})[entry_id] = plate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'window_seconds': self.window_seconds,
+                'max_distance': self.max_distance,
+                'plates_in_window': len(self._entries),
+                'index_keys': len(self._index),
+                'checks': self._checks,
+                'matches': self._matches,
+            }
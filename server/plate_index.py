@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from jsonl_io import decode_cursor, encode_cursor, file_identity, iter_json_lines, read_complete_lines
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Convert an ISO-8601 string or epoch seconds/milliseconds to epoch seconds."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    text = str(value).strip()
+    try:
+        return parse_timestamp(float(text))
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def project(record: dict, fields: Optional[Sequence[str]]) -> dict:
+    """Return only the requested top-level ``fields`` of ``record``."""
+    if not fields:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+class PlateIndex:
+    """Time-ordered in-memory view of the parsed plate JSONL file.
+
+    The index tails the file, so anything appended to it (by this process or another) is
+    picked up on the next :meth:`refresh`. Records are kept in file order alongside a
+    timestamp-sorted view used to answer window queries with a binary search.
+    """
+
+    def __init__(self, parsed_output_file: str):
+        self.parsed_output_file = parsed_output_file
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self._identity: Optional[Tuple[int, int]] = None
+        self._offset = 0
+        # File order
+        self._records: List[dict] = []
+        self._starts: List[int] = []
+        self._record_times: List[Optional[float]] = []
+        # Timestamp order: parallel lists of sort key and position in ``_records``
+        self._times: List[float] = []
+        self._by_time: List[int] = []
+
+    @property
+    def cursor(self) -> str:
+        return encode_cursor(self._identity, self._offset)
+
+    def refresh(self) -> None:
+        """Pull in any complete lines appended to the file since the last refresh."""
+        with self._lock:
+            identity = file_identity(self.parsed_output_file)
+            if identity is None:
+                if self._identity is not None:
+                    self._reset_state()
+                return
+
+            if identity != self._identity or os.path.getsize(self.parsed_output_file) < self._offset:
+                self._reset_state()
+                self._identity = identity
+
+            lines, next_offset = read_complete_lines(self.parsed_output_file, self._offset)
+            for start, record in iter_json_lines(lines):
+                self._add(record, start)
+            self._offset = next_offset
+
+    def _add(self, record: dict, start: int) -> None:
+        position = len(self._records)
+        timestamp = parse_timestamp(record.get('timestamp'))
+        self._records.append(record)
+        self._starts.append(start)
+        self._record_times.append(timestamp)
+
+        # Records without a usable timestamp sort first and only show up in unbounded queries
+        sort_key = 0.0 if timestamp is None else timestamp
+        slot = bisect.bisect_right(self._times, sort_key)
+        self._times.insert(slot, sort_key)
+        self._by_time.insert(slot, position)
+
+    def all(self) -> List[dict]:
+        with self._lock:
+            return list(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        camera_id: Optional[str] = None,
+        region: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        page: int = 1,
+        descending: bool = False,
+        cursor: Optional[str] = None,
+        with_total: bool = False,
+    ) -> Dict[str, Any]:
+        """Return the records matching the given filters.
+
+        With a valid ``cursor`` only records appended after it are considered, in file order,
+        and the returned cursor points just past the last record examined. Otherwise the
+        ``since``/``until`` window is located by binary search and paginated with
+        ``limit``/``page``; the scan stops once the requested page is filled.
+
+        ``total`` (the number of matching records, in either case) is only counted, and only
+        included, with ``with_total``, since it means visiting every match.
+        """
+        if (limit is not None and limit < 1) or page < 1:
+            raise ValueError('limit and page must be at least 1')
+        with self._lock:
+            identity, offset = decode_cursor(cursor)
+            if cursor and identity == self._identity and offset <= self._offset:
+                plates: List[dict] = []
+                next_offset = self._offset
+                total = 0
+                first = bisect.bisect_left(self._starts, offset)
+                for position in range(first, len(self._records)):
+                    record = self._records[position]
+                    timestamp = self._record_times[position]
+                    if since is not None and (timestamp is None or timestamp < since):
+                        continue
+                    if until is not None and (timestamp is None or timestamp >= until):
+                        continue
+                    if not _matches(record, camera_id, region):
+                        continue
+                    total += 1
+                    if limit is not None and len(plates) >= limit:
+                        if next_offset == self._offset:
+                            next_offset = self._starts[position]
+                        if not with_total:
+                            break
+                        continue
+                    plates.append(project(record, fields))
+                result = {
+                    'plates': plates,
+                    'cursor': encode_cursor(self._identity, next_offset),
+                    'reset': False,
+                }
+                if with_total:
+                    result['total'] = total
+                return result
+
+            low = 0 if since is None else bisect.bisect_left(self._times, since)
+            high = len(self._times) if until is None else bisect.bisect_left(self._times, until)
+            positions: Iterable[int] = self._by_time[low:high]
+            if descending:
+                positions = reversed(positions)
+            start = (page - 1) * limit if limit is not None else 0
+            end = start + limit if limit is not None else None
+            selected: List[dict] = []
+            total = 0
+            for position in positions:
+                record = self._records[position]
+                if not _matches(record, camera_id, region):
+                    continue
+                if total >= start and (end is None or total < end):
+                    selected.append(record)
+                total += 1
+                if end is not None and total >= end and not with_total:
+                    break
+
+            result = {
+                'plates': [project(record, fields) for record in selected],
+                'cursor': self.cursor,
+                'reset': cursor is not None,
+            }
+            if with_total:
+                result['total'] = total
+            return result
+
+
+def _matches(record: dict, camera_id: Optional[str], region: Optional[str]) -> bool:
+    if camera_id is not None and str(record.get('camera_id')) != camera_id:
+        return False
+    if region is not None and (record.get('state_region') or '').lower() != region.lower():
+        return False
+    return True
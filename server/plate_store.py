@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from file_lock import FileLock
+
+
+class PlateImageStore:
+    """Plate-crop JPEGs sharded into subdirectories, with a compact index.
+
+    Images are written to ``<root>/<shard>/<filename>`` where the shard is derived from the
+    read's time (``hour``: ``YYYY/MM/DD/HH``) or from a hash of the file name (``hash``:
+    ``ab/cd``). ``flat`` keeps the original single-directory layout.
+
+    The index is an append-only, tab-separated file (``key``, relative path, size) that maps
+    record keys (the dedup ``event_key``) and bare file names to the stored path. Files from the
+    old flat layout are indexed on first start, so they keep being served and counted.
+
+    When several processes share the store, pass a ``lock`` (:class:`FileLock`) so their
+    index appends don't interleave. Each process only knows the entries it loaded at start
+    or wrote itself; paths recorded elsewhere are still served, since they are relative paths.
+    """
+
+    LAYOUTS = ('flat', 'hour', 'hash')
+    INDEX_NAME = 'index.tsv'
+
+    def __init__(
+        self,
+        root: str,
+        layout: str = 'hour',
+        index_file: Optional[str] = None,
+        lock: Optional[FileLock] = None,
+    ):
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"layout must be one of {', '.join(self.LAYOUTS)}")
+        self.root = root
+        self.layout = layout
+        self.index_file = index_file or os.path.join(root, self.INDEX_NAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[str, int]] = {}   # relative path -> (key, size)
+        self._by_key: Dict[str, str] = {}
+        self._by_name: Dict[str, str] = {}
+        self._total_bytes = 0
+        self._index_handle = None
+        self._file_lock = lock
+
+        os.makedirs(root, exist_ok=True)
+        if os.path.exists(self.index_file):
+            self._load_index()
+        else:
+            self._index_flat_files()
+
+    # ---------------------------------------------------------------------------------
+    # Index
+    # ---------------------------------------------------------------------------------
+
+    def _load_index(self) -> None:
+        with open(self.index_file, 'r', encoding='utf-8') as handle:
+            for line in handle:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 3:
+                    continue
+                key, relpath, size = parts
+                try:
+                    self._remember(key, relpath, int(size))
+                except ValueError:
+                    continue
+
+    def _index_flat_files(self) -> None:
+        """Index images already sitting directly in the root (the pre-sharding layout)."""
+        entries = []
+        with os.scandir(self.root) as listing:
+            for entry in listing:
+                if entry.name.endswith('.jpg') and entry.is_file():
+                    entries.append((f"file:{entry.name}", entry.name, entry.stat().st_size))
+        self._append_index(entries)
+
+    def _remember(self, key: str, relpath: str, size: int) -> None:
+        previous = self._entries.get(relpath)
+        if previous is not None:
+            self._total_bytes -= previous[1]
+        self._entries[relpath] = (key, size)
+        self._total_bytes += size
+        if key:
+            self._by_key[key] = relpath
+        self._by_name[relpath.rsplit('/', 1)[-1]] = relpath
+
+    def _append_index(self, entries) -> None:
+        if self._index_handle is None:
+            self._index_handle = open(self.index_file, 'a', encoding='utf-8', newline='\n')
+        if self._file_lock is not None:
+            self._file_lock.acquire()
+        try:
+            for key, relpath, size in entries:
+                self._index_handle.write(f"{key}\t{relpath}\t{size}\n")
+                self._remember(key, relpath, size)
+            self._index_handle.flush()
+        finally:
+            if self._file_lock is not None:
+                self._file_lock.release()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._index_handle is not None:
+                self._index_handle.close()
+                self._index_handle = None
+
+    # ---------------------------------------------------------------------------------
+    # Storage
+    # ---------------------------------------------------------------------------------
+
+    def shard_for(self, filename: str, when: datetime) -> str:
+        if self.layout == 'hour':
+            return when.strftime('%Y/%m/%d/%H')
+        if self.layout == 'hash':
+            digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+            return f"{digest[:2]}/{digest[2:4]}"
+        return ''
+
+    def save(self, filename: str, data: bytes, when: Optional[datetime] = None, key: Optional[str] = None) -> str:
+        """Write ``data`` under its shard and return the path relative to the store root."""
+        shard = self.shard_for(filename, when or datetime.now())
+        relpath = f"{shard}/{filename}" if shard else filename
+        directory = os.path.join(self.root, *shard.split('/')) if shard else self.root
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, filename), 'wb') as handle:
+            handle.write(data)
+        with self._lock:
+            self._append_index([(key or f"file:{filename}", relpath, len(data))])
+        return relpath
+
+    def add_existing(self, key: str, relpath: str, size: int) -> None:
+        """Record a file that was put in place by something else (e.g. the migration tool)."""
+        with self._lock:
+            self._append_index([(key, relpath, size)])
+
+    def relocate(self, old_relpath: str, new_relpath: str, key: Optional[str] = None) -> None:
+        """Point an indexed entry at a new path (in memory; call :meth:`rewrite_index` after)."""
+        with self._lock:
+            old_key, size = self._entries.pop(old_relpath)
+            self._total_bytes -= size
+            if self._by_key.get(old_key) == old_relpath:
+                del self._by_key[old_key]
+            self._remember(key or old_key, new_relpath, size)
+
+    def rewrite_index(self) -> None:
+        """Atomically replace the index file with one line per stored image."""
+        with self._lock:
+            if self._index_handle is not None:
+                self._index_handle.close()
+                self._index_handle = None
+            tmp_path = f"{self.index_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8', newline='\n') as handle:
+                for relpath, (key, size) in self._entries.items():
+                    handle.write(f"{key}\t{relpath}\t{size}\n")
+            os.replace(tmp_path, self.index_file)
+
+    def lookup(self, key: str) -> Optional[dict]:
+        relpath = self._by_key.get(key)
+        if relpath is None:
+            return None
+        return {'path': relpath, 'size': self._entries[relpath][1]}
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Map a stored relative path, or a bare file name from before sharding, to its location."""
+        if name in self._entries:
+            return name
+        return self._by_name.get(name.rsplit('/', 1)[-1])
+
+    def totals(self) -> Tuple[int, int]:
+        """Return ``(image_count, total_bytes)``."""
+        with self._lock:
+            return len(self._entries), self._total_bytes
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import IO, Callable, Iterator, List, Optional
+
+from file_lock import FileLock
+from jsonl_io import atomic_write_json, count_lines
+from jsonl_writer import RotatingFileSink
+from plate_index import parse_timestamp
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+CODECS = ('none', 'gzip', 'zstd')
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def open_segment(path: str) -> IO[bytes]:
+    """Open a (possibly compressed) segment for binary reading based on its extension."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("Reading .zst segments needs the 'zstandard' package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+
+def compress_file(path: str, codec: str) -> str:
+    """Stream ``path`` into a compressed sibling and return its name. The original is kept."""
+    target = path + EXTENSIONS[codec]
+    tmp_path = f"{target}.tmp"
+    with open(path, 'rb') as source:
+        if codec == 'gzip':
+            with gzip.open(tmp_path, 'wb') as dest:
+                shutil.copyfileobj(source, dest, 1 << 20)
+        else:
+            with open(tmp_path, 'wb') as dest:
+                zstandard.ZstdCompressor(level=10).copy_stream(source, dest)
+    os.replace(tmp_path, target)
+    return target
+
+
+class RawArchive:
+    """Finished raw-data segments plus a manifest of their time ranges and record counts.
+
+    ``manifest.json`` lists each segment's file name (relative to the archive directory),
+    the time its first and last record were written, the number of records, its size and
+    codec, so tools can pick the segments covering a period without opening the rest.
+
+    With ``shared`` set, several processes maintain the archive: changes are made under a
+    lock file next to the manifest, on a freshly read copy, and reads pick up the manifest
+    again whenever another process has replaced it.
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, archive_dir: str, current_file: Optional[str] = None, shared: bool = False):
+        self.archive_dir = archive_dir
+        self.current_file = current_file
+        self.manifest_file = os.path.join(archive_dir, self.MANIFEST_NAME)
+        self._lock = FileLock(f"{self.manifest_file}.lock") if shared else threading.Lock()
+        self.shared = shared
+        self._segments: List[dict] = []
+        self._loaded_identity = None
+        self._load()
+
+    def _version(self):
+        try:
+            stat = os.stat(self.manifest_file)
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        identity = self._version()
+        if identity is not None and identity != self._loaded_identity:
+            with open(self.manifest_file, 'r', encoding='utf-8') as handle:
+                self._segments = json.load(handle).get('segments', [])
+            self._loaded_identity = identity
+
+    def _entries(self) -> List[dict]:
+        with self._lock:
+            if self.shared:
+                self._load()
+            return list(self._segments)
+
+    def _save(self) -> None:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        atomic_write_json(self.manifest_file, {'segments': self._segments})
+        self._loaded_identity = self._version()
+
+    def add_segment(self, entry: dict) -> None:
+        with self._lock:
+            if self.shared:
+                self._load()
+            self._segments.append(entry)
+            self._save()
+
+    def update_segment(self, name: str, **changes) -> None:
+        with self._lock:
+            if self.shared:
+                self._load()
+            for entry in self._segments:
+                if entry['file'] == name:
+                    entry.update(changes)
+            self._save()
+
+    def total_records(self) -> int:
+        return sum(entry['records'] for entry in self._entries())
+
+    def last_end(self) -> Optional[str]:
+        entries = self._entries()
+        return entries[-1]['end'] if entries else None
+
+    def segments(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+        """Return manifest entries whose time range overlaps ``[start, end)``."""
+        entries = self._entries()
+        return [
+            entry for entry in entries
+            if (start is None or datetime.fromisoformat(entry['end']) >= start)
+            and (end is None or datetime.fromisoformat(entry['start']) < end)
+        ]
+
+    def iter_records(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_current: bool = True,
+        convert: Optional[Callable[[dict], dict]] = None,
+    ) -> Iterator[dict]:
+        """Yield raw records from every segment overlapping the range, oldest first.
+
+        Filtering is per segment (by write time); records inside a matching segment are all
+        returned. The segment currently being written is included unless ``include_current``
+        is False. ``convert`` is applied to each record, e.g. ``RawImageRefs.rehydrate`` to
+        restore images stripped from slimmed records.
+        """
+        paths = [os.path.join(self.archive_dir, entry['file']) for entry in self.segments(start, end)]
+        if include_current and self.current_file and os.path.exists(self.current_file):
+            paths.append(self.current_file)
+
+        for path in paths:
+            handle = self._open(path)
+            if handle is None:
+                continue
+            with handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    yield convert(record) if convert else record
+
+
+    @staticmethod
+    def _open(path: str) -> Optional[IO[bytes]]:
+        """Open a listed segment, following it to its compressed copy if compression removed
+        it since the manifest was read. Returns None if it is gone altogether."""
+        for candidate in [path] + [path + extension for extension in EXTENSIONS.values()]:
+            try:
+                return open_segment(candidate)
+            except FileNotFoundError:
+                continue
+        return None
+
+
+def first_record_time(path: str) -> datetime:
+    """When the first record in ``path`` was received, or failing that the file's mtime."""
+    try:
+        with open(path, 'rb') as handle:
+            first = json.loads(handle.readline())
+        timestamp = parse_timestamp(first.get('timestamp'))
+        if timestamp is not None:
+            return datetime.fromtimestamp(timestamp)
+    except (OSError, ValueError, AttributeError, OverflowError):
+        pass
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+class RawArchiveSink(RotatingFileSink):
+    """Writer sink for the raw JSONL that rotates into compressed archive segments.
+
+    New records always go to ``path``. On rollover the file is moved into ``archive_dir`` as
+    ``<name>-<start>-<end>.jsonl``, added to the manifest and compressed on a background thread.
+
+    With a ``lock`` the file is shared with other worker processes (see :class:`FileSink`):
+    the manifest is shared too, and a finished segment's record count and start time are
+    taken from the file and the manifest rather than from this process's own writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        archive_dir: str,
+        when: str = 'daily',
+        max_bytes: int = 0,
+        codec: str = 'gzip',
+        lock: Optional[FileLock] = None,
+    ):
+        if codec not in CODECS:
+            raise ValueError(f"raw compression must be one of {', '.join(CODECS)}")
+        if codec == 'zstd' and zstandard is None:
+            raise ValueError("raw_compression 'zstd' needs the 'zstandard' package (pip install zstandard)")
+        super().__init__(path, when=when, max_bytes=max_bytes, backup_count=0, compress=codec != 'none', lock=lock)
+        self.codec = codec
+        self.archive = RawArchive(archive_dir, current_file=path, shared=lock is not None)
+        os.makedirs(archive_dir, exist_ok=True)
+
+        self._records = count_lines(path) if os.path.exists(path) else 0
+        previous_end = self.archive.last_end()
+        if previous_end:
+            self._started = datetime.fromisoformat(previous_end)
+        elif self._records:
+            # An existing file from before the archive: its segment starts with its first record
+            self._started = first_record_time(path)
+        else:
+            self._started = datetime.now()
+        self._finishing = None
+
+        # Finish compressing segments left uncompressed by an earlier shutdown. Shared archives
+        # leave this to the first worker to start, which keeps the lock for its lifetime
+        self._leftover_lock = FileLock(os.path.join(archive_dir, 'leftovers.lock')) if lock else None
+        if self._leftover_lock is None or self._leftover_lock.acquire(blocking=False):
+            for entry in self.archive.segments():
+                if self.compress and entry['codec'] == 'none':
+                    self.on_segment_finished(os.path.join(archive_dir, entry['file']), record=False)
+
+    def write(self, data: bytes) -> None:
+        super().write(data)
+        self._records += data.count(b'\n')
+
+    def rollover(self) -> None:
+        if self.lock is not None:
+            # Runs under the lock; other workers wrote to this segment too
+            self._records = count_lines(self.path) if os.path.exists(self.path) else 0
+            previous_end = self.archive.last_end()
+            if previous_end:
+                self._started = datetime.fromisoformat(previous_end)
+        self._finishing = (self._started, datetime.now(), self._records)
+        super().rollover()
+        self._started = datetime.now()
+        self._records = 0
+
+    def segment_name(self) -> str:
+        started, ended, _ = self._finishing
+        stem = os.path.splitext(os.path.basename(self.path))[0]
+        base = f"{stem}-{started:%Y%m%dT%H%M%S}-{ended:%Y%m%dT%H%M%S}"
+        candidate = os.path.join(self.archive.archive_dir, f"{base}.jsonl")
+        counter = 1
+        while any(os.path.exists(candidate + ext) for ext in ('', '.gz', '.zst')):
+            candidate = os.path.join(self.archive.archive_dir, f"{base}-{counter}.jsonl")
+            counter += 1
+        return candidate
+
+    def on_segment_finished(self, segment: str, record: bool = True) -> None:
+        if record:
+            started, ended, records = self._finishing
+            self.archive.add_segment({
+                'file': os.path.basename(segment),
+                'start': started.isoformat(),
+                'end': ended.isoformat(),
+                'records': records,
+                'bytes': os.path.getsize(segment),
+                'codec': 'none',
+            })
+        super().on_segment_finished(segment)
+
+    def _compress_and_prune(self, segment: str) -> None:
+        try:
+            compressed = compress_file(segment, self.codec)
+        except OSError:
+            return
+        # Point the manifest at the compressed copy before removing the original
+        self.archive.update_segment(
+            os.path.basename(segment),
+            file=os.path.basename(compressed),
+            codec=self.codec,
+            compressed_bytes=os.path.getsize(compressed),
+        )
+        os.remove(segment)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import os
+from typing import Callable, Dict, Optional
+
+# Rekor Scout embeds images as base64 strings in fields such as ``plate_crop_jpeg``
+IMAGE_FIELD_SUFFIX = '_jpeg'
+REF_KEY = '$image'
+
+
+class RawImageRefs:
+    """Replaces base64 images in raw records with references to files on disk, and back.
+
+    Slimming swaps every ``*_jpeg`` string for ``{"$image": {"store", "path", "sha256", "size"}}``.
+    Images that were already saved to the plate store (``store: "plates"``) are referenced
+    there; any others are written once, content-addressed, under ``blob_dir``
+    (``store: "blobs"``, path ``ab/<sha256>.jpg``). :meth:`rehydrate` restores the original
+    base64 text, so the raw log stays lossless as long as the referenced files are kept.
+
+    Strings that don't decode to exactly the same base64 text (e.g. with embedded newlines)
+    are left inline, since they could not be restored byte for byte.
+
+    ``resolve_plate`` (e.g. ``PlateImageStore.resolve``) locates plate-store images whose
+    recorded path went stale because ``migrate_plate_images.py`` moved them into shards.
+    """
+
+    def __init__(self, blob_dir: str, plates_dir: str,
+                 resolve_plate: Optional[Callable[[str], Optional[str]]] = None):
+        self.roots = {'blobs': blob_dir, 'plates': plates_dir}
+        self.resolve_plate = resolve_plate
+
+    # ---------------------------------------------------------------------------------
+    # Slimming (write path)
+    # ---------------------------------------------------------------------------------
+
+    def slim(self, record: dict, stored: Optional[Dict[str, str]] = None) -> dict:
+        """Return a copy of ``record`` with embedded images replaced by references.
+
+        ``stored`` maps base64 strings that were saved to the plate store to their path there.
+        """
+        return self._slim_value(record, stored or {})
+
+    def _slim_value(self, value, stored: Dict[str, str]):
+        if isinstance(value, dict):
+            return {
+                key: self._slim_image(item, stored)
+                if key.endswith(IMAGE_FIELD_SUFFIX) and isinstance(item, str)
+                else self._slim_value(item, stored)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self._slim_value(item, stored) for item in value]
+        return value
+
+    def _slim_image(self, encoded: str, stored: Dict[str, str]):
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            return encoded
+        if not data or base64.b64encode(data).decode('ascii') != encoded:
+            return encoded
+
+        digest = hashlib.sha256(data).hexdigest()
+        if encoded in stored:
+            store, path = 'plates', stored[encoded]
+        else:
+            store, path = 'blobs', self._write_blob(digest, data)
+        return {REF_KEY: {'store': store, 'path': path, 'sha256': digest, 'size': len(data)}}
+
+    def _write_blob(self, digest: str, data: bytes) -> str:
+        relpath = f"{digest[:2]}/{digest}.jpg"
+        target = os.path.join(self.roots['blobs'], digest[:2], f"{digest}.jpg")
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, target)
+        return relpath
+
+    # ---------------------------------------------------------------------------------
+    # Rehydration (read path)
+    # ---------------------------------------------------------------------------------
+
+    def rehydrate(self, record: dict) -> dict:
+        """Return a copy of ``record`` with every image reference replaced by its base64 text.
+
+        Raises ``FileNotFoundError`` if a referenced file is gone and ``ValueError`` if its
+        contents no longer match the recorded hash.
+        """
+        return self._rehydrate_value(record)
+
+    def _rehydrate_value(self, value):
+        if isinstance(value, dict):
+            if REF_KEY in value and len(value) == 1:
+                return self._load_image(value[REF_KEY])
+            return {key: self._rehydrate_value(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._rehydrate_value(item) for item in value]
+        return value
+
+    def _load_image(self, ref: dict) -> str:
+        path = self._image_path(ref)
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        if hashlib.sha256(data).hexdigest() != ref['sha256']:
+            raise ValueError(f"Image {ref['path']} does not match its recorded hash")
+        return base64.b64encode(data).decode('ascii')
+
+
+    def _image_path(self, ref: dict) -> str:
+        path = os.path.join(self.roots[ref['store']], *ref['path'].split('/'))
+        if ref['store'] != 'plates' or os.path.exists(path):
+            return path
+        # Plate images referenced before a layout migration now live elsewhere in the store
+        relpath = self.resolve_plate(ref['path']) if self.resolve_plate else None
+        if relpath:
+            return os.path.join(self.roots['plates'], *relpath.split('/'))
+        filename = ref['path'].rsplit('/', 1)[-1]
+        return os.path.join(self.roots['plates'], filename)
@@ -0,0 +1,134 @@
+"""
+Production server: runs the ALPR server under waitress in several worker processes.
+
+The parent process opens the listening socket and starts ``workers`` processes that all
+accept connections on it, each with ``threads`` request threads. With more than one worker
+the server shares its state between them (see "Production mode" in the README): appends to
+the JSONL files and the event log take a file lock, duplicate suppression uses a SQLite
+table and a single elected worker publishes to MQTT.
+
+Each open ``/api/stream`` connection occupies one of a worker's threads until it closes, so
+a worker accepts at most ``stream_max_subscribers`` of them; keep ``threads`` comfortably
+above that so ingest requests don't queue behind dashboards.
+
+A worker that exits unexpectedly is restarted. Ctrl+C (or SIGTERM) stops the workers, which
+flush their writers and spool unsent MQTT messages on the way out.
+
+Usage (from the server directory):
+    python serve.py [--workers 4] [--threads 8] [--host 0.0.0.0] [--port 5000]
+"""
+
+import _thread
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+import yaml
+
+
+def run_worker(sock, worker_id, workers, threads, control):
+    os.environ['ALPR_WORKER_ID'] = str(worker_id)
+    os.environ['ALPR_WORKERS'] = str(workers)
+    # Stop like Ctrl+C (which waitress handles by finishing its tasks) so atexit runs. SIGINT
+    # is set explicitly since it is ignored in processes started in the background
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    from waitress.server import create_server
+    import alpr_integrated_server as server
+
+    def wait_for_stop():
+        # A message, or the parent going away, means stop
+        try:
+            control.recv()
+        except EOFError:
+            pass
+        _thread.interrupt_main()
+
+    threading.Thread(target=wait_for_stop, name='stop-watcher', daemon=True).start()
+    httpd = create_server(server.app, sockets=[sock], threads=threads)
+    try:
+        httpd.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def start_worker(context, sock, worker_id, workers, threads):
+    """Start a worker; returns the process and the connection that tells it to stop"""
+    control, worker_end = context.Pipe()
+    process = context.Process(
+        target=run_worker,
+        args=(sock, worker_id, workers, threads, worker_end),
+        name=f'alpr-worker-{worker_id}',
+    )
+    process.start()
+    worker_end.close()
+    return process, control
+
+
+def main():
+    with open('config.yaml', 'r') as config_file:
+        config = yaml.safe_load(config_file)['integrated_server']
+
+    parser = argparse.ArgumentParser(description='Run the ALPR server with several worker processes')
+    parser.add_argument('--workers', type=int, default=config.get('workers', 1), help='worker processes')
+    parser.add_argument('--threads', type=int, default=config.get('threads', 8), help='request threads per worker')
+    parser.add_argument('--host', default=config.get('host', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=config.get('port', 5000))
+    args = parser.parse_args()
+
+    # Every open /api/stream connection holds a request thread; ingest needs the rest
+    stream_threads = config.get('stream_max_subscribers', 4)
+    if args.threads <= stream_threads:
+        print(f"Warning: {args.threads} thread(s) per worker leaves none for ingest with "
+              f"stream_max_subscribers: {stream_threads}; raise --threads or lower stream_max_subscribers")
+
+    if args.workers > 1 and os.environ.get('ENABLE_VIN', 'false').lower() == 'true':
+        print("Warning: VIN lookups are refused with more than one worker; use --workers 1 to run them")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if os.name != 'nt':
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(1024)
+    sock.setblocking(False)
+
+    # spawn behaves the same on Windows and POSIX: each worker imports the server afresh
+    context = multiprocessing.get_context('spawn')
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    # A pipe per worker rather than a shared Event, which a killed worker could leave locked
+    workers = [start_worker(context, sock, number, args.workers, args.threads) for number in range(args.workers)]
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s) x {args.threads} thread(s)")
+    print("Configure openALPR to POST to: http://localhost:{}/alpr".format(args.port))
+
+    try:
+        while True:
+            time.sleep(1)
+            for number, (process, control) in enumerate(workers):
+                if not process.is_alive():
+                    print(f"Worker {number} exited with code {process.exitcode}; restarting")
+                    control.close()
+                    workers[number] = start_worker(context, sock, number, args.workers, args.threads)
+    except KeyboardInterrupt:
+        pass
+
+    for process, control in workers:
+        try:
+            control.send('stop')
+        except OSError:
+            pass
+    deadline = time.monotonic() + 30
+    for process, control in workers:
+        process.join(max(deadline - time.monotonic(), 0))
+        if process.is_alive():
+            process.terminate()
+    sock.close()
+
+
+if __name__ == '__main__':
+    main()
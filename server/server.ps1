@@ -120,19 +120,33 @@ function Install-Autorun {
 function Clean-Data {
     Write-Info "Cleaning data files..."
     
+    # Data files and the state derived from them: checkpoints, snapshots, databases (with
+    # their SQLite -wal/-shm files), lock files and the MQTT spool and hand-off files
     $filesToRemove = @(
-        "event.log",
-        "alpr_raw_data.jsonl", 
-        "alpr_parsed_data.jsonl", 
-        "alpr_vin_lookup.json"
+        "event.log*",
+        "alpr_raw_data.jsonl*",
+        "alpr_parsed_data.jsonl*",
+        "alpr_vin_lookup.json",
+        "alpr_vin_results.jsonl",
+        "alpr_dedup.db*",
+        "alpr_dedup_snapshot.json",
+        "alpr_stats_checkpoint*.json",
+        "alpr_plate_summary.json",
+        "alpr_plates.db*",
+        "mqtt_outbox.jsonl",
+        "mqtt_handoff.jsonl*",
+        "raw_archive"
     )
     
-    foreach ($file in $filesToRemove) {
-        if (Test-Path $file) {
-            Remove-Item $file -Force
-            Write-Info "Removed: $file"
+    foreach ($pattern in $filesToRemove) {
+        $found = Get-ChildItem -Path $pattern -Force -ErrorAction SilentlyContinue
+        if ($found) {
+            foreach ($item in $found) {
+                Remove-Item $item.FullName -Recurse -Force
+                Write-Info "Removed: $($item.Name)"
+            }
         } else {
-            Write-Info "Not found: $file"
+            Write-Info "Not found: $pattern"
         }
     }
     
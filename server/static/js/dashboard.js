@@ -1,8 +1,16 @@
 let platesData = [];
+let allPlates = [];
+let platesCursor = '';
+let plateKeys = new Set();
+let streamConnected = false;
 let sortColumn = 'timestamp';
 let sortDirection = 'desc';
 let seenEvents = new Set();
 let hasInitializedEvents = false;
+let eventsSeq = 0;
+// Each worker process only streams what it ingested itself, so with several workers the
+// stream can't replace polling /api/plates (whose cursor covers the shared file)
+const STREAM_HAS_ALL_PLATES = Number(document.body.dataset.workers || 1) <= 1;
 
 function getRecentWindowMinutes() {
     const select = document.getElementById('recent-window');
@@ -24,15 +32,60 @@ function getRecentPlates(plates, windowMinutes = getRecentWindowMinutes()) {
     });
 }
 
+// Fields the dashboard renders; everything else is left on the server
+const PLATE_FIELDS = [
+    'timestamp', 'license_plate', 'confidence', 'state_region',
+    'region_confidence', 'camera_id', 'vehicle_info', 'image_filename'
+];
+
+// Identify a plate record so stream pushes and polled deltas are not counted twice
+function plateKey(plate) {
+    return plate.event_key || plate.uuid || `${plate.timestamp}|${plate.license_plate}|${plate.camera_id}`;
+}
+
+function addPlates(plates) {
+    plates.forEach(plate => {
+        const key = plateKey(plate);
+        if (!plateKeys.has(key)) {
+            plateKeys.add(key);
+            allPlates.push(plate);
+        }
+    });
+}
+
+// Merge a delta from /api/plates into the local copy of the recent window
+function mergePlates(delta) {
+    if (delta.reset) {
+        allPlates = [];
+        plateKeys = new Set();
+    }
+    addPlates(delta.plates);
+    platesCursor = delta.cursor;
+}
+
+// Drop plates that fell out of the recent window and re-render
+function renderPlates() {
+    allPlates = getRecentPlates(allPlates, getRecentWindowMinutes());
+    plateKeys = new Set(allPlates.map(plateKey));
+    platesData = allPlates;
+    updateTable();
+    updateStats();
+    updateRegionFilter();
+}
+
 // Fetch and display plates data
 async function fetchPlates() {
     try {
-        const response = await fetch('/api/plates');
+        const windowMinutes = getRecentWindowMinutes();
+        const params = new URLSearchParams({
+            cursor: platesCursor,
+            since: new Date(Date.now() - windowMinutes * 60 * 1000).toISOString(),
+            fields: PLATE_FIELDS.join(',') + ',event_key,uuid'
+        });
+        const response = await fetch(`/api/plates?${params}`);
         const data = await response.json();
-        platesData = getRecentPlates(data, getRecentWindowMinutes());
-        updateTable();
-        updateStats();
-        updateRegionFilter();
+        mergePlates(data);
+        renderPlates();
     } catch (error) {
         console.error('Error fetching plates:', error);
         showNotification('Error fetching data', 'error');
@@ -42,29 +95,20 @@ async function fetchPlates() {
 // Check for new events and show notifications
 async function checkEvents() {
     try {
-        const response = await fetch('/api/events');
-        const events = await response.json();
-
-        if (!hasInitializedEvents) {
-            events.forEach(event => seenEvents.add(event));
-            hasInitializedEvents = true;
-            return;
-        }
+        const response = await fetch(`/api/events?after=${eventsSeq}`);
+        const data = await response.json();
+        const isFirstCheck = !hasInitializedEvents;
+        hasInitializedEvents = true;
+        eventsSeq = data.last_seq;
 
-        const newEvents = events.filter(event => {
-            if (seenEvents.has(event)) {
-                return false;
+        data.events.forEach(({ line }) => {
+            if (seenEvents.has(line)) {
+                return;
             }
-
-            seenEvents.add(event);
-            return true;
-        });
-
-        newEvents.forEach(event => {
-            if (event.includes('LICENSE PLATE')) {
-                showNotification(event, 'license');
-            } else if (event.includes('heartbeat')) {
-                showNotification(event, 'heartbeat');
+            seenEvents.add(line);
+            // Only notify about events that happened after the page was loaded
+            if (!isFirstCheck && !data.reset) {
+                notifyEvent(line);
             }
         });
     } catch (error) {
@@ -72,6 +116,58 @@ async function checkEvents() {
     }
 }
 
+function notifyEvent(event) {
+    if (event.includes('LICENSE PLATE')) {
+        showNotification(event, 'license');
+    } else if (event.includes('heartbeat')) {
+        showNotification(event, 'heartbeat');
+    }
+}
+
+// Subscribe to pushed plates and events; polling only runs while this is disconnected (or,
+// for plates, when the stream doesn't carry all of them)
+function startEventStream() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource('/api/stream');
+
+    source.addEventListener('open', () => {
+        streamConnected = true;
+        // Catch up on anything that arrived while we were polling or disconnected
+        fetchPlates();
+    });
+
+    source.addEventListener('plate', (e) => {
+        addPlates([JSON.parse(e.data)]);
+        if (document.getElementById('auto-refresh').checked) {
+            renderPlates();
+        }
+    });
+
+    source.addEventListener('log', (e) => {
+        const event = JSON.parse(e.data);
+        if (seenEvents.has(event)) {
+            return;
+        }
+        seenEvents.add(event);
+        if (document.getElementById('auto-refresh').checked) {
+            notifyEvent(event);
+        }
+    });
+
+    source.addEventListener('reset', () => {
+        platesCursor = '';
+        fetchPlates();
+    });
+
+    source.addEventListener('error', () => {
+        // The browser reconnects on its own (resuming via Last-Event-ID)
+        streamConnected = false;
+    });
+}
+
 // Show notification
 function showNotification(message, type = 'info') {
     const notification = document.createElement('div');
@@ -304,6 +400,10 @@ document.getElementById('sort-by').addEventListener('change', (e) => {
 document.getElementById('filter-region').addEventListener('change', updateTable);
 document.getElementById('search').addEventListener('input', updateTable);
 document.getElementById('recent-window').addEventListener('change', () => {
+    // A wider window needs history the local copy never fetched, so start over
+    platesCursor = '';
+    allPlates = [];
+    plateKeys = new Set();
     fetchPlates();
 });
 
@@ -316,8 +416,13 @@ document.querySelectorAll('th.sortable').forEach(th => {
 // Auto-refresh functionality
 function startAutoRefresh() {
     setInterval(() => {
-        if (document.getElementById('auto-refresh').checked) {
+        if (!document.getElementById('auto-refresh').checked) {
+            return;
+        }
+        if (!streamConnected || !STREAM_HAS_ALL_PLATES) {
             fetchPlates();
+        }
+        if (!streamConnected) {
             checkEvents();
         }
     }, 3000); // Refresh every 3 seconds
@@ -325,6 +430,7 @@ function startAutoRefresh() {
 
 // Initialize
 fetchPlates();
+startEventStream();
 startAutoRefresh();
 
 // Initial sort by timestamp (newest first)
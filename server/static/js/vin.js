@@ -1,6 +1,9 @@
 // VIN page functionality
 let selectedPlates = [];
 
+// How often to poll a running VIN lookup job
+const VIN_JOB_POLL_MS = 1000;
+
 // DOM elements
 const selectAllCheckbox = document.getElementById('select-all-checkbox');
 const selectAllButton = document.getElementById('select-all');
@@ -229,6 +232,7 @@ async function performVinLookup() {
     progressText.textContent = `Processing ${selectedPlates.length} plates...`;
     
     try {
+        // The server queues the lookups and answers right away with a job id
         const response = await fetch('/api/vin/lookup', {
             method: 'POST',
             headers: {
@@ -243,21 +247,18 @@ async function performVinLookup() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
-        const result = await response.json();
-        
-        // Update progress to 100%
-        progressFill.style.width = '100%';
-        progressText.textContent = `Completed! ${result.new_lookups} new lookups, ${result.total_results} total results`;
-        
-        // Update the UI for processed plates instead of reloading
-        updatePlateRows(result.processed_plates || selectedPlates);
-        
-        // Clear selections and update counts
+        // Clear selections; rows are updated as their lookups finish
         document.querySelectorAll('.plate-checkbox:checked').forEach(checkbox => {
             checkbox.checked = false;
         });
         updateSelectedPlates();
         
+        const result = await pollVinJob(await response.json());
+        
+        // Update progress to 100%
+        progressFill.style.width = '100%';
+        progressText.textContent = `Completed! ${result.new_lookups} new lookups, ${result.total} total results`;
+        
         // Show success message
         showNotification(`VIN lookup completed successfully! ${result.new_lookups} new lookups performed.`, 'success');
         
@@ -274,6 +275,32 @@ async function performVinLookup() {
     }
 }
 
+// Poll a lookup job until it is done, updating the progress bar and finished rows
+async function pollVinJob(job) {
+    const updated = new Set();
+    while (true) {
+        const finished = job.results.filter((item, index) => item.status !== 'queued' && !updated.has(index));
+        job.results.forEach((item, index) => {
+            if (item.status !== 'queued') updated.add(index);
+        });
+        updatePlateRows(finished);
+        
+        progressFill.style.width = `${job.total ? (job.completed / job.total) * 100 : 100}%`;
+        progressText.textContent = `Looked up ${job.completed} of ${job.total} plates...`;
+        
+        if (job.state === 'done') {
+            return job;
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, VIN_JOB_POLL_MS));
+        const response = await fetch(`/api/vin/jobs/${job.job_id}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        job = await response.json();
+    }
+}
+
 async function clearVinData() {
     // Get selected plates that have VIN data
     const platesToClear = [];
@@ -390,9 +417,19 @@ async function clearAllVinData() {
 }
 
 // Helper functions for updating UI without page reload
+// Map "PLATE_STATE" to its table row with one pass over the table
+function plateRowsByKey() {
+    const rows = new Map();
+    document.querySelectorAll('tr.plate-row').forEach(row => {
+        rows.set(`${row.dataset.plate}_${row.dataset.state}`, row);
+    });
+    return rows;
+}
+
 function updatePlateRows(processedPlates) {
+    const rows = plateRowsByKey();
     processedPlates.forEach(plateData => {
-        const row = document.querySelector(`tr.plate-row[data-plate="${plateData.license_plate}"][data-state="${plateData.state}"]`);
+        const row = rows.get(`${plateData.license_plate}_${plateData.state}`);
         if (row) {
             updateRowForVinCompletion(row);
         }
@@ -400,8 +437,9 @@ function updatePlateRows(processedPlates) {
 }
 
 function updatePlateRowsForClearing(clearedPlates) {
+    const rows = plateRowsByKey();
     clearedPlates.forEach(plateData => {
-        const row = document.querySelector(`tr.plate-row[data-plate="${plateData.license_plate}"][data-state="${plateData.state}"]`);
+        const row = rows.get(`${plateData.license_plate}_${plateData.state}`);
         if (row) {
             updateRowForClearingVin(row);
         }
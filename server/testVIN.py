@@ -1,25 +1,12 @@
 import json
-import requests
+
+from vin_client import VinClient
+
+client = VinClient('ehifeCWYw8awg2G')  # input API key (under account settings)
 
 def get_VIN_from_plate(license_plate, state):
     """Get VIN information from license plate and state"""
-    url = 'https://platetovin.com/api/convert'
-    payload = {
-        "state": state,
-        "plate": license_plate
-    }
-    headers = {
-        'Authorization': 'ehifeCWYw8awg2G',  # input API key (under account settings)
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    return client.lookup(license_plate, state)
 
 def main():
     """Simple interactive VIN lookup test"""
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_URL = 'https://platetovin.com/api/convert'
+
+# Responses worth retrying: rate limited, or the provider failed rather than the request
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class VinClient:
+    """HTTP client for the plate-to-VIN service.
+
+    Requests go through one pooled :class:`requests.Session`, so lookups reuse kept-alive
+    connections instead of paying a TCP and TLS handshake each. Connection errors, timeouts
+    and 429/5xx responses are retried up to ``max_retries`` times with exponential backoff
+    and full jitter, honouring a ``Retry-After`` header when one is sent. ``before_retry``, if
+    given, is called before each retry, e.g. to take a token from a shared rate limiter.
+
+    :meth:`lookup` returns the same shapes as before: the provider's JSON, or
+    ``{"error": ...}`` if the lookup failed. A 404 is reported as a not-found result
+    (``{"success": false, "not_found": true, ...}``); any other unsuccessful response, such
+    as an authentication or quota failure, counts as an error. Each result is cached in memory for a
+    time that depends on its :meth:`outcome`: ``hit_ttl`` for vehicles found,
+    ``not_found_ttl`` for plates the provider doesn't know and ``error_ttl`` for failures,
+    which are likely transient. A TTL of ``None`` caches forever and ``0`` not at all.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        url: str = DEFAULT_URL,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        pool_size: int = 4,
+        hit_ttl: Optional[float] = 30 * 86400,
+        not_found_ttl: Optional[float] = 7 * 86400,
+        error_ttl: Optional[float] = 300,
+        cache_max_entries: int = 10000,
+        before_retry: Optional[Callable[[], object]] = None,
+    ):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.ttls = {'hit': hit_ttl, 'not_found': not_found_ttl, 'error': error_ttl}
+        self.cache_max_entries = cache_max_entries
+        self.before_retry = before_retry
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': api_key,
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        # (plate, state) -> (expiry on the monotonic clock or None, result)
+        self._cache: OrderedDict[Tuple[str, str], Tuple[Optional[float], dict]] = OrderedDict()
+        self._counts = {'requests': 0, 'retries': 0, 'cache_hits': 0}
+
+    # ---------------------------------------------------------------------------------
+    # Results
+    # ---------------------------------------------------------------------------------
+
+    @staticmethod
+    def outcome(result: dict) -> str:
+        """Classify a lookup result as ``hit``, ``not_found`` or ``error``."""
+        if result.get('success') and result.get('vin'):
+            return 'hit'
+        if result.get('not_found'):
+            return 'not_found'
+        return 'error'
+
+    def is_fresh(self, result: dict, looked_up_at: Union[datetime, float, None]) -> bool:
+        """Whether a result obtained at ``looked_up_at`` is still within its TTL.
+
+        ``looked_up_at`` is a datetime or a Unix timestamp; results of unknown age are fresh.
+        """
+        ttl = self.ttls[self.outcome(result)]
+        if ttl is None or looked_up_at is None:
+            return True
+        if isinstance(looked_up_at, datetime):
+            looked_up_at = looked_up_at.timestamp()
+        return time.time() - looked_up_at < ttl
+
+    # ---------------------------------------------------------------------------------
+    # Cache
+    # ---------------------------------------------------------------------------------
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[dict]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expiry, result = entry
+            if expiry is not None and time.monotonic() >= expiry:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            self._counts['cache_hits'] += 1
+            return result
+
+    def _remember(self, key: Tuple[str, str], result: dict) -> None:
+        ttl = self.ttls[self.outcome(result)]
+        if ttl is not None and ttl <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (None if ttl is None else time.monotonic() + ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def forget(self, license_plate: str, state: str) -> None:
+        with self._lock:
+            self._cache.pop((license_plate.upper(), state.upper()), None)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counts, 'cached': len(self._cache)}
+
+    # ---------------------------------------------------------------------------------
+    # Lookups
+    # ---------------------------------------------------------------------------------
+
+    def lookup(self, license_plate: str, state: str) -> dict:
+        """Return VIN information for a plate, from the cache or the service."""
+        key = (license_plate.upper(), state.upper())
+        result = self._cached(key)
+        if result is None:
+            result = self._request(license_plate, state)
+            self._remember(key, result)
+        return result
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        if response is not None:
+            try:
+                return min(float(response.headers['Retry-After']), self.backoff_max)
+            except (KeyError, ValueError):
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _request(self, license_plate: str, state: str) -> dict:
+        payload = {"state": state, "plate": license_plate}
+        attempt = 0
+        while True:
+            response = None
+            with self._lock:
+                self._counts['requests'] += 1
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code == 404:
+                        return {"success": False, "not_found": True, "error": "Plate not found"}
+                    response.raise_for_status()
+                    return response.json()
+                error = f"HTTP {response.status_code} from VIN service"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = str(e)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return {"error": str(e)}
+
+            if attempt >= self.max_retries:
+                return {"error": error}
+            time.sleep(self._backoff(attempt, response))
+            if self.before_retry is not None:
+                self.before_retry()
+            attempt += 1
+            with self._lock:
+                self._counts['retries'] += 1
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+class TokenBucket:
+    """Rate limiter shared by all workers: ``rate`` requests per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class VinJob:
+    """One submitted batch of plates and the result of each, in submission order."""
+
+    def __init__(self, plates: List[dict]):
+        self.id = uuid.uuid4().hex[:12]
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.items: List[dict] = [
+            {'license_plate': plate['license_plate'], 'state': plate['state'], 'status': 'queued', 'data': None}
+            for plate in plates
+        ]
+        self.pending = len(self.items)
+        self.new_lookups = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.id,
+            'state': 'done' if self.pending == 0 else 'running',
+            'total': len(self.items),
+            'completed': len(self.items) - self.pending,
+            'new_lookups': self.new_lookups,
+            'created': self.created,
+            'finished': self.finished,
+            'results': [dict(item) for item in self.items],
+        }
+
+
+class VinJobQueue:
+    """Runs VIN lookups on a pool of background workers.
+
+    :meth:`submit` returns a job right away. Plates that already have a stored result are
+    answered immediately; the rest are queued as one task per ``<plate>_<state>`` key. A key
+    that is already queued or being looked up (by any job) is not queued again: the new job
+    waits on the existing task. Every lookup takes a token from a shared :class:`TokenBucket`
+    so the provider's quota holds however many workers there are (pass :meth:`TokenBucket.acquire`
+    of :attr:`limiter` to the client so its retries take one too), and each result is saved
+    through ``store`` as soon as it finishes.
+
+    ``lookup(plate_info)`` performs one lookup and returns the entry to store; entries whose
+    ``vin_lookup`` contains an ``error`` or is unsuccessful are reported with status ``error``,
+    unless it is flagged ``not_found`` (a completed lookup of a plate the provider doesn't
+    know). A stored entry for which ``is_fresh(entry)`` is false (e.g. an old transient error) is looked up again.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[dict], dict],
+        store,
+        workers: int = 2,
+        rate: float = 2.0,
+        burst: int = 1,
+        keep_jobs: int = 100,
+        on_result: Optional[Callable[[str, dict], object]] = None,
+        is_fresh: Optional[Callable[[dict], bool]] = None,
+    ):
+        self.lookup = lookup
+        self.store = store
+        self.limiter = TokenBucket(rate, burst)
+        self.keep_jobs = keep_jobs
+        self.on_result = on_result
+        self.is_fresh = is_fresh
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, VinJob] = OrderedDict()
+        # key -> [(job, item index)] waiting for that key's lookup
+        self._waiting: Dict[str, List] = {}
+        self._tasks: queue.Queue = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._run, name=f'vin-worker-{number}', daemon=True)
+            for number in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, plates: List[dict]) -> VinJob:
+        job = VinJob(plates)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep_jobs:
+                self._jobs.popitem(last=False)
+
+            for index, plate_info in enumerate(plates):
+                key = f"{plate_info['license_plate']}_{plate_info['state']}"
+                existing = self.store.get(key)
+                if existing is not None and (self.is_fresh is None or self.is_fresh(existing)):
+                    self._finish_item(job, index, 'existing', existing)
+                elif key in self._waiting:
+                    self._waiting[key].append((job, index))
+                else:
+                    self._waiting[key] = [(job, index)]
+                    self._tasks.put((key, plate_info))
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queued_lookups': self._tasks.qsize(),
+                'pending_keys': len(self._waiting),
+                'jobs': len(self._jobs),
+                'active_jobs': sum(1 for job in self._jobs.values() if job.pending),
+            }
+
+    def _finish_item(self, job: VinJob, index: int, status: str, data: dict) -> None:
+        item = job.items[index]
+        item['status'] = status
+        item['data'] = data
+        job.pending -= 1
+        if job.pending == 0:
+            job.finished = time.time()
+
+    def _run(self) -> None:
+        while True:
+            key, plate_info = self._tasks.get()
+            self.limiter.acquire()
+            try:
+                entry = self.lookup(plate_info)
+                self.store.put(key, entry)
+                vin_lookup = entry.get('vin_lookup') or {}
+                failed = 'error' in vin_lookup or vin_lookup.get('success') is False
+                status = 'error' if failed and not vin_lookup.get('not_found') else 'success'
+            except Exception as e:
+                entry = {'license_plate': plate_info['license_plate'], 'state': plate_info['state'], 'error': str(e)}
+                status = 'error'
+
+            with self._lock:
+                waiting = self._waiting.pop(key, [])
+                for job_index, (job, index) in enumerate(waiting):
+                    # Only the job that queued the key counts it as a new lookup
+                    if job_index == 0:
+                        job.new_lookups += 1
+                    self._finish_item(job, index, status, entry)
+            if self.on_result is not None:
+                self.on_result(key, entry)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from jsonl_io import iter_json_lines, read_complete_lines
+
+
+class VinResultStore:
+    """VIN lookup results keyed by ``<plate>_<state>``, cached in memory and logged to disk.
+
+    Every change is appended to a JSON-lines log (``put``, ``delete`` or ``clear``) with a
+    single write followed by an fsync, so a crash can at worst lose the last, incomplete
+    line, which is ignored on load. Reads are served from the in-memory dict. Once the log
+    holds ``compact_factor`` times more lines than there are results (and at least
+    ``compact_min_lines``), it is rewritten as one ``put`` per result and atomically swapped in.
+
+    On first start, results from the legacy ``alpr_vin_lookup.json`` file are imported.
+
+    A secondary index maps each license plate to its results by state, so finding a plate's
+    result under any state is a dict lookup rather than a scan of every key.
+    """
+
+    def __init__(
+        self,
+        log_file: str,
+        legacy_file: Optional[str] = None,
+        compact_factor: float = 2.0,
+        compact_min_lines: int = 1000,
+    ):
+        self.log_file = log_file
+        self.compact_factor = compact_factor
+        self.compact_min_lines = compact_min_lines
+        self._lock = threading.Lock()
+        self._results: Dict[str, dict] = {}
+        self._by_plate: Dict[str, Dict[str, dict]] = {}
+        self._log_lines = 0
+
+        if os.path.exists(log_file):
+            self._replay()
+        elif legacy_file and os.path.exists(legacy_file):
+            self.import_legacy(legacy_file)
+
+    def _replay(self) -> None:
+        lines, end = read_complete_lines(self.log_file, 0)
+        for _, entry in iter_json_lines(lines):
+            self._apply(entry)
+            self._log_lines += 1
+        if os.path.getsize(self.log_file) > end:
+            # Drop a line cut short by a crash so the next append starts on a fresh line
+            with open(self.log_file, 'r+b') as handle:
+                handle.truncate(end)
+
+    @staticmethod
+    def split_key(key: str) -> Tuple[str, str]:
+        """Split a ``<plate>_<state>`` key into ``(plate, state)``."""
+        plate, _, state = key.partition('_')
+        return plate, state
+
+    def _apply(self, entry: dict) -> None:
+        op = entry.get('op')
+        if op == 'put':
+            key, value = entry['key'], entry['value']
+            self._results[key] = value
+            plate, state = self.split_key(key)
+            self._by_plate.setdefault(plate, {})[state] = value
+        elif op == 'delete':
+            if self._results.pop(entry['key'], None) is not None:
+                plate, state = self.split_key(entry['key'])
+                states = self._by_plate[plate]
+                del states[state]
+                if not states:
+                    del self._by_plate[plate]
+        elif op == 'clear':
+            self._results.clear()
+            self._by_plate.clear()
+
+    def import_legacy(self, legacy_file: str) -> int:
+        """Load results from the old single-JSON-object file. Returns the number imported."""
+        with open(legacy_file, 'r', encoding='utf-8') as handle:
+            legacy = json.load(handle)
+        self.put_many(legacy.items())
+        return len(legacy)
+
+    # ---------------------------------------------------------------------------------
+    # Writes
+    # ---------------------------------------------------------------------------------
+
+    def _append(self, entries: List[dict]) -> None:
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries)
+        with open(self.log_file, 'a', encoding='utf-8', newline='\n') as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        for entry in entries:
+            self._apply(entry)
+        self._log_lines += len(entries)
+        self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self._log_lines >= max(self.compact_min_lines, self.compact_factor * len(self._results)):
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp_path = f"{self.log_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='\n') as handle:
+            for key, value in self._results.items():
+                handle.write(json.dumps({'op': 'put', 'key': key, 'value': value}) + '\n')
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.log_file)
+        self._log_lines = len(self._results)
+
+    def put(self, key: str, value: dict) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, dict]]) -> None:
+        entries = [{'op': 'put', 'key': key, 'value': value} for key, value in items]
+        if entries:
+            with self._lock:
+                self._append(entries)
+
+    def delete(self, keys: Iterable[str]) -> List[str]:
+        """Remove the given keys and return the ones that were present."""
+        with self._lock:
+            removed = [key for key in dict.fromkeys(keys) if key in self._results]
+            if removed:
+                self._append([{'op': 'delete', 'key': key} for key in removed])
+            return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._append([{'op': 'clear'}])
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact()
+
+    # ---------------------------------------------------------------------------------
+    # Reads
+    # ---------------------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._results.get(key)
+
+    def for_plate(self, license_plate: str) -> Dict[str, dict]:
+        """Return ``{state: result}`` for every result stored for ``license_plate``."""
+        return dict(self._by_plate.get(license_plate, {}))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._results
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def all(self) -> Dict[str, dict]:
+        with self._lock:
+            return dict(self._results)
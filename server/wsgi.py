@@ -0,0 +1,9 @@
+"""
+WSGI entry point for running the server under another WSGI server in a single process,
+e.g. ``waitress-serve --threads 8 --port 5000 wsgi:app`` (from the server directory).
+For several worker processes use serve.py instead.
+"""
+
+from alpr_integrated_server import app
+
+__all__ = ["app"]